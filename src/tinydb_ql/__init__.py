@@ -1 +1,6 @@
-from .tinydb_ql import Schema, Query, LoadError, QLSyntaxError
\ No newline at end of file
+from . import timing  # first: --timings measures the imports from here
+from .tinydb_ql import (Schema, Query, LoadError, QLSyntaxError, parse,
+                        prepare)
+from .aio import asearch, aiter_search
+from .scan import (search, search_ids, search_many, search_page, search_views,
+                   BudgetExceeded, CursorError)
@@ -1,39 +1,70 @@
 #!/usr/bin/env python3
 
 import contextlib
+import functools
 import json
-import pprint
+import os
 import random
 import sys
-from argparse import ArgumentParser
+import tracemalloc
+from argparse import SUPPRESS, ArgumentParser
 from pathlib import Path
 
 import tinydb
 from tinydb.middlewares import CachingMiddleware
 from tinydb.storages import JSONStorage
 
-from .tinydb_ql import QLSyntaxError, Query, Schema
+from . import analyze, timing
+from .approx import estimate_search, reservoir_search
+from .cache import DEFAULT_CACHE_SIZE, ResultCache
+from .codec import BACKEND_NAMES, ENV_BACKEND, get_codec
+from .compact import CompactJSONStorage, to_builtin
+from .distinct import (MAX_PRECISION, MIN_PRECISION, count_distinct,
+                       count_files)
+from .fanout import MERGE_ORDERS, expand_paths, is_pattern, search_files
+from .lazy import LazyJSONStorage
+from .querylog import ENV_QUERY_LOG, OPTIONS, QueryLog
+from .render import pformat, pp
+from .scan import (BudgetExceeded, check_max_results, fetch_documents,
+                   search, search_ids, search_page)
+from .storages import STORAGES
+from .tables import SelectiveJSONStorage
+from .timing import phase
+from .tinydb_ql import QLSyntaxError, Query, Schema, parse
+from .trigram import TrigramIndex
+from .watch import Watcher, watch
+from .zonemap import DEFAULT_BLOCK_SIZE, ZoneMap
 
 
-@contextlib.contextmanager
-def load_data(dbpath, table_name):
+def check_db_path(dbpath):
     if not isinstance(dbpath, Path):
         raise RuntimeError('no input file')
     if not dbpath.exists():
         raise FileNotFoundError('input file does not exist')
     if not dbpath.is_file():
         raise IsADirectoryError('input path is not a file')
+
+
+@contextlib.contextmanager
+def load_data(dbpath, table_name, storage=JSONStorage):
+    check_db_path(dbpath)
     with tinydb.TinyDB(
-            dbpath, access_mode='r', storage=CachingMiddleware(JSONStorage)
+            dbpath, access_mode='r', storage=CachingMiddleware(storage)
     ) as db:
+        with phase('load'):
+            # the whole file is read (and cached) once, and the target table
+            # decoded (the only one, unless $lookup reads others)
+            tables = db.storage.read()
+            if tables is not None:
+                tables.get(db.default_table_name
+                           if table_name is None else table_name)
         if table_name is None:
-            yield db, 'default table'
+            yield db, describe_table(table_name)
+        elif tables is not None and table_name in tables:
+            # (not db.tables(), which would scan all the selective tables)
+            yield db.table(table_name), describe_table(table_name)
         else:
-            available_tables = db.tables()
-            if table_name in available_tables:
-                yield db.table(table_name), f'table {table_name}'
-            else:
-                raise RuntimeError(f'available tables: {available_tables}')
+            raise RuntimeError(f'available tables: {db.tables()}')
 
 
 def parse_args(argv):
@@ -44,7 +75,9 @@ def parse_args(argv):
 
     parser = ArgumentParser(description='Query documents in a tinydb db.')
     parser.add_argument(
-        'db_path', nargs='?', default=None, type=Path, help='input db'
+        'db_path', nargs='?', default=None, type=Path,
+        help='input db, or a glob pattern (e.g., "logs/2026-*.json") to query '
+        'all the matching DB files'
     )
     parser.add_argument(
         'query', nargs='?', default='{}', help='DB query (JSON formatted)'
@@ -56,6 +89,24 @@ def parse_args(argv):
     parser.add_argument(
         '--table', help='target table (default: the default table)'
     )
+    parser.add_argument(
+        '--storage', choices=list(STORAGES), default='json',
+        help='DB file format: a plain tinydb JSON file, or an append-log '
+        'file written by "tinydb-dump --storage log" (default: json)'
+    )
+    parser.add_argument(
+        '--compact-memory', action='store_true',
+        help='keep the documents in memory as read-only records sharing '
+        'their keys and short strings (json storage only)'
+    )
+    # not an abbreviation of --compact-memory: "tinydb-dump --compact"
+    # rewrites the DB
+    parser.add_argument('--compact', action='store_true', help=SUPPRESS)
+    parser.add_argument(
+        '--lazy', action='store_true',
+        help='decode the members of the documents only when the query looks '
+        'them up (json storage only)'
+    )
     parser.add_argument(
         '--max-depth', type=int,
         help='maximum depth to show (a value <= 0 means unlimited)'
@@ -67,13 +118,199 @@ def parse_args(argv):
     parser.add_argument(
         '--sample', type=int,
         metavar='N',
-        help='sample N documents randomly'
+        help='sample N matching documents randomly (while scanning, keeping '
+        'at most N documents)'
+    )
+    parser.add_argument(
+        '--scan-fraction', type=float, metavar='FRACTION',
+        help='evaluate the query on a random FRACTION of the documents only, '
+        'and estimate the total number of matching documents'
+    )
+    parser.add_argument(
+        '--scan-docs', type=int, metavar='N',
+        help='evaluate the query on N random documents only, and estimate the '
+        'total number of matching documents'
     )
     parser.add_argument(
         '--json', action='store_true',
         help='output as a JSON text'
     )
+    parser.add_argument(
+        '--json-backend', choices=BACKEND_NAMES,
+        help='JSON codec to read the DB and write --json with; "auto" picks '
+        f'orjson when installed (default: ${ENV_BACKEND}, or auto)'
+    )
+    parser.add_argument(
+        '--ids-only', action='store_true',
+        help='only show the doc_ids of the matching documents (one per line, '
+        'or a JSON array with --json), without building the documents'
+    )
+    parser.add_argument(
+        '--count', action='store_true',
+        help='only show the number of matching documents'
+    )
+    parser.add_argument(
+        '--cache-dir', type=Path, metavar='DIR',
+        help='cache the matching doc_ids of queries in DIR '
+        '(invalidated when the DB file changes)'
+    )
+    parser.add_argument(
+        '--cache-size', type=int, default=DEFAULT_CACHE_SIZE, metavar='BYTES',
+        help='maximum total size of the cache directory; the least recently '
+        f'used entries are evicted first (default: {DEFAULT_CACHE_SIZE})'
+    )
+    parser.add_argument(
+        '--zonemap', action='store_true',
+        help='skip blocks of documents by their per-field statistics '
+        '(kept in <db_path>.zonemap.json, and built when missing or outdated)'
+    )
+    parser.add_argument(
+        '--zonemap-block', type=int, default=DEFAULT_BLOCK_SIZE, metavar='K',
+        help='number of documents per zone map block '
+        f'(default: {DEFAULT_BLOCK_SIZE})'
+    )
+    parser.add_argument(
+        '--trigram', action='append', metavar='PATH',
+        help='narrow down $search/$matches/$re queries on the string field '
+        'PATH with a trigram index (kept in <db_path>.trigram.json, and built '
+        'when missing or outdated); can be given multiple times'
+    )
+    parser.add_argument(
+        '--max-scan', type=int, metavar='N',
+        help='abort if the query needs to scan more than N documents'
+    )
+    parser.add_argument(
+        '--timeout', type=float, metavar='SECONDS',
+        help='abort if the scan takes longer than SECONDS'
+    )
+    parser.add_argument(
+        '--max-results', type=int, metavar='N',
+        help='abort if the query matches more than N documents'
+    )
+    parser.add_argument(
+        '--after', type=int, metavar='DOC_ID',
+        help='only look at documents after DOC_ID (in the doc_id order)'
+    )
+    parser.add_argument(
+        '--limit', type=int, metavar='N',
+        help='stop after N matching documents (in the doc_id order)'
+    )
+    parser.add_argument(
+        '--workers', type=int, metavar='N',
+        help='number of DB files queried in parallel with a glob pattern '
+        '(default: depends on the number of CPUs)'
+    )
+    parser.add_argument(
+        '--merge-order', choices=MERGE_ORDERS, default='file',
+        help='with a glob pattern, show the results file by file in the path '
+        'order, or of each file as soon as it is done (default: file)'
+    )
+    parser.add_argument(
+        '--analyze', action='store_true',
+        help='show the statistics of each field path of the (matching) '
+        'documents: frequency, JSON types, number of distinct values, '
+        'min/max and array lengths'
+    )
+    parser.add_argument(
+        '--analyze-sample', type=float, metavar='FRACTION',
+        help='analyze only a random FRACTION of the documents'
+    )
+    parser.add_argument(
+        '--analyze-output', type=Path, metavar='FILE',
+        help='also save the statistics in FILE as JSON'
+    )
+    parser.add_argument(
+        '--count-distinct', metavar='PATH',
+        help='only show the number of distinct values of the dotted field '
+        'PATH among the matching documents'
+    )
+    parser.add_argument(
+        '--hll-precision', type=int, metavar='P',
+        help='with --count-distinct, estimate the number with a HyperLogLog '
+        f'sketch of 2**P bytes ({MIN_PRECISION}-{MAX_PRECISION}, standard '
+        'error: 104%%/sqrt(2**P)) instead of keeping all the distinct values'
+    )
+    parser.add_argument(
+        '--timings', action='store_true',
+        help='write the wall time, CPU time and peak memory of each phase '
+        '(imports, validate, load, decode, compile, scan, output...) to '
+        'stderr as JSON; the memory tracing slows down the run'
+    )
+    parser.add_argument(
+        '--query-log', type=Path, metavar='FILE',
+        help='append the query, its table, the DB fingerprint, the number of '
+        'matches and the durations of the phases to FILE as a JSON line, for '
+        f'tinydb-query-replay (default: ${ENV_QUERY_LOG}, or no log)'
+    )
+    parser.add_argument(
+        '--watch', type=float, nargs='?', const=2.0, metavar='SECONDS',
+        help='keep watching the DB, and show the documents entering (+), '
+        'changing in (~) and leaving (-) the result on each update '
+        '(polling interval: 2 seconds)'
+    )
     args = parser.parse_args(argv)
+    if args.compact:
+        parser.error('--compact is an option of tinydb-dump; '
+                     'use --compact-memory')
+    for option in ('compact_memory', 'lazy'):
+        if not getattr(args, option):
+            continue
+        flag = '--' + option.replace('_', '-')
+        if args.storage != 'json':
+            parser.error(f'{flag} is only available with --storage json')
+        if args.json_backend is not None:
+            # these storages decode the DB by themselves
+            parser.error(f'--json-backend is not available with {flag}')
+    if args.compact_memory and args.lazy:
+        parser.error('--compact-memory and --lazy are exclusive')
+    if args.scan_fraction is not None and not 0 < args.scan_fraction <= 1:
+        parser.error('--scan-fraction must be in (0, 1]')
+    if args.scan_docs is not None and args.scan_docs <= 0:
+        parser.error('--scan-docs must be positive')
+    if args.scan_fraction is not None and args.scan_docs is not None:
+        parser.error('--scan-fraction and --scan-docs are exclusive')
+    if args.scan_fraction is not None or args.scan_docs is not None:
+        for option in ('limit', 'after', 'cache_dir', 'zonemap', 'trigram',
+                       'watch', 'analyze'):
+            if getattr(args, option) not in (None, False):
+                option = option.replace('_', '-')
+                parser.error(f'--{option} is not available with a partial scan')
+    if args.workers is not None and args.workers <= 0:
+        parser.error('--workers must be positive')
+    if args.analyze_sample is not None and not 0 < args.analyze_sample <= 1:
+        parser.error('--analyze-sample must be in (0, 1]')
+    if args.ids_only:
+        for option in ('count', 'with_index', 'count_distinct', 'analyze',
+                       'watch', 'scan_fraction', 'scan_docs'):
+            if getattr(args, option) not in (None, False):
+                option = option.replace('_', '-')
+                parser.error(f'--{option} is not available with --ids-only')
+    if args.hll_precision is not None:
+        if args.count_distinct is None:
+            parser.error('--hll-precision needs --count-distinct')
+        if not MIN_PRECISION <= args.hll_precision <= MAX_PRECISION:
+            parser.error(f'--hll-precision must be in [{MIN_PRECISION}, '
+                         f'{MAX_PRECISION}]')
+    if args.count_distinct is not None:
+        for option in ('count', 'with_index', 'sample', 'limit', 'after',
+                       'watch', 'analyze', 'scan_fraction', 'scan_docs'):
+            if getattr(args, option) not in (None, False):
+                option = option.replace('_', '-')
+                parser.error(
+                    f'--{option} is not available with --count-distinct'
+                )
+    args.fanout = args.db_path is not None and is_pattern(args.db_path)
+    if args.fanout:
+        for option in ('with_index', 'sample', 'limit', 'after', 'watch',
+                       'cache_dir', 'zonemap', 'trigram', 'analyze',
+                       'scan_fraction', 'scan_docs'):
+            if getattr(args, option) not in (None, False):
+                option = option.replace('_', '-')
+                parser.error(f'--{option} is not available with a glob pattern')
+    if args.limit is not None and args.limit <= 0:
+        parser.error('--limit must be positive')
+    if args.zonemap_block <= 0:
+        parser.error('--zonemap-block must be positive')
     if args.max_depth is not None:
         args.max_depth_specified = True
         args.max_depth = positive_or_none(args.max_depth)
@@ -89,51 +326,357 @@ def main():
         return 0
     except QLSyntaxError as exc:
         print(f'Query-syntax error: {str(exc)}', file=sys.stderr)
+    except BudgetExceeded as exc:
+        print(f'Query aborted: {str(exc)}', file=sys.stderr)
+        sys.exit(-2)
     except (FileNotFoundError, IsADirectoryError, RuntimeError) as exc:
         print(str(exc), file=sys.stderr)
     sys.exit(-1)
 
 
+def parse_query(text):
+    try:
+        return json.loads(text)
+    except json.decoder.JSONDecodeError as exc:
+        raise QLSyntaxError(str(exc)) from exc
+
+
+def storage_class(args):
+    if args.compact_memory:
+        return CompactJSONStorage
+    if args.lazy:
+        return LazyJSONStorage
+    if args.storage == 'json':
+        return functools.partial(
+            SelectiveJSONStorage, codec=get_codec(args.json_backend)
+        )
+    return STORAGES[args.storage]
+
+
+def describe_table(table_name):
+    if table_name is None:
+        return 'default table'
+    return f'table {table_name}'
+
+
+def budget_of(args):
+    return {
+        'max_scan': args.max_scan, 'timeout': args.timeout,
+        'max_results': args.max_results
+    }
+
+
+def run_query(args, db, tree, query, cache):
+    budget = budget_of(args)
+    # returns (documents, next page, number of matching documents)
+    if args.limit is not None or args.after is not None:
+        result, next_page = search_page(
+            db, query, limit=args.limit, after=args.after, **budget
+        )
+        if args.ids_only:
+            result = [doc.doc_id for doc in result]
+        return result, next_page, len(result)
+    if cache is not None:
+        doc_ids = cache.get(args.db_path, args.table, tree.data)
+        if doc_ids is not None:
+            # (the matches of an exceeded budget are doc_ids here)
+            check_max_results(doc_ids, args.max_results)
+            if args.ids_only:
+                return doc_ids, None, len(doc_ids)
+            result = fetch_documents(db, doc_ids)
+            return result, None, len(result)
+    zonemap = documents = None
+    if args.zonemap:
+        zonemap = ZoneMap.load(args.db_path, args.zonemap_block)
+        documents = zonemap.documents(db, tree)
+    if args.trigram:
+        index = TrigramIndex.load(args.db_path)
+        index.add_paths(db, args.trigram)
+        if index.modified:
+            index.save(args.db_path)
+        documents = index.documents(db, tree, documents)
+    if args.sample is not None and not any(budget.values()):
+        # the sample is drawn while scanning, the whole result is never kept
+        result, result_count = reservoir_search(
+            db, query, args.sample, documents=documents
+        )
+        if args.ids_only:
+            result = [doc.doc_id for doc in result]
+        cache = None
+    elif args.ids_only:
+        result = search_ids(db, query, documents=documents, **budget)
+        result_count = len(result)
+    else:
+        result = search(db, query, documents=documents, **budget)
+        result_count = len(result)
+    if zonemap is not None and zonemap.modified:
+        zonemap.save(args.db_path)
+    if cache is not None:
+        cache.put(args.db_path, args.table, tree.data, [
+            doc_id_of(args, item) for item in result
+        ])
+    return result, None, result_count
+
+
+def doc_id_of(args, item):
+    # the results are doc_ids with --ids-only
+    return item if args.ids_only else item.doc_id
+
+
+def describe_estimate(estimate):
+    return (
+        f'estimated total: {estimate.total:.0f} ({estimate.confidence:.0%} '
+        f'confidence interval: {estimate.low:.0f}-{estimate.high:.0f})'
+    )
+
+
 def _main(argv):
     args = parse_args(argv[1:])
+    log_path = args.query_log or os.environ.get(ENV_QUERY_LOG)
+    if log_path and is_logged(args):
+        with QueryLog(log_path).capture(
+                parse_query(args.query), args.table, args.db_path,
+                {name: getattr(args, name) for name in OPTIONS}
+        ) as entry:
+            entry['results'] = run_timed(args)
+        return
+    run_timed(args)
+
+
+def is_logged(args):
+    # the queries on a single DB file
+    return args.db_path is not None and not (
+        args.schema or args.fanout or args.watch is not None or args.analyze
+        or args.count_distinct is not None
+    )
+
+
+def run_timed(args):
+    if not args.timings:
+        return run(args)
+    report = timing.Report()
+    timing.add_hook(report)
+    tracemalloc.start()
+    try:
+        report(timing.imports_timing())
+        return run(args)
+    finally:
+        tracemalloc.stop()
+        timing.remove_hook(report)
+        print(json.dumps(report.dump()), file=sys.stderr)
+
+
+def run(args):
     if args.schema:
         if args.json:
             json.dump(Schema(), sys.stdout, indent=4)
             print()
         else:
-            pprint.pp(Schema())
+            pp(Schema())
+        return
+    ql = parse_query(args.query)
+    # syntax errors before loading the DB; the tree is not validated again
+    tree = parse(ql)
+    if args.count_distinct is not None:
+        with phase('count_distinct'):
+            run_count_distinct(args, tree)
+        return
+    if args.fanout:
+        with phase('fanout'):
+            run_fanout(args, tree)
+        return
+    if args.analyze:
+        with phase('analyze'):
+            run_analyze(args, tree)
+        return
+    if args.watch is not None:
+        check_db_path(args.db_path)
+        watcher = Watcher(
+            args.db_path, args.table, Query(tree), storage_class(args)
+        )
+        with contextlib.suppress(KeyboardInterrupt):
+            watch(watcher, args.watch, args.json, sys.stdout)
+        return
+    cache = None
+    if args.cache_dir is not None:
+        cache = ResultCache(args.cache_dir, args.cache_size)
+    paging = args.limit is not None or args.after is not None
+    if args.count and cache is not None and not paging:
+        check_db_path(args.db_path)
+        doc_ids = cache.get(args.db_path, args.table, ql)
+        if doc_ids is not None:
+            # answered without opening the DB at all
+            check_max_results(doc_ids, args.max_results)
+            show_count(len(doc_ids), describe_table(args.table))
+            return len(doc_ids)
+    estimate = None
+    with load_data(
+            args.db_path, args.table, storage_class(args)
+    ) as (db, table_msg):
+        query = Query(tree, database=db)
+        with phase('scan'):
+            if args.scan_fraction is not None or args.scan_docs is not None:
+                result, estimate = estimate_search(
+                    db, query, fraction=args.scan_fraction,
+                    size=args.scan_docs
+                )
+                next_page, result_count = None, len(result)
+            else:
+                result, next_page, result_count = run_query(
+                    args, db, tree, query, cache
+                )
+    with phase('output'):
+        show_result(args, result, next_page, result_count, estimate, table_msg)
+    return result_count
+
+
+def show_result(args, result, next_page, result_count, estimate, table_msg):
+    # pylint: disable = too-many-arguments
+    if estimate is not None:
+        table_msg = (
+            f'{estimate.scanned} of {estimate.population} documents '
+            f'on the {table_msg}'
+        )
+        if args.count:
+            print(round(estimate.total))
+            print(f'found {result_count} documents in {table_msg}; '
+                  f'{describe_estimate(estimate)}.', file=sys.stderr)
+            return
+    elif args.count:
+        show_count(result_count, table_msg)
         return
-    with load_data(args.db_path, args.table) as (db, table_msg):
-        try:
-            query = Query(json.loads(args.query))
-        except json.decoder.JSONDecodeError as exc:
-            raise QLSyntaxError(str(exc)) from exc
-        result = db.search(query)
-    result_count = len(result)
-    if len(result) > 1 or args.max_depth_specified:
+    if result_count > 1 or args.max_depth_specified:
         pp_options = {
             'depth': args.max_depth + 1 if args.max_depth is not None else None
         }
     else:
         pp_options = {}
     plural = '' if result_count == 1 else 's'
-    summary_txt = f'found {result_count} document{plural} on the {table_msg}'
+    if estimate is not None:
+        summary_txt = (
+            f'found {result_count} document{plural} in {table_msg}; '
+            f'{describe_estimate(estimate)}'
+        )
+    else:
+        summary_txt = f'found {result_count} document{plural} on the {table_msg}'
+    if next_page is not None:
+        summary_txt += f' (next page: --after {doc_id_of(args, result[-1])})'
     if args.sample is not None:
         sample_count = min(result_count, args.sample)
-        result = sorted(random.sample(result, sample_count), key=lambda x: x.doc_id)
+        if len(result) > sample_count:
+            # not sampled while scanning (a page, a cached or budgeted result)
+            result = sorted(
+                random.sample(result, sample_count),
+                key=functools.partial(doc_id_of, args)
+            )
         summary_txt += f' ({sample_count} sampled).'
     else:
         summary_txt += '.'
+    if args.ids_only:
+        if args.json:
+            print(json.dumps(result))
+        else:
+            sys.stdout.writelines(f'{doc_id}\n' for doc_id in result)
+        print(summary_txt, file=sys.stderr)
+        return
     if args.with_index:
         result = {doc.doc_id: doc for doc in result}
+    if args.compact_memory or args.lazy:
+        result = to_builtin(result)
     if args.json:
         if isinstance(result, dict):
             result = {str(key): value for key, value in result.items()}
-        print(json.dumps(result))
+        print(get_codec(args.json_backend).dumps(result))
     else:
-        pprint.pp(result, **pp_options)
+        pp(result, **pp_options)
     print(summary_txt, file=sys.stderr)
 
 
+def run_analyze(args, tree):
+    with load_data(args.db_path, args.table, storage_class(args)) as (db, _):
+        report = analyze.analyze(
+            db, Query(tree, database=db), sample=args.analyze_sample
+        )
+    if args.analyze_output is not None:
+        analyze.save(report, args.analyze_output)
+    if args.json:
+        print(get_codec(args.json_backend).dumps(report))
+    else:
+        print(analyze.format_text(report))
+
+
+def run_count_distinct(args, tree):
+    path, precision = args.count_distinct, args.hll_precision
+    budget = budget_of(args)
+    if args.fanout:
+        # the counters of the files are merged
+        paths = expand_paths(args.db_path)
+        counter = count_files(
+            paths, tree, path, precision=precision, table_name=args.table,
+            storage=storage_class(args), workers=args.workers, **budget
+        )
+        table_msg = f'{describe_table(args.table)} of {len(paths)} files'
+    else:
+        with load_data(
+                args.db_path, args.table, storage_class(args)
+        ) as (db, table_msg):
+            query = Query(tree, database=db)
+            counter = count_distinct(
+                db, query, path, precision=precision, **budget
+            )
+    count = counter.count()
+    print(count)
+    plural = '' if count == 1 else 's'
+    summary_txt = f'{count} distinct value{plural} of {path} on the {table_msg}'
+    if precision is not None:
+        summary_txt += f' (estimated, standard error: {counter.error:.1%})'
+    print(summary_txt + '.', file=sys.stderr)
+
+
+def run_fanout(args, tree):
+    # streams the matching documents of each file, tagged with the file
+    paths = expand_paths(args.db_path)
+    codec = get_codec(args.json_backend)
+    result_count = 0
+    for path, documents in search_files(
+            paths, tree, table_name=args.table, storage=storage_class(args),
+            workers=args.workers, order=args.merge_order, **budget_of(args)
+    ):
+        result_count += len(documents)
+        if args.count:
+            continue
+        for doc in documents:
+            if args.ids_only:
+                if args.json:
+                    print(codec.dumps({
+                        'file': str(path), 'doc_id': doc.doc_id
+                    }))
+                else:
+                    print(f'{path}:{doc.doc_id}')
+            elif args.json:
+                print(codec.dumps({
+                    'file': str(path), 'doc_id': doc.doc_id,
+                    'document': to_builtin(doc)
+                }))
+            else:
+                text = pformat(to_builtin(doc), depth=args.max_depth)
+                print(f'{path}:{doc.doc_id}: {text}')
+        sys.stdout.flush()
+    table_msg = f'{describe_table(args.table)} of {len(paths)} files'
+    if args.count:
+        show_count(result_count, table_msg)
+        return
+    plural = '' if result_count == 1 else 's'
+    print(f'found {result_count} document{plural} on the {table_msg}.',
+          file=sys.stderr)
+
+
+def show_count(result_count, table_msg):
+    print(result_count)
+    plural = '' if result_count == 1 else 's'
+    print(f'found {result_count} document{plural} on the {table_msg}.',
+          file=sys.stderr)
+
+
 if __name__ == '__main__':
     main()
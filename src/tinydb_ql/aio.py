@@ -0,0 +1,52 @@
+import asyncio
+import itertools
+
+from .scan import compile_query, make_document, raw_documents
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _evaluate(cond, chunk):
+    return [(doc_id, doc) for doc_id, doc in chunk if cond(doc)]
+
+
+async def aiter_search(table, query, *, chunk_size=DEFAULT_CHUNK_SIZE,
+                       executor=None):
+    # evaluate `chunk_size` documents at a time, and give the control back
+    # to the event loop in between; with an executor, each chunk is evaluated
+    # there instead, and the loop stays free during the evaluation.
+    # Cancelling the task stops the scan at the next chunk boundary
+    # (a chunk already handed to an executor runs to its end).
+    if chunk_size <= 0:
+        raise ValueError('chunk_size must be positive')
+    cond = compile_query(query)
+    loop = asyncio.get_running_loop()
+    if executor is None:
+        documents = iter(raw_documents(table))
+    else:
+        # reading the table may load the whole DB file
+        documents = iter(
+            await loop.run_in_executor(executor, raw_documents, table)
+        )
+    while True:
+        chunk = list(itertools.islice(documents, chunk_size))
+        if not chunk:
+            return
+        if executor is None:
+            matches = _evaluate(cond, chunk)
+        else:
+            matches = await loop.run_in_executor(
+                executor, _evaluate, cond, chunk
+            )
+        for doc_id, doc in matches:
+            yield make_document(table, doc_id, doc)
+        await asyncio.sleep(0)
+
+
+async def asearch(table, query, *, chunk_size=DEFAULT_CHUNK_SIZE,
+                  executor=None):
+    return [
+        doc async for doc in aiter_search(
+            table, query, chunk_size=chunk_size, executor=executor
+        )
+    ]
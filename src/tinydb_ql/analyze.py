@@ -0,0 +1,155 @@
+import json
+import random
+import reprlib
+
+from .scan import compile_query, raw_documents
+from .zonemap import kind_of
+
+# the number of distinct values counted exactly per path
+MAX_DISTINCT = 10000
+SCALAR_KINDS = {'null', 'boolean', 'number', 'string'}
+
+
+def length_bucket(length):
+    # 0, 1, 2-3, 4-7, 8-15, ...
+    if length < 2:
+        return str(length)
+    low = 1 << (length.bit_length() - 1)
+    return f'{low}-{2 * low - 1}'
+
+
+class _PathStats:
+    __slots__ = ('count', 'kinds', 'distinct', 'capped', 'ranges', 'lengths')
+
+    def __init__(self):
+        self.count = 0
+        self.kinds = {}
+        self.distinct = set()
+        self.capped = False
+        # kind -> [min, max] for numbers and strings
+        self.ranges = {}
+        self.lengths = {}
+
+    def add(self, value, kind):
+        self.count += 1
+        self.kinds[kind] = self.kinds.get(kind, 0) + 1
+        if kind in SCALAR_KINDS and not self.capped:
+            self.distinct.add((kind, value))
+            if len(self.distinct) > MAX_DISTINCT:
+                self.capped = True
+                self.distinct.clear()
+        if kind in ('number', 'string'):
+            bounds = self.ranges.get(kind)
+            if bounds is None:
+                self.ranges[kind] = [value, value]
+            elif value < bounds[0]:
+                bounds[0] = value
+            elif value > bounds[1]:
+                bounds[1] = value
+        elif kind == 'array':
+            bucket = length_bucket(len(value))
+            self.lengths[bucket] = self.lengths.get(bucket, 0) + 1
+
+    def dump(self, path, sampled):
+        result = {'count': self.count}
+        if '[]' not in path:
+            # array elements (and their fields) may appear many times per
+            # document
+            result['frequency'] = self.count / sampled if sampled else 0.0
+        result['types'] = dict(sorted(self.kinds.items()))
+        if SCALAR_KINDS & set(self.kinds):
+            # a lower bound when capped
+            result['cardinality'] = (
+                MAX_DISTINCT if self.capped else len(self.distinct)
+            )
+            result['cardinality_capped'] = self.capped
+        for kind, (low, high) in sorted(self.ranges.items()):
+            result[f'{kind}_range'] = [low, high]
+        if self.lengths:
+            result['array_lengths'] = dict(sorted(
+                self.lengths.items(), key=lambda item: int(
+                    item[0].split('-')[0]
+                )
+            ))
+        return result
+
+
+def _collect(stats, value, path):
+    kind = kind_of(value)
+    field = stats.get(path)
+    if field is None:
+        field = stats[path] = _PathStats()
+    field.add(value, kind)
+    if kind == 'object':
+        for key, elem in value.items():
+            _collect(stats, elem, f'{path}.{key}' if path else key)
+    elif kind == 'array':
+        for elem in value:
+            _collect(stats, elem, f'{path}[]')
+
+
+def analyze(table, query=None, sample=None, rng=random):
+    # per-path statistics of the documents (matching `query`) in one pass;
+    # `sample`: the fraction of the documents to look at.
+    # Array elements are under "<path>[]", the document itself is "".
+    cond = compile_query(query) if query is not None else None
+    stats = {}
+    scanned = sampled = 0
+    for _, document in raw_documents(table):
+        scanned += 1
+        if sample is not None and rng.random() >= sample:
+            continue
+        if cond is not None and not cond(document):
+            continue
+        sampled += 1
+        _collect(stats, document, '')
+    stats.pop('', None)
+    return {
+        'table': table.name,
+        'scanned': scanned,
+        'documents': sampled,
+        'sample': sample,
+        'fields': {
+            path: field.dump(path, sampled)
+            for path, field in sorted(stats.items())
+        }
+    }
+
+
+def format_text(report):
+    sample = report['sample']
+    lines = [
+        f"table {report['table']}: {report['documents']} documents"
+        + (f" (sampled {sample:g} of {report['scanned']})"
+           if sample is not None else '')
+    ]
+    for path, field in report['fields'].items():
+        if 'frequency' in field:
+            lines.append(
+                f"{path}: {field['count']} ({100 * field['frequency']:.1f}%)"
+            )
+        else:
+            lines.append(f"{path}: {field['count']}")
+        lines.append('  types: ' + ', '.join(
+            f'{kind} {count}' for kind, count in field['types'].items()
+        ))
+        if 'cardinality' in field:
+            capped = '>= ' if field['cardinality_capped'] else ''
+            lines.append(f"  distinct: {capped}{field['cardinality']}")
+        for kind in ('number', 'string'):
+            if f'{kind}_range' in field:
+                low, high = field[f'{kind}_range']
+                lines.append(
+                    f'  {kind}: {reprlib.repr(low)} .. {reprlib.repr(high)}'
+                )
+        if 'array_lengths' in field:
+            lines.append('  lengths: ' + ', '.join(
+                f'{bucket}: {count}'
+                for bucket, count in field['array_lengths'].items()
+            ))
+    return '\n'.join(lines)
+
+
+def save(report, path):
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump(report, stream, indent=1, ensure_ascii=False)
@@ -0,0 +1,83 @@
+import collections
+import math
+import random
+import statistics
+
+from .scan import compile_query, make_document, raw_documents, search
+
+DEFAULT_CONFIDENCE = 0.95
+
+# `total` matching documents estimated from `matches` in a sample of
+# `scanned` out of `population` documents, within [low, high] at the
+# `confidence` level
+Estimate = collections.namedtuple('Estimate', [
+    'scanned', 'population', 'matches', 'total', 'low', 'high', 'confidence'
+])
+
+
+def estimate_total(matches, scanned, population,
+                   confidence=DEFAULT_CONFIDENCE):
+    # Wilson score interval, narrowed by the finite population correction
+    if scanned >= population:
+        return Estimate(
+            scanned, population, matches, matches, matches, matches,
+            confidence
+        )
+    if scanned == 0:
+        return Estimate(0, population, 0, None, 0, population, confidence)
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    ratio = matches / scanned
+    scale = 1 + z * z / scanned
+    center = (ratio + z * z / (2 * scanned)) / scale
+    half = z * math.sqrt(
+        ratio * (1 - ratio) / scanned + z * z / (4 * scanned * scanned)
+    ) / scale
+    half *= math.sqrt((population - scanned) / (population - 1))
+    # the sampled documents are known to (not) match
+    low = max(matches, population * (center - half))
+    high = min(population - (scanned - matches), population * (center + half))
+    return Estimate(
+        scanned, population, matches, population * ratio, low, high,
+        confidence
+    )
+
+
+def estimate_search(table, query, *, fraction=None, size=None,
+                    confidence=DEFAULT_CONFIDENCE, rng=random):
+    # evaluates the query on a uniform random sample of `size` documents
+    # (or of a `fraction` of the table); returns the matching documents of
+    # the sample (in the storage order) and the Estimate of the total
+    documents = list(raw_documents(table))
+    population = len(documents)
+    if size is None:
+        # at least one document, for an estimate of a small table
+        size = max(1, round(population * fraction))
+    size = min(size, population)
+    positions = sorted(rng.sample(range(population), size))
+    matches = search(
+        table, query, documents=[documents[pos] for pos in positions]
+    )
+    return matches, estimate_total(len(matches), size, population, confidence)
+
+
+def reservoir_search(table, query, size, *, documents=None, rng=random):
+    # up to `size` of the matching documents drawn uniformly (sorted by
+    # doc_id), and the number of matches, keeping O(size) documents
+    cond = compile_query(query)
+    if documents is None:
+        documents = raw_documents(table)
+    reservoir = []
+    matches = 0
+    for doc_id, doc in documents:
+        if not cond(doc):
+            continue
+        if matches < size:
+            reservoir.append((doc_id, doc))
+        else:
+            pos = rng.randrange(matches + 1)
+            if pos < size:
+                reservoir[pos] = (doc_id, doc)
+        matches += 1
+    result = [make_document(table, doc_id, doc) for doc_id, doc in reservoir]
+    result.sort(key=lambda doc: doc.doc_id)
+    return result, matches
@@ -0,0 +1,169 @@
+import collections
+import itertools
+import sys
+
+import tinydb
+
+from .planner import fold
+from .scan import canonical_query, make_document
+from .tinydb_ql import Lookup, Param, bind_database, parse
+
+DEFAULT_BITMAP_CACHE_SIZE = 64 << 20
+
+
+def _render_leaf(node, path):
+    current = tinydb.Query()
+    for key in path:
+        current = current[key]
+    return node.render(current)
+
+
+def _cacheable(node):
+    # $lookup depends on another table, and $param on the bound values
+    return not any(isinstance(elem, (Lookup, Param)) for elem in node.walk())
+
+
+class _BitmapVisitor:
+    # bit i of a bitmap: whether the i-th document (in the storage order)
+    # matches; the negation is exact (tinydb's ~ is a plain "not").
+    # Like tinydb's & and |, which short-circuit, each predicate is only
+    # decided on the `domain`: the documents its and/or has not decided yet.
+    # Every value is a subset of the domain it was folded on.
+    bottom = 0
+
+    def __init__(self, cache, table_name, documents):
+        self.cache = cache
+        self.table_name = table_name
+        self.documents = documents
+        self.top = self.domain = (1 << len(documents)) - 1
+
+    def leaf(self, node, path):
+        return self.cache.leaf_bitmap(
+            self.table_name, self.documents, node, path, self.domain
+        )
+
+    def meet(self, values):
+        domain = result = self.domain
+        try:
+            for value in values:
+                result &= value
+                self.domain = result
+        finally:
+            self.domain = domain
+        return result
+
+    def join(self, values):
+        domain = self.domain
+        result = 0
+        try:
+            for value in values:
+                result |= value
+                self.domain = domain ^ result
+        finally:
+            self.domain = domain
+        return result
+
+    def negate(self, value):
+        return self.domain ^ value
+
+
+def evaluate(cond, documents, domain=None):
+    # the bitmap of the documents matching `cond`, in a single pass; only
+    # the documents of the `domain` bitmap are evaluated
+    if not documents:
+        return 0
+    if domain is None:
+        return int(''.join([
+            '1' if cond(doc) else '0' for _, doc in reversed(documents)
+        ]), 2)
+    flags = format(domain, 'b')[::-1]
+    return int(''.join(reversed([
+        '1' if flag == '1' and cond(doc) else '0'
+        for flag, (_, doc) in zip(flags, documents)
+    ])), 2)
+
+
+def select(documents, bitmap):
+    # the documents of the bits set
+    flags = format(bitmap, 'b')[::-1]
+    return itertools.compress(documents, map('1'.__eq__, flags))
+
+
+class BitmapCache:
+    # bitmaps of the leaf predicates (keyed by the table, the field path and
+    # the canonicalized predicate), combined with set algebra over the
+    # and/or/not structure of each query. A table is identified by its raw
+    # dict, which tinydb replaces on every write; the entries of a table are
+    # dropped once it changes. The least recently used bitmaps are evicted to
+    # keep their total size under `max_bytes`.
+    def __init__(self, max_bytes=DEFAULT_BITMAP_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = self.misses = 0
+        # table name -> (raw table dict, [(doc_id, document), ...])
+        self._tables = {}
+        self._bitmaps = collections.OrderedDict()
+
+    def _documents(self, table):
+        # pylint: disable = protected-access
+        raw_table = table._read_table()
+        state = self._tables.get(table.name)
+        if state is None or state[0] is not raw_table:
+            self.invalidate(table.name)
+            # keeping the dict keeps its identity from being reused
+            state = self._tables[table.name] = (
+                raw_table, list(raw_table.items())
+            )
+        return state[1]
+
+    def invalidate(self, table_name=None):
+        # drops the bitmaps of a table (or of all the tables)
+        for key in list(self._bitmaps):
+            if table_name is None or key[0] == table_name:
+                self.size -= sys.getsizeof(self._bitmaps.pop(key))
+        if table_name is None:
+            self._tables.clear()
+        else:
+            self._tables.pop(table_name, None)
+
+    def _put(self, key, bitmap):
+        self._bitmaps[key] = bitmap
+        self.size += sys.getsizeof(bitmap)
+        while self.size > self.max_bytes and self._bitmaps:
+            _, evicted = self._bitmaps.popitem(last=False)
+            self.size -= sys.getsizeof(evicted)
+
+    def leaf_bitmap(self, table_name, documents, node, path, domain):
+        # the documents of `domain` matching the predicate; the bitmap of all
+        # the documents is cached, unless the predicate raises out of domain
+        if not _cacheable(node):
+            return evaluate(_render_leaf(node, path), documents, domain)
+        key = (
+            table_name, path, type(node).__name__, canonical_query(node.data)
+        )
+        bitmap = self._bitmaps.get(key)
+        if bitmap is not None:
+            self.hits += 1
+            self._bitmaps.move_to_end(key)
+            return bitmap & domain
+        self.misses += 1
+        cond = _render_leaf(node, path)
+        try:
+            bitmap = evaluate(cond, documents)
+        except Exception:  # pylint: disable = broad-except
+            # e.g., a comparison of types guarded by an earlier $types
+            return evaluate(cond, documents, domain)
+        self._put(key, bitmap)
+        return bitmap & domain
+
+    def search(self, table, query, database=None):
+        # the same documents as tinydb_ql.search(table, query);
+        # `database` is for $lookup (see tinydb_ql.Query)
+        tree = parse(query)
+        bind_database(tree, database)
+        documents = self._documents(table)
+        bitmap = fold(tree, _BitmapVisitor(self, table.name, documents))
+        return [
+            make_document(table, doc_id, doc)
+            for doc_id, doc in select(documents, bitmap)
+        ]
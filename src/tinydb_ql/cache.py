@@ -0,0 +1,93 @@
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import tinydb
+
+from .scan import canonical_query
+
+DEFAULT_CACHE_SIZE = 64 << 20
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:20]
+
+
+def db_fingerprint(dbpath):
+    stat = os.stat(dbpath)
+    return f'{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}'
+
+
+class ResultCache:
+    # the matching doc_ids of a query, stored in `directory` as
+    #   <path digest>-<DB fingerprint digest>-<query digest>.json
+    # a DB file rewrite changes its fingerprint, which invalidates
+    # (and removes) all the entries of the old file content.
+    # Entries are evicted in the least-recently-used order to keep the
+    # total size under `max_bytes`.
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_SIZE):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _entry_names(self, dbpath, table_name, query):
+        path_digest = _digest(str(Path(dbpath).resolve()))
+        fingerprint = _digest(db_fingerprint(dbpath))
+        table_name = table_name or tinydb.TinyDB.default_table_name
+        query_digest = _digest(f'{table_name}\n{canonical_query(query)}')
+        return path_digest, f'{path_digest}-{fingerprint}-{query_digest}.json'
+
+    def _invalidate(self, path_digest, current):
+        for entry in self.directory.glob(f'{path_digest}-*.json'):
+            if entry.name.split('-')[1] != current.split('-')[1]:
+                with contextlib.suppress(FileNotFoundError):
+                    entry.unlink()
+
+    def get(self, dbpath, table_name, query):
+        path_digest, name = self._entry_names(dbpath, table_name, query)
+        entry = self.directory / name
+        try:
+            with entry.open() as stream:
+                doc_ids = json.load(stream)['doc_ids']
+        except FileNotFoundError:
+            self._invalidate(path_digest, name)
+            return None
+        except (ValueError, KeyError):
+            return None
+        with contextlib.suppress(FileNotFoundError):
+            entry.touch()  # LRU order is kept as the mtime
+        return doc_ids
+
+    def put(self, dbpath, table_name, query, doc_ids):
+        path_digest, name = self._entry_names(dbpath, table_name, query)
+        self._invalidate(path_digest, name)
+        content = json.dumps({
+            'db': str(dbpath), 'table': table_name,
+            'query': canonical_query(query), 'doc_ids': list(doc_ids)
+        })
+        # write to a temporary file first, so that concurrent readers
+        # never see a partially-written entry
+        handle, temp_name = tempfile.mkstemp(
+            dir=self.directory, suffix='.tmp'
+        )
+        with os.fdopen(handle, 'w') as stream:
+            stream.write(content)
+        os.replace(temp_name, self.directory / name)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in self.directory.glob('*.json'):
+            with contextlib.suppress(FileNotFoundError):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda x: x[0]):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                entry.unlink()
+            total -= size
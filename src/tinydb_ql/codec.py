@@ -0,0 +1,120 @@
+import collections
+import io
+import json
+import math
+import os
+import re
+
+from tinydb.storages import JSONStorage
+
+from .timing import phase
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+ENV_BACKEND = 'TINYDB_QL_JSON_BACKEND'
+
+# `loads` takes a str or bytes, `dumps` returns a str
+Codec = collections.namedtuple('Codec', ['name', 'loads', 'dumps'])
+
+STDLIB = Codec('json', json.loads, json.dumps)
+
+# a run of digits which may be an integer over 64 bits (or in a string)
+_LONG_DIGITS = re.compile(r'[0-9]{19}')
+_LONG_DIGITS_BYTES = re.compile(rb'[0-9]{19}')
+
+
+def _orjson_loads(text):
+    pattern = _LONG_DIGITS_BYTES if isinstance(text, bytes) else _LONG_DIGITS
+    if pattern.search(text):
+        # orjson reads the integers over 64 bits as floats
+        return json.loads(text)
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # e.g., NaN/Infinity, which the json module accepts
+        return json.loads(text)
+
+
+def _has_nonfinite(data):
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(map(_has_nonfinite, data.values()))
+    if isinstance(data, (list, tuple)):
+        return any(map(_has_nonfinite, data))
+    return False
+
+
+def _orjson_dumps(data):
+    try:
+        text = orjson.dumps(data)
+    except orjson.JSONEncodeError:
+        # e.g., integers over 64 bits, or non-str keys
+        return json.dumps(data)
+    if b'null' in text and _has_nonfinite(data):
+        # orjson writes NaN/Infinity as null, the json module keeps them
+        return json.dumps(data)
+    return text.decode()
+
+
+BACKENDS = {'json': STDLIB}
+if orjson is not None:
+    BACKENDS['orjson'] = Codec('orjson', _orjson_loads, _orjson_dumps)
+
+BACKEND_NAMES = ['auto', 'orjson', 'json']
+
+
+def get_codec(name=None):
+    # `name` defaults to $TINYDB_QL_JSON_BACKEND, then to 'auto'
+    # (the fastest available backend)
+    if name is None:
+        name = os.environ.get(ENV_BACKEND) or 'auto'
+    if name == 'auto':
+        return BACKENDS.get('orjson', STDLIB)
+    if name not in BACKEND_NAMES:
+        raise RuntimeError(
+            f'unknown JSON backend: {name} (choose from {BACKEND_NAMES})'
+        )
+    if name not in BACKENDS:
+        raise RuntimeError(f'JSON backend {name} is not installed')
+    return BACKENDS[name]
+
+
+class CodecJSONStorage(JSONStorage):
+    # a JSONStorage reading and writing the same files through a codec
+    def __init__(self, path, create_dirs=False, encoding=None,
+                 access_mode='r+', codec=None, **kwargs):
+        super().__init__(
+            path, create_dirs=create_dirs, encoding=encoding,
+            access_mode=access_mode, **kwargs
+        )
+        self.codec = codec if codec is not None else get_codec()
+
+    def read(self):
+        self._handle.seek(0, os.SEEK_END)
+        if not self._handle.tell():
+            return None
+        self._handle.seek(0)
+        with phase('read'):
+            text = self._handle.read()
+        with phase('decode'):
+            return self.codec.loads(text)
+
+    def write(self, data):
+        if self.kwargs:
+            # json.dump options (indent etc.) are left to JSONStorage
+            super().write(data)
+            return
+        self._handle.seek(0)
+        try:
+            self._handle.write(self.codec.dumps(data))
+        except io.UnsupportedOperation as exc:
+            raise IOError(
+                f'Cannot write to the database. Access mode is "{self._mode}"'
+            ) from exc
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._handle.truncate()
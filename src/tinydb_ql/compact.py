@@ -0,0 +1,111 @@
+import json
+import sys
+from collections.abc import Mapping
+
+from tinydb.storages import JSONStorage
+
+from .timing import phase
+
+# string values up to this length are interned (keys always are)
+MAX_INTERNED_LENGTH = 32
+
+
+class Shape:
+    # the keys shared by all the records with the same key set
+    __slots__ = ('keys', 'positions')
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.positions = {key: index for index, key in enumerate(keys)}
+
+
+class Record(Mapping):
+    # a read-only JSON object: a shared shape and a tuple of values
+    __slots__ = ('_shape', '_values')
+
+    def __init__(self, shape, values):
+        self._shape = shape
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._shape.positions[key]]
+
+    def __contains__(self, key):
+        return key in self._shape.positions
+
+    def __iter__(self):
+        return iter(self._shape.keys)
+
+    def __len__(self):
+        return len(self._values)
+
+    def items(self):
+        return zip(self._shape.keys, self._values)
+
+    def values(self):
+        return iter(self._values)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class CompactDecoder:
+    # an object_pairs_hook sharing the shapes and the recurring strings
+    def __init__(self, max_interned_length=MAX_INTERNED_LENGTH):
+        self.max_interned_length = max_interned_length
+        self.shapes = {}
+        self.strings = {}
+
+    def _intern(self, value):
+        if isinstance(value, str) and len(value) <= self.max_interned_length:
+            return self.strings.setdefault(value, value)
+        if isinstance(value, list):
+            return [self._intern(elem) for elem in value]
+        return value
+
+    def __call__(self, pairs):
+        keys = tuple(sys.intern(key) for key, _ in pairs)
+        shape = self.shapes.get(keys)
+        if shape is None:
+            if len(set(keys)) != len(keys):
+                # duplicated keys: the last one wins, as in a dict
+                return self(list(dict(pairs).items()))
+            shape = self.shapes[keys] = Shape(keys)
+        return Record(shape, tuple(self._intern(value) for _, value in pairs))
+
+
+def compact_tables(data):
+    # tinydb needs plain dicts of tables and of documents by doc_id
+    return {
+        table_name: dict(documents.items())
+        for table_name, documents in data.items()
+    }
+
+
+def loads(text):
+    return compact_tables(json.loads(text, object_pairs_hook=CompactDecoder()))
+
+
+def to_builtin(value):
+    # plain dicts and lists (e.g., for the output)
+    if isinstance(value, Mapping):
+        return {key: to_builtin(elem) for key, elem in value.items()}
+    if isinstance(value, list):
+        return [to_builtin(elem) for elem in value]
+    return value
+
+
+class CompactJSONStorage(JSONStorage):
+    # a read-only JSONStorage loading the documents as compact records
+    def read(self):
+        self._handle.seek(0, 2)
+        if not self._handle.tell():
+            return None
+        self._handle.seek(0)
+        with phase('read'):
+            text = self._handle.read()
+        with phase('decode'):
+            return loads(text)
+
+    def write(self, data):
+        raise OSError('the compact storage is read-only')
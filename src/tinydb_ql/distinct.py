@@ -0,0 +1,154 @@
+import functools
+import hashlib
+import json
+import math
+
+from .fanout import search_files
+from .scan import compile_query, raw_documents, search
+
+DEFAULT_PRECISION = 12
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+
+def value_key(value):
+    # the canonical JSON text of a value (1 and 1.0 are the same value,
+    # true and 1 are not)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return json.dumps(
+        value, sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+        default=dict
+    )
+
+
+def hash64(key):
+    return int.from_bytes(
+        hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big'
+    )
+
+
+class ExactCounter:
+    # the set of the canonical texts of the values
+    def __init__(self):
+        self.keys = set()
+
+    def add(self, value):
+        self.keys.add(value_key(value))
+
+    def merge(self, other):
+        self.keys |= other.keys
+        return self
+
+    def count(self):
+        return len(self.keys)
+
+
+class HyperLogLog:
+    # Flajolet et al.'s estimator over 2**precision one-byte registers
+    # (relative standard error: 1.04 / sqrt(2**precision)); sketches of the
+    # same precision are merged by taking the maximum of each register
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(
+                f'precision must be in [{MIN_PRECISION}, {MAX_PRECISION}]'
+            )
+        self.precision = precision
+        size = 1 << precision
+        self.registers = (
+            bytearray(registers) if registers is not None
+            else bytearray(size)
+        )
+        if len(self.registers) != size:
+            raise ValueError('the number of registers does not match')
+
+    @property
+    def error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, value):
+        hashed = hash64(value_key(value))
+        bits = 64 - self.precision
+        index = hashed >> bits
+        rest = hashed & ((1 << bits) - 1)
+        rank = bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('cannot merge sketches of different precisions')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(
+            2.0 ** -register for register in self.registers
+        )
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # linear counting for small cardinalities
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+    def dump(self):
+        return {'precision': self.precision, 'registers': self.registers.hex()}
+
+    @classmethod
+    def load(cls, data):
+        return cls(data['precision'], bytes.fromhex(data['registers']))
+
+
+def make_counter(precision=None):
+    # exact if `precision` is None
+    if precision is None:
+        return ExactCounter()
+    return HyperLogLog(precision)
+
+
+def add_values(counter, documents, path):
+    # adds the values at the dotted `path` of the documents (if any)
+    keys = path.split('.')
+    for document in documents:
+        value = document
+        try:
+            for key in keys:
+                value = value[key]
+        except (KeyError, TypeError):
+            continue
+        counter.add(value)
+    return counter
+
+
+def count_distinct(table, query, path, *, precision=None, documents=None,
+                   **budget):
+    # the counter (see make_counter) of the values at `path` of the documents
+    # matching the query, in one pass without keeping the documents (unless
+    # a budget, see scan.search, is set)
+    if any(budget.values()):
+        return add_values(
+            make_counter(precision),
+            search(table, query, documents=documents, **budget), path
+        )
+    cond = compile_query(query)
+    if documents is None:
+        documents = raw_documents(table)
+    return add_values(
+        make_counter(precision),
+        (doc for _, doc in documents if cond(doc)), path
+    )
+
+
+def count_files(paths, ql, path, *, precision=None, **options):
+    # one counter per file (see fanout.search_files for the options), built
+    # by the thread of the file, and merged into one as the files are done
+    total = make_counter(precision)
+    for _, counter in search_files(
+            paths, ql, order='arrival', collect=functools.partial(
+                count_distinct, path=path, precision=precision
+            ), **options
+    ):
+        total.merge(counter)
+    return total
@@ -0,0 +1,88 @@
+import concurrent.futures
+import glob
+import itertools
+import os
+from pathlib import Path
+
+import tinydb
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import JSONStorage
+
+from .scan import search
+from .tinydb_ql import Lookup, Query, TopLevel, parse
+
+MERGE_ORDERS = ['file', 'arrival']
+
+
+def is_pattern(dbpath):
+    return glob.has_magic(str(dbpath))
+
+
+def expand_paths(pattern):
+    paths = sorted(Path(path) for path in glob.glob(str(pattern)))
+    paths = [path for path in paths if path.is_file()]
+    if not paths:
+        raise FileNotFoundError(f'no input file matches {pattern}')
+    return paths
+
+
+def _search_file(path, table_name, tree, query, storage, collect, budget):
+    with tinydb.TinyDB(
+            path, access_mode='r', storage=CachingMiddleware(storage)
+    ) as db:
+        table = db if table_name is None else db.table(table_name)
+        if query is None:
+            # $lookup reads the other tables of the same file; binding the
+            # database to a tree shared by the threads would race, so each
+            # file has a tree of its own (from the data already validated)
+            query = Query(TopLevel(tree.data), database=db)
+        return collect(table, query, **budget)
+
+
+def search_files(paths, ql, *, table_name=None, storage=JSONStorage,
+                 workers=None, order='file', collect=search, **budget):
+    # pylint: disable = too-many-arguments
+    # yields (path, matching documents) of each file, evaluated by a pool of
+    # `workers` threads, in the order of `paths` or as soon as they are done;
+    # the budget (see scan.search) applies to each file. The thread of a file
+    # calls `collect(table, query, **budget)` (scan.search by default), and
+    # its return value is yielded in place of the documents. The threads overlap
+    # the file reads, but decoding and matching hold the GIL (except on a
+    # free-threaded CPython build).
+    if order not in MERGE_ORDERS:
+        raise ValueError(f'unknown merge order: {order}')
+    tree = parse(ql)
+    query = None
+    if not any(isinstance(node, Lookup) for node in tree.walk()):
+        query = tree.render(tinydb.Query())
+    if workers is None:
+        # the default of ThreadPoolExecutor
+        workers = min(32, (os.cpu_count() or 1) + 4)
+    paths = iter(paths)
+    # future -> path, in the order of the paths; at most 2 * workers files
+    # are in flight, and the results are dropped once yielded
+    pending = {}
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        def submit():
+            for path in itertools.islice(paths, 2 * workers - len(pending)):
+                pending[executor.submit(
+                    _search_file, path, table_name, tree, query, storage,
+                    collect, budget
+                )] = path
+
+        try:
+            submit()
+            while pending:
+                if order == 'file':
+                    future = next(iter(pending))
+                else:
+                    future = next(iter(concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
+                    ).done))
+                path = pending.pop(future)
+                result = future.result()
+                submit()
+                yield path, result
+        finally:
+            for future in pending:
+                future.cancel()
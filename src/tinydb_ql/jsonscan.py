@@ -0,0 +1,140 @@
+import json
+import re
+from json.decoder import scanstring
+
+# Skipping over JSON values without decoding them. The values are not
+# validated beyond what is needed to find their ends.
+
+_WS = re.compile(r'[ \t\n\r]*')
+# everything but brackets, with the strings (which may contain brackets)
+_SKIP = re.compile(r'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+_SCALAR = re.compile(r'[^\s,:\[\]{}"]+')
+_DECODER = json.JSONDecoder()
+
+# arrays and objects nested up to this depth are skipped by a single regex
+# match (which needs possessive quantifiers, python >= 3.11), the deeper ones
+# bracket by bracket
+MAX_NESTING = 6
+
+
+def _nested_pattern(depth):
+    atom = r'[^"\[\]{}]++|"[^"\\]*+(?:\\.[^"\\]*+)*+"'
+    pattern = atom
+    for _ in range(depth):
+        pattern = rf'[\[{{](?:{atom}|{pattern})*+[\]}}]'
+    return re.compile(pattern)
+
+
+try:
+    _NESTED = _nested_pattern(MAX_NESTING)
+except re.error:
+    _NESTED = None
+
+
+def _error(message, text, pos):
+    return json.JSONDecodeError(message, text, pos)
+
+
+def skip_whitespace(text, pos):
+    return _WS.match(text, pos).end()
+
+
+def skip_value(text, pos):
+    # the end of the value starting at `pos`
+    char = text[pos:pos + 1]
+    if char == '"':
+        return scanstring(text, pos + 1)[1]
+    if char not in ('{', '['):
+        match = _SCALAR.match(text, pos)
+        if match is None:
+            raise _error('Expecting value', text, pos)
+        return match.end()
+    if _NESTED is not None:
+        match = _NESTED.match(text, pos)
+        if match is not None:
+            return match.end()
+    depth = 0
+    while True:
+        if char in ('{', '['):
+            depth += 1
+        elif char in ('}', ']'):
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        else:
+            raise _error('Unterminated value', text, pos)
+        pos = _SKIP.match(text, pos + 1).end()
+        char = text[pos:pos + 1]
+
+
+def skip(text, pos):
+    # ((start, end), end) of the value at `pos`
+    end = skip_value(text, pos)
+    return (pos, end), end
+
+
+def open_object(text, pos):
+    # (position of the first member, None) of the object at `pos`, or
+    # (None, end) when it is empty
+    if text[pos:pos + 1] != '{':
+        raise _error('Expecting object', text, pos)
+    pos = skip_whitespace(text, pos + 1)
+    if text[pos:pos + 1] == '}':
+        return None, pos + 1
+    return pos, None
+
+
+def member_key(text, pos):
+    # (key, position of the value) of the object member at `pos`
+    if text[pos:pos + 1] != '"':
+        raise _error('Expecting property name', text, pos)
+    key, pos = scanstring(text, pos + 1)
+    pos = skip_whitespace(text, pos)
+    if text[pos:pos + 1] != ':':
+        raise _error("Expecting ':' delimiter", text, pos)
+    return key, skip_whitespace(text, pos + 1)
+
+
+def next_member(text, pos):
+    # (position of the next member, None) after a member value ending at
+    # `pos`, or (None, end of the object) after the last one
+    pos = skip_whitespace(text, pos)
+    char = text[pos:pos + 1]
+    if char == '}':
+        return None, pos + 1
+    if char != ',':
+        raise _error("Expecting ',' delimiter", text, pos)
+    return skip_whitespace(text, pos + 1), None
+
+
+def scan_object(text, pos, scan=skip):
+    # ({key: scanned value}, end) of the object at `pos`, where
+    # `scan(text, start)` returns (scanned value, end) of each member value;
+    # the members are scanned inline (rather than with member_key() and
+    # next_member()): this runs for each document of a lazy table
+    if text[pos:pos + 1] != '{':
+        raise _error('Expecting object', text, pos)
+    members = {}
+    pos = skip_whitespace(text, pos + 1)
+    if text[pos:pos + 1] == '}':
+        return members, pos + 1
+    while True:
+        if text[pos:pos + 1] != '"':
+            raise _error('Expecting property name', text, pos)
+        key, pos = scanstring(text, pos + 1)
+        pos = skip_whitespace(text, pos)
+        if text[pos:pos + 1] != ':':
+            raise _error("Expecting ':' delimiter", text, pos)
+        members[key], pos = scan(text, skip_whitespace(text, pos + 1))
+        pos = skip_whitespace(text, pos)
+        char = text[pos:pos + 1]
+        if char == '}':
+            return members, pos + 1
+        if char != ',':
+            raise _error("Expecting ',' delimiter", text, pos)
+        pos = skip_whitespace(text, pos + 1)
+
+
+def decode(text, pos):
+    # (value, end) of the value at `pos`
+    return _DECODER.raw_decode(text, pos)
@@ -0,0 +1,85 @@
+import os
+from collections.abc import Mapping
+
+from tinydb.storages import JSONStorage
+
+from .jsonscan import decode, scan_object, skip_whitespace
+from .timing import phase
+
+
+def _scan_document(text, start):
+    # (value, end): objects as LazyDocument, with their skeleton
+    if text[start] == '{':
+        spans, end = scan_object(text, start)
+        return LazyDocument(text, start, spans), end
+    return decode(text, start)
+
+
+def _scan_table(text, start):
+    return scan_object(text, start, _scan_document)
+
+
+class LazyDocument(Mapping):
+    # a read-only JSON object kept as its position in the raw text; the
+    # offsets of its members are found on the first access, and each value
+    # is decoded when looked up (objects lazily again, arrays eagerly)
+    __slots__ = ('_text', '_start', '_spans', '_values')
+
+    def __init__(self, text, start, spans=None):
+        self._text = text
+        self._start = start
+        self._spans = spans
+        self._values = {}
+
+    def _skeleton(self):
+        # {key: (start, end) of the value}
+        if self._spans is None:
+            self._spans, _ = scan_object(self._text, self._start)
+        return self._spans
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        start, _ = self._skeleton()[key]
+        if self._text[start] == '{':
+            value = LazyDocument(self._text, start)
+        else:
+            value, _ = decode(self._text, start)
+        self._values[key] = value
+        return value
+
+    def __contains__(self, key):
+        return key in self._skeleton()
+
+    def __iter__(self):
+        return iter(self._skeleton())
+
+    def __len__(self):
+        return len(self._skeleton())
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+def load_tables(text):
+    # {table name: {doc_id: LazyDocument}}, skipping over each document once
+    tables, _ = scan_object(text, skip_whitespace(text, 0), _scan_table)
+    return tables
+
+
+class LazyJSONStorage(JSONStorage):
+    # a read-only JSONStorage decoding the documents on demand
+    def read(self):
+        self._handle.seek(0, os.SEEK_END)
+        if not self._handle.tell():
+            return None
+        self._handle.seek(0)
+        with phase('read'):
+            text = self._handle.read()
+        with phase('decode'):
+            return load_tables(text)
+
+    def write(self, data):
+        raise OSError('the lazy storage is read-only')
@@ -0,0 +1,54 @@
+from .tinydb_ql import And, Compare, Field, Not, Or, TopLevel, Verb
+
+# Folds a parsed query (see tinydb_ql.parse) into a value per leaf predicate
+# (a "may match" bound, a set of candidates, ...) combined by the visitor:
+#   visitor.top, visitor.bottom:
+#       the values for "matches everything" and "matches nothing"
+#   visitor.leaf(node, path):
+#       the value of a predicate node applied on a field path (a tuple)
+#   visitor.meet(values), visitor.join(values), visitor.negate(value):
+#       the value of the conjunction, disjunction and negation; `values`
+#       are folded lazily, in order, as the visitor iterates over them
+
+
+def fold(node, visitor, path=()):
+    if isinstance(node, (TopLevel, Verb, Compare)):
+        return fold(node.value, visitor, path)
+    if isinstance(node, And):
+        return visitor.meet(
+            fold(elem, visitor, path) for elem in node.value['$and']
+        )
+    if isinstance(node, Or):
+        return visitor.join(
+            fold(elem, visitor, path) for elem in node.value['$or']
+        )
+    if isinstance(node, Not):
+        return visitor.negate(fold(node.value['$not'], visitor, path))
+    if isinstance(node, Field):
+        return visitor.meet(
+            fold(value, visitor, path + tuple(key.split('.')))
+            for key, value in node.value.items()
+        )
+    return visitor.leaf(node, path)
+
+
+class BoundVisitor:
+    # conservative "may match" bounds; anything unknown may match
+    top = True
+    bottom = False
+
+    def leaf(self, node, path):
+        # pylint: disable = unused-argument
+        return self.top
+
+    @staticmethod
+    def meet(values):
+        return all(values)
+
+    @staticmethod
+    def join(values):
+        return any(values)
+
+    def negate(self, value):
+        # pylint: disable = unused-argument
+        return self.top
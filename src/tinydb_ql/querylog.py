@@ -0,0 +1,97 @@
+import contextlib
+import datetime
+import json
+import threading
+import time
+from pathlib import Path
+
+from . import timing
+from .cache import db_fingerprint
+from .scan import canonical_query, search
+
+ENV_QUERY_LOG = 'TINYDB_QL_QUERY_LOG'
+
+# the options shaping the search of a query and its number of results (as
+# the tinydb-query options of the same names); the counts of the random
+# samples are not reproducible
+OPTIONS = [
+    'limit', 'after', 'sample', 'scan_fraction', 'scan_docs', 'ids_only',
+    'max_scan', 'timeout', 'max_results'
+]
+RANDOM_OPTIONS = {'scan_fraction', 'scan_docs'}
+
+
+class QueryLog:
+    # appends one JSON line per query to `path`:
+    #   {"time", "query" (canonical JSON text), "table", "path", "db" (DB
+    #    fingerprint), "options" (of the search, see OPTIONS), "results",
+    #    "wall", "phases" ({phase: seconds}), and "error" (the exception
+    #    type) when the query failed}
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def write(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as stream:
+            stream.write(line)
+
+    @contextlib.contextmanager
+    def capture(self, query, table_name=None, dbpath=None, options=None):
+        # yields the entry, of which "results" is to be set; written with the
+        # durations of the phases (see timing.phase) run by this thread
+        dbpath = Path(dbpath) if dbpath is not None else None
+        entry = {
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(
+                timespec='milliseconds'
+            ),
+            'query': canonical_query(query),
+            'table': table_name,
+            'path': str(dbpath) if dbpath is not None else None,
+            'db': (
+                db_fingerprint(dbpath)
+                if dbpath is not None and dbpath.is_file() else None
+            ),
+            'options': {
+                name: value for name, value in (options or {}).items()
+                if value is not None and value is not False
+            },
+            'results': None,
+            'wall': None,
+            'phases': {}
+        }
+        thread = threading.get_ident()
+        phases = entry['phases']
+
+        def hook(phase):
+            if threading.get_ident() == thread:
+                phases[phase.phase] = phases.get(phase.phase, 0) + phase.wall
+
+        timing.add_hook(hook)
+        started = time.perf_counter()
+        try:
+            yield entry
+        except Exception as exc:
+            entry['error'] = type(exc).__name__
+            raise
+        finally:
+            entry['wall'] = time.perf_counter() - started
+            timing.remove_hook(hook)
+            self.write(entry)
+
+    def search(self, table, query, *, dbpath=None, **options):
+        # scan.search(table, query, **options), logged; `query` has to be a
+        # JSON query, and `dbpath` (the file of the table) identifies the DB
+        budget = {
+            name: value for name, value in options.items()
+            if name in OPTIONS
+        }
+        with self.capture(query, table.name, dbpath, budget) as entry:
+            result = search(table, query, **options)
+            entry['results'] = len(result)
+        return result
+
+
+def read_log(path):
+    with open(path, encoding='utf-8') as stream:
+        return [json.loads(line) for line in stream if line.strip()]
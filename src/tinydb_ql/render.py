@@ -0,0 +1,225 @@
+import re
+import sys
+
+DEFAULT_WIDTH = 80
+_SCALARS = frozenset([str, int, float, bool, type(None)])
+
+
+def _is_dict(obj):
+    return isinstance(obj, dict) and type(obj).__repr__ is dict.__repr__
+
+
+def _is_list(obj):
+    return isinstance(obj, list) and type(obj).__repr__ is list.__repr__
+
+
+def _is_tuple(obj):
+    return isinstance(obj, tuple) and type(obj).__repr__ is tuple.__repr__
+
+
+class Renderer:
+    # the layout of pprint.pp (dicts in their insertion order) for JSON-like
+    # data, without pprint's costs: the one-line reprs are the builtin repr()
+    # unless the depth is limited, and then the walk stops at the depth.
+    # A top-level list or dict is written item by item.
+    def __init__(self, width=DEFAULT_WIDTH, depth=None):
+        self.width = width
+        # like pprint, 0 means unlimited
+        self.depth = depth or None
+
+    def flat(self, obj, level):
+        if self.depth is None:
+            return repr(obj)
+        return self._flat(obj, level)
+
+    def _flat(self, obj, level):
+        if type(obj) in _SCALARS:
+            return repr(obj)
+        if _is_dict(obj):
+            if not obj:
+                return '{}'
+            if level >= self.depth:
+                return '{...}'
+            level += 1
+            return '{' + ', '.join([
+                f'{self._flat(key, level)}: {self._flat(value, level)}'
+                for key, value in obj.items()
+            ]) + '}'
+        if _is_list(obj) or _is_tuple(obj):
+            if _is_list(obj):
+                if not obj:
+                    return '[]'
+                template = '[%s]'
+            elif len(obj) == 1:
+                template = '(%s,)'
+            elif not obj:
+                return '()'
+            else:
+                template = '(%s)'
+            if level >= self.depth:
+                return template % '...'
+            level += 1
+            return template % ', '.join([
+                self._flat(elem, level) for elem in obj
+            ])
+        return repr(obj)
+
+    def format(self, obj, write, indent, allowance, level, rep=None):
+        if rep is None:
+            rep = self.flat(obj, level)
+        if len(rep) <= self.width - indent - allowance:
+            write(rep)
+        elif _is_dict(obj):
+            write('{')
+            self._dict_items(obj.items(), write, indent, allowance + 1,
+                             level + 1)
+            write('}')
+        elif _is_list(obj):
+            write('[')
+            self._items(obj, write, indent, allowance + 1, level + 1)
+            write(']')
+        elif _is_tuple(obj):
+            end = ',)' if len(obj) == 1 else ')'
+            write('(')
+            self._items(obj, write, indent, allowance + len(end), level + 1)
+            write(end)
+        elif isinstance(obj, str) and obj:
+            self._str(obj, write, indent, allowance, level + 1)
+        else:
+            write(rep)
+
+    def _dict_items(self, items, write, indent, allowance, level):
+        indent += 1
+        delimiter = ',\n' + ' ' * indent
+        last_index = len(items) - 1
+        for i, (key, value) in enumerate(items):
+            last = i == last_index
+            rep = self.flat(key, level)
+            write(rep)
+            write(': ')
+            self.format(value, write, indent + len(rep) + 2,
+                        allowance if last else 1, level)
+            if not last:
+                write(delimiter)
+
+    def _items(self, items, write, indent, allowance, level):
+        indent += 1
+        delimiter = ',\n' + ' ' * indent
+        last_index = len(items) - 1
+        for i, elem in enumerate(items):
+            if i:
+                write(delimiter)
+            self.format(elem, write, indent,
+                        allowance if i == last_index else 1, level)
+
+    def _str(self, text, write, indent, allowance, level):
+        # split at the line ends, then at the whitespace, as pprint does
+        chunks = []
+        lines = text.splitlines(True)
+        if level == 1:
+            indent += 1
+            allowance += 1
+        max_width1 = max_width = self.width - indent
+        for i, line in enumerate(lines):
+            rep = repr(line)
+            if i == len(lines) - 1:
+                max_width1 -= allowance
+            if len(rep) <= max_width1:
+                chunks.append(rep)
+                continue
+            # alternating non-space and space runs, without the empty last one
+            parts = re.findall(r'\S*\s*', line)[:-1]
+            max_width2 = max_width
+            current = ''
+            for j, part in enumerate(parts):
+                candidate = current + part
+                if j == len(parts) - 1 and i == len(lines) - 1:
+                    max_width2 -= allowance
+                if len(repr(candidate)) > max_width2:
+                    if current:
+                        chunks.append(repr(current))
+                    current = part
+                else:
+                    current = candidate
+            if current:
+                chunks.append(repr(current))
+        if len(chunks) == 1:
+            write(rep)
+            return
+        if level == 1:
+            write('(')
+        write(('\n' + ' ' * indent).join(chunks))
+        if level == 1:
+            write(')')
+
+    def write(self, obj, stream):
+        # writes obj and a newline; the items of a top-level list or dict are
+        # written as soon as it is known not to fit on one line
+        write = stream.write
+        if not (_is_list(obj) or _is_dict(obj)) or not obj or (
+                self.depth is not None and self.depth <= 1):
+            self.format(obj, write, 0, 0, 0)
+            write('\n')
+            return
+        is_dict = _is_dict(obj)
+        items = iter(obj.items() if is_dict else obj)
+        # the items seen while the whole could still fit on one line
+        pending = []
+        length = 2
+        for item in items:
+            if is_dict:
+                key, value = item
+                key_rep = self.flat(key, 1)
+                rep = self.flat(value, 1)
+                length += len(key_rep) + 2
+            else:
+                key_rep, value, rep = None, item, self.flat(item, 1)
+            if pending:
+                length += 2
+            length += len(rep)
+            pending.append((key_rep, value, rep))
+            if length > self.width:
+                break
+        else:
+            text = ', '.join([
+                rep if key_rep is None else f'{key_rep}: {rep}'
+                for key_rep, _, rep in pending
+            ])
+            write(('{%s}' if is_dict else '[%s]') % text)
+            write('\n')
+            return
+        write('{' if is_dict else '[')
+        first = True
+        for key_rep, value, rep in pending:
+            first = self._write_item(write, key_rep, value, rep, first)
+        for item in items:
+            if is_dict:
+                key, value = item
+                first = self._write_item(
+                    write, self.flat(key, 1), value, None, first
+                )
+            else:
+                first = self._write_item(write, None, item, None, first)
+        write('}\n' if is_dict else ']\n')
+
+    def _write_item(self, write, key_rep, value, rep, first):
+        # an item of the top-level list or dict (always followed by , or ])
+        if not first:
+            write(',\n ')
+        indent = 1
+        if key_rep is not None:
+            write(key_rep)
+            write(': ')
+            indent += len(key_rep) + 2
+        self.format(value, write, indent, 1, 1, rep)
+        return False
+
+
+def pp(obj, stream=None, *, depth=None, width=DEFAULT_WIDTH):
+    Renderer(width, depth).write(obj, sys.stdout if stream is None else stream)
+
+
+def pformat(obj, *, depth=None, width=DEFAULT_WIDTH):
+    chunks = []
+    Renderer(width, depth).format(obj, chunks.append, 0, 0, 0)
+    return ''.join(chunks)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+import concurrent.futures
+import functools
+import json
+import statistics
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+import tinydb
+from tinydb.middlewares import CachingMiddleware
+
+from .approx import estimate_search, reservoir_search
+from .cache import db_fingerprint
+from .codec import BACKEND_NAMES, get_codec
+from .querylog import RANDOM_OPTIONS, read_log
+from .scan import search, search_ids, search_page
+from .storages import STORAGES
+from .tables import SelectiveJSONStorage
+from .tinydb_ql import Query
+
+
+def parse_args(argv):
+    parser = ArgumentParser(
+        description='Replay a query log written by "tinydb-query '
+        '--query-log" against a tinydb DB, and report the latency '
+        'percentiles and the throughput.'
+    )
+    parser.add_argument('log', type=Path, help='query log (JSON lines)')
+    parser.add_argument('db_path', type=Path, help='DB to run the queries on')
+    parser.add_argument(
+        '--table',
+        help='run all the queries on this table (default: the logged ones)'
+    )
+    parser.add_argument(
+        '--storage', choices=list(STORAGES), default='json',
+        help='DB file format (default: json)'
+    )
+    parser.add_argument(
+        '--json-backend', choices=BACKEND_NAMES,
+        help='JSON codec to read the DB with (see tinydb-query)'
+    )
+    parser.add_argument(
+        '--concurrency', type=int, default=1, metavar='N',
+        help='number of queries running at the same time, in threads '
+        '(default: 1)'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=1, metavar='N',
+        help='replay the log N times (default: 1)'
+    )
+    parser.add_argument(
+        '--json', action='store_true', help='output the report as JSON'
+    )
+    args = parser.parse_args(argv)
+    if args.concurrency <= 0:
+        parser.error('--concurrency must be positive')
+    if args.repeat <= 0:
+        parser.error('--repeat must be positive')
+    return args
+
+
+def percentiles(latencies):
+    # p50, p95, p99 (interpolated)
+    if not latencies:
+        return [None] * 3
+    if len(latencies) == 1:
+        return latencies * 3
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return [cuts[49], cuts[94], cuts[98]]
+
+
+def count_results(table, query, options):
+    # the search of tinydb-query with the logged options; returns the number
+    # of results it reports
+    budget = {
+        name: options[name] for name in ('max_scan', 'timeout', 'max_results')
+        if name in options
+    }
+    if 'limit' in options or 'after' in options:
+        return len(search_page(
+            table, query, limit=options.get('limit'),
+            after=options.get('after'), **budget
+        )[0])
+    if RANDOM_OPTIONS & set(options):
+        return len(estimate_search(
+            table, query, fraction=options.get('scan_fraction'),
+            size=options.get('scan_docs')
+        )[0])
+    if 'sample' in options and not budget:
+        return reservoir_search(table, query, options['sample'])[1]
+    if options.get('ids_only'):
+        return len(search_ids(table, query, **budget))
+    return len(search(table, query, **budget))
+
+
+def _replay_one(db, tables, entry):
+    # (latency, number of matches or None on errors)
+    started = time.perf_counter()
+    try:
+        table = tables[entry['table']]
+        results = count_results(
+            table, Query(json.loads(entry['query']), database=db),
+            entry.get('options', {})
+        )
+    except Exception:  # pylint: disable = broad-except
+        return time.perf_counter() - started, None
+    return time.perf_counter() - started, results
+
+
+def replay(db, entries, *, concurrency=1, fingerprint=None):
+    # runs the logged queries on db; entries with the same DB `fingerprint`
+    # are expected to match as many documents as when logged. With
+    # concurrency, the storage of db has to cache its content (e.g.,
+    # CachingMiddleware): the threads would race on a file handle.
+    tables = {
+        name: db if name is None else db.table(name)
+        for name in {entry['table'] for entry in entries}
+    }
+    for table in tables.values():
+        # decoded before the clock starts
+        len(table)
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+        outcomes = list(executor.map(
+            functools.partial(_replay_one, db, tables), entries
+        ))
+    wall = time.perf_counter() - started
+    latencies = sorted(latency for latency, _ in outcomes)
+    errors = sum(results is None for _, results in outcomes)
+    mismatches = sum(
+        results is not None and entry.get('db') == fingerprint
+        and entry.get('results') not in (None, results)
+        and not RANDOM_OPTIONS & set(entry.get('options', {}))
+        for entry, (_, results) in zip(entries, outcomes)
+    )
+    p50, p95, p99 = percentiles(latencies)
+    return {
+        'queries': len(entries),
+        'errors': errors,
+        'mismatches': mismatches,
+        'concurrency': concurrency,
+        'wall': wall,
+        'throughput': len(entries) / wall if wall else None,
+        'latency': {
+            'mean': statistics.fmean(latencies) if latencies else None,
+            'p50': p50, 'p95': p95, 'p99': p99,
+            'max': latencies[-1] if latencies else None
+        }
+    }
+
+
+def format_text(report):
+    def ms(seconds):
+        return f'{1000 * seconds:.2f} ms'
+
+    lines = [
+        f"replayed {report['queries']} queries "
+        f"(concurrency {report['concurrency']}) in {report['wall']:.3f} s"
+    ]
+    if report['queries']:
+        latency = report['latency']
+        lines[0] += f": {report['throughput']:.1f} queries/s"
+        lines.append(
+            f"latency: p50 {ms(latency['p50'])}, p95 {ms(latency['p95'])}, "
+            f"p99 {ms(latency['p99'])}, max {ms(latency['max'])}"
+        )
+    if report['errors']:
+        lines.append(f"errors: {report['errors']}")
+    if report['mismatches']:
+        lines.append(
+            f"mismatches: {report['mismatches']} (a different number of "
+            'matches than logged on the same DB)'
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    try:
+        _main(sys.argv)
+    except (FileNotFoundError, ValueError, RuntimeError) as exc:
+        print(str(exc), file=sys.stderr)
+        sys.exit(-1)
+
+
+def _main(argv):
+    args = parse_args(argv[1:])
+    entries = read_log(args.log)
+    if args.table is not None:
+        entries = [dict(entry, table=args.table) for entry in entries]
+    entries *= args.repeat
+    if args.storage == 'json':
+        storage = functools.partial(
+            SelectiveJSONStorage, codec=get_codec(args.json_backend)
+        )
+    else:
+        storage = STORAGES[args.storage]
+    if not args.db_path.is_file():
+        raise FileNotFoundError(f'{args.db_path} is not a file')
+    with tinydb.TinyDB(
+            args.db_path, access_mode='r', storage=CachingMiddleware(storage)
+    ) as db:
+        report = replay(
+            db, entries, concurrency=args.concurrency,
+            fingerprint=db_fingerprint(args.db_path)
+        )
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(format_text(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+import base64
+import collections
+import concurrent.futures
+import hashlib
+import itertools
+import json
+import time
+from types import MappingProxyType
+
+import tinydb
+
+from .tinydb_ql import Query
+
+
+def compile_query(query):
+    if isinstance(query, tinydb.queries.QueryInstance):
+        return query
+    return Query(query)
+
+
+def raw_documents(table):
+    # (doc_id, document) pairs in the storage order; the documents are the
+    # stored dicts themselves, and the doc_ids are not converted yet.
+    # tinydb replaces (not updates) the table dict on each write,
+    # so it is safe to keep iterating this while the table is written.
+    # pylint: disable = protected-access
+    return table._read_table().items()
+
+
+def make_document(table, doc_id, doc):
+    return table.document_class(doc, table.document_id_class(doc_id))
+
+
+def make_doc_id(table, doc_id, _):
+    return table.document_id_class(doc_id)
+
+
+def make_view(table, doc_id, doc):
+    # a read-only view of the stored dict itself (no copy)
+    return table.document_id_class(doc_id), MappingProxyType(doc)
+
+
+# limits are checked once per this number of documents
+CHECK_INTERVAL = 1024
+
+
+class BudgetExceeded(RuntimeError):
+    def __init__(self, reason, scanned, matches):
+        super().__init__(
+            f'{reason} (scanned {scanned} documents, '
+            f'found {len(matches)} so far)'
+        )
+        self.reason = reason
+        self.scanned = scanned
+        # matching documents found before the abort
+        self.matches = matches
+
+
+def check_max_results(matches, max_results, scanned=0):
+    # also for the results found without scanning (e.g., cached)
+    if max_results is not None and len(matches) > max_results:
+        raise BudgetExceeded(
+            f'result limit ({max_results} documents) exceeded',
+            scanned, matches[:max_results]
+        )
+
+
+def _collect(table, cond, documents, *, max_scan=None, timeout=None,
+             max_results=None, limit=None, make=make_document):
+    # pylint: disable = too-many-arguments
+    # stop quietly after `limit` matches; exceeding any other limit
+    # raises BudgetExceeded; `make(table, doc_id, doc)` builds each match
+    if max_scan is None and timeout is None and max_results is None:
+        matches = (
+            make(table, doc_id, doc)
+            for doc_id, doc in documents if cond(doc)
+        )
+        return list(itertools.islice(matches, limit))
+    deadline = None if timeout is None else time.monotonic() + timeout
+    documents = iter(documents)
+    scanned = 0
+    matches = []
+    while True:
+        chunk_size = CHECK_INTERVAL
+        if max_scan is not None:
+            chunk_size = min(chunk_size, max_scan - scanned)
+        chunk = list(itertools.islice(documents, chunk_size))
+        if not chunk:
+            if max_scan is not None and scanned == max_scan:
+                # probe whether the limit has actually cut the scan
+                if next(documents, None) is not None:
+                    raise BudgetExceeded(
+                        f'scan limit ({max_scan} documents) exceeded',
+                        scanned, matches
+                    )
+            return matches
+        matches.extend(
+            make(table, doc_id, doc) for doc_id, doc in chunk if cond(doc)
+        )
+        scanned += len(chunk)
+        if limit is not None and len(matches) >= limit:
+            return matches[:limit]
+        check_max_results(matches, max_results, scanned)
+        if deadline is not None and time.monotonic() > deadline:
+            raise BudgetExceeded(
+                f'time limit ({timeout} seconds) exceeded', scanned, matches
+            )
+
+
+def search(table, query, *, max_scan=None, timeout=None, max_results=None,
+           documents=None):
+    # pylint: disable = too-many-arguments
+    # raises BudgetExceeded when the scan needs more than `max_scan`
+    # documents, `timeout` seconds, or finds more than `max_results` matches;
+    # the time limit is checked once per CHECK_INTERVAL documents.
+    # `documents` narrows down the scan to the given (doc_id, document)
+    # pairs (e.g., candidates from an index) instead of the whole table
+    return _search(
+        table, query, make_document, max_scan=max_scan, timeout=timeout,
+        max_results=max_results, documents=documents
+    )
+
+
+def _search(table, query, make, *, documents=None, **budget):
+    if documents is None:
+        documents = raw_documents(table)
+    return _collect(
+        table, compile_query(query), documents, make=make, **budget
+    )
+
+
+def search_ids(table, query, **options):
+    # the doc_ids of the matching documents (see search for the options),
+    # without building any document
+    return _search(table, query, make_doc_id, **options)
+
+
+def search_views(table, query, **options):
+    # {doc_id: read-only view} of the matching documents (see search for the
+    # options). The views are not copies but the stored dicts themselves:
+    # with a caching storage (e.g., CachingMiddleware, MemoryStorage), later
+    # updates of these documents show through the views, while the removed
+    # ones stay visible in them and inserted ones are not added; a storage
+    # reading the file again on each access (JSONStorage) makes them
+    # snapshots. Copy a view (dict(view)) to keep it as it is.
+    return dict(_search(table, query, make_view, **options))
+
+
+def search_many(table, queries, *, workers=None, database=None, **budget):
+    # the results of each query (in the order of `queries`), compiled and
+    # evaluated by a pool of `workers` threads; `database` is for $lookup
+    # (see tinydb_ql.Query), and the budget (see search) applies to each query
+    def run(query):
+        if not isinstance(query, tinydb.queries.QueryInstance):
+            query = Query(query, database=database)
+        return search(table, query, **budget)
+
+    # read (and cached by the storage) once, before the threads start
+    raw_documents(table)
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(run, queries))
+
+
+class CursorError(ValueError):
+    pass
+
+
+Page = collections.namedtuple('Page', ['documents', 'cursor'])
+
+
+def canonical_query(query):
+    return json.dumps(
+        query, sort_keys=True, separators=(',', ':'), ensure_ascii=False
+    )
+
+
+def _query_digest(query):
+    if isinstance(query, tinydb.queries.QueryInstance):
+        return None
+    return hashlib.sha1(canonical_query(query).encode()).hexdigest()[:16]
+
+
+def encode_cursor(query, after):
+    data = json.dumps({'after': after, 'query': _query_digest(query)})
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(query, cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        after, digest = data['after'], data['query']
+    except (ValueError, TypeError, KeyError) as exc:
+        raise CursorError(f'broken cursor: {cursor}') from exc
+    if digest != _query_digest(query):
+        raise CursorError('the cursor belongs to another query')
+    return after
+
+
+def documents_after(table, after):
+    # (doc_id, document) pairs in the doc_id order, skipping doc_ids <= after
+    # (the table is almost always sorted already, and timsort is linear then)
+    table_data = table._read_table()  # pylint: disable = protected-access
+    id_class = table.document_id_class
+    doc_ids = ((id_class(key), key) for key in table_data)
+    if after is not None:
+        doc_ids = (pair for pair in doc_ids if pair[0] > after)
+    return ((key, table_data[key]) for _, key in sorted(doc_ids))
+
+
+def search_page(table, query, *, limit, cursor=None, after=None, **budget):
+    # up to `limit` (None: unlimited) matching documents in the doc_id order,
+    # starting after the document the `cursor` (or the doc_id `after`)
+    # points to; the returned cursor is None when the matches are exhausted
+    if limit is not None and limit <= 0:
+        raise ValueError('limit must be positive')
+    if cursor is not None:
+        after = decode_cursor(query, cursor)
+    documents = _collect(
+        table, compile_query(query), documents_after(table, after),
+        limit=limit, **budget
+    )
+    if limit is None or len(documents) < limit:
+        return Page(documents, None)
+    return Page(documents, encode_cursor(query, documents[-1].doc_id))
+
+
+def fetch_documents(table, doc_ids):
+    # the documents of the given doc_ids (missing ones are skipped)
+    table_data = table._read_table()  # pylint: disable = protected-access
+    return [
+        make_document(table, str(doc_id), table_data[str(doc_id)])
+        for doc_id in doc_ids if str(doc_id) in table_data
+    ]
@@ -0,0 +1,276 @@
+import io
+import json
+import os
+
+from tinydb.storages import JSONStorage, Storage, touch
+
+
+# An append-log DB file is a standard tinydb JSON document (the "base")
+# followed by newline-separated change records:
+#   {"op": "put", "table": name, "id": doc_id, "doc": {...}}
+#   {"op": "del", "table": name, "id": doc_id}
+#   {"op": "drop", "table": name}
+# A compacted file has no records, and is readable by JSONStorage as is.
+
+
+class LogFormatError(ValueError):
+    pass
+
+
+def _replay(tables, record):
+    operation = record.get('op')
+    table_name = record.get('table')
+    if operation == 'put':
+        tables.setdefault(table_name, {})[record['id']] = record['doc']
+    elif operation == 'del':
+        tables.get(table_name, {}).pop(record['id'], None)
+    elif operation == 'drop':
+        tables.pop(table_name, None)
+    else:
+        raise LogFormatError(f'unknown log record: {record}')
+
+
+def _diff_records(old_state, new_state):
+    for table_name in old_state:
+        if table_name not in new_state:
+            yield {'op': 'drop', 'table': table_name}
+    for table_name, documents in new_state.items():
+        old_documents = old_state.get(table_name, {})
+        if old_documents is documents:
+            # a table not written to
+            continue
+        for doc_id in old_documents:
+            if doc_id not in documents:
+                yield {'op': 'del', 'table': table_name, 'id': doc_id}
+        for doc_id, encoded in documents.items():
+            if old_documents.get(doc_id) != encoded:
+                yield {'op': 'put', 'table': table_name, 'id': doc_id,
+                       'doc': encoded}
+
+
+class AppendLogStorage(Storage):
+    # pylint: disable = too-many-instance-attributes
+    def __init__(self, path, create_dirs=False, encoding=None,
+                 access_mode='r+', compact_ratio=1.0,
+                 compact_min_bytes=1 << 20):
+        super().__init__()
+        self._mode = access_mode
+        self._encoding = encoding or 'utf-8'
+        # compact on close when the log part outgrows both
+        # compact_ratio * (base size) and compact_min_bytes;
+        # compact_ratio=None disables the automatic compaction
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        if self.writable:
+            touch(path, create_dirs=create_dirs)
+        mode = access_mode if 'b' in access_mode else access_mode + 'b'
+        self._handle = open(path, mode=mode)
+        # last known state, each document kept as its encoded JSON text
+        self._state = None
+        # the table dicts last read or written, and the (size, mtime) of the
+        # file after the last operation on it
+        self._tables = {}
+        self._stat = None
+        self._base_size = 0
+        self._log_size = 0
+        self._end = 0
+        self._newline_needed = False
+
+    @property
+    def writable(self):
+        return any(character in self._mode for character in ('+', 'w', 'a'))
+
+    def _file_stat(self):
+        stat = os.fstat(self._handle.fileno())
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load(self):
+        self._handle.seek(0)
+        content = self._handle.read()
+        self._stat = self._file_stat()
+        self._base_size = self._log_size = self._end = 0
+        self._newline_needed = False
+        text = content.decode(self._encoding)
+        if not text.strip():
+            return None
+        try:
+            tables, end = json.JSONDecoder().raw_decode(text)
+        except json.JSONDecodeError as exc:
+            raise LogFormatError(f'broken base document: {exc}') from exc
+        position = self._base_size = (
+            len(content) - len(text[end:].encode(self._encoding))
+        )
+        lines = content[position:].split(b'\n')
+        for lineno, line in enumerate(lines):
+            if line.strip():
+                try:
+                    record = json.loads(line.decode(self._encoding))
+                except json.JSONDecodeError as exc:
+                    if lineno == len(lines) - 1:
+                        # an unterminated last record is an interrupted
+                        # append, which has never been acknowledged;
+                        # drop it, and overwrite it with the next append
+                        break
+                    raise LogFormatError(
+                        f'broken log record: {exc}'
+                    ) from exc
+                _replay(tables, record)
+                self._log_size += len(line) + 1
+            position += len(line) + 1
+        self._end = min(position, len(content))
+        self._newline_needed = not content[:self._end].endswith(b'\n')
+        return tables
+
+    @staticmethod
+    def _encode_table(documents):
+        return {doc_id: json.dumps(doc) for doc_id, doc in documents.items()}
+
+    def _encode_state(self, tables):
+        # tinydb replaces the dict of a table on every change, so the tables
+        # last read or written as the same dicts are not encoded again
+        return {
+            table_name: (
+                self._state[table_name]
+                if documents is self._tables.get(table_name)
+                else self._encode_table(documents)
+            )
+            for table_name, documents in tables.items()
+        }
+
+    def _decode_state(self):
+        # a single JSON text spliced from the encoded documents
+        return json.loads('{%s}' % ', '.join(
+            '%s: {%s}' % (json.dumps(table_name), ', '.join(
+                f'{json.dumps(doc_id)}: {encoded}'
+                for doc_id, encoded in documents.items()
+            ))
+            for table_name, documents in self._state.items()
+        ))
+
+    def read(self):
+        if not self.writable:
+            return self._load()
+        if self._state is not None and self._stat == self._file_stat():
+            # the file is as last read or written: the state is decoded
+            # instead of the whole file and its log
+            if not self._state and not self._base_size:
+                return None
+            tables = self._decode_state()
+        else:
+            tables = self._load()
+            self._tables = {}
+            self._state = self._encode_state(tables or {})
+        self._tables = dict(tables or {})
+        return tables
+
+    def write(self, data):
+        if self._state is None:
+            self.read()
+        if not self._state and not self._base_size:
+            # nothing on the disk yet; start with a compacted file
+            self._rewrite(data)
+            return
+        new_state = self._encode_state(data)
+        self._append([
+            _encode_record(record)
+            for record in _diff_records(self._state, new_state)
+        ])
+        self._state = new_state
+        self._tables = dict(data)
+
+    def upsert_documents(self, table_name, documents):
+        # append `documents` ({doc_id: document}) to the table without
+        # rewriting any other documents; returns (inserted, updated) counts
+        if self._state is None:
+            self.read()
+        if not self._state and not self._base_size:
+            self._rewrite({table_name: dict(documents)})
+            return len(documents), 0
+        table = self._state.setdefault(table_name, {})
+        # the table dict last read is no longer the state of the table
+        self._tables.pop(table_name, None)
+        inserted = updated = 0
+        lines = []
+        for doc_id, doc in documents.items():
+            encoded = json.dumps(doc)
+            if doc_id in table:
+                if table[doc_id] == encoded:
+                    continue
+                updated += 1
+            else:
+                inserted += 1
+            table[doc_id] = encoded
+            lines.append(_encode_record({
+                'op': 'put', 'table': table_name, 'id': doc_id, 'doc': encoded
+            }))
+        self._append(lines)
+        return inserted, updated
+
+    def _append(self, lines):
+        if not lines:
+            return
+        if self._newline_needed:
+            lines.insert(0, '\n')
+        content = ''.join(lines).encode(self._encoding)
+        self._handle.seek(self._end)
+        self._write(content)
+        self._end += len(content)
+        self._log_size += len(content)
+        self._newline_needed = False
+
+    def _write(self, content):
+        try:
+            self._handle.write(content)
+        except io.UnsupportedOperation as exc:
+            raise IOError(
+                'Cannot write to the database. '
+                f'Access mode is "{self._mode}"'
+            ) from exc
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._handle.truncate()
+        self._stat = self._file_stat()
+
+    def _rewrite(self, data):
+        content = (json.dumps(data) + '\n').encode(self._encoding)
+        self._handle.seek(0)
+        self._write(content)
+        self._state = self._encode_state(data)
+        self._tables = dict(data)
+        self._base_size = self._end = len(content)
+        self._log_size = 0
+        self._newline_needed = False
+
+    def needs_compaction(self):
+        if self.compact_ratio is None or not self._log_size:
+            return False
+        return (
+            self._log_size >= self.compact_min_bytes
+            and self._log_size >= self.compact_ratio * self._base_size
+        )
+
+    def compact(self):
+        # rewrite the file into the standard tinydb layout
+        tables = self._load()
+        if tables is not None:
+            self._rewrite(tables)
+
+    def close(self):
+        if self.writable and self.needs_compaction():
+            self.compact()
+        self._handle.close()
+
+
+def _encode_record(record):
+    # documents are kept pre-encoded; splice them instead of re-encoding
+    doc = record.pop('doc', None)
+    text = json.dumps(record)
+    if doc is not None:
+        text = f'{text[:-1]}, "doc": {doc}}}'
+    return text + '\n'
+
+
+STORAGES = {
+    'json': JSONStorage,
+    'log': AppendLogStorage
+}
@@ -0,0 +1,85 @@
+import os
+import threading
+from collections.abc import Mapping
+
+from .codec import CodecJSONStorage
+from .jsonscan import (decode, member_key, next_member, open_object,
+                       skip_value, skip_whitespace)
+from .timing import phase
+
+
+class Tables(Mapping):
+    # the tables of a DB file, each decoded on its first access. The text is
+    # scanned only up to the table looked up, which is decoded in place (by
+    # the json module, which finds its end while decoding it); the tables
+    # before it are skipped over (strings and escapes included) to find their
+    # offsets in the text, and decoded with `loads` if looked up later
+    def __init__(self, text, loads):
+        self._text = text
+        self._loads = loads
+        self._spans = {}
+        self._decoded = {}
+        # the position of the next member to scan, None at the end
+        self._next, _ = open_object(text, skip_whitespace(text, 0))
+        self._lock = threading.Lock()
+
+    def _scan(self, name=None):
+        # scans the members up to `name` (all of them by default); called
+        # with the lock held
+        while self._next is not None and name not in self._spans:
+            key, start = member_key(self._text, self._next)
+            if key == name:
+                with phase('decode'):
+                    self._decoded[key], end = decode(self._text, start)
+            else:
+                with phase('scan'):
+                    end = skip_value(self._text, start)
+            self._spans[key] = start, end
+            self._next, _ = next_member(self._text, end)
+
+    def __getitem__(self, name):
+        try:
+            return self._decoded[name]
+        except KeyError:
+            pass
+        with self._lock:
+            # decoded once, even by concurrent queries
+            if name not in self._decoded:
+                self._scan(name)
+                start, end = self._spans[name]
+                if name not in self._decoded:
+                    with phase('decode'):
+                        self._decoded[name] = self._loads(
+                            self._text[start:end]
+                        )
+        return self._decoded[name]
+
+    def __contains__(self, name):
+        with self._lock:
+            self._scan(name)
+        return name in self._spans
+
+    def __iter__(self):
+        with self._lock:
+            self._scan()
+        return iter(self._spans)
+
+    def __len__(self):
+        with self._lock:
+            self._scan()
+        return len(self._spans)
+
+
+class SelectiveJSONStorage(CodecJSONStorage):
+    # a read-only CodecJSONStorage decoding only the tables looked up
+    def read(self):
+        self._handle.seek(0, os.SEEK_END)
+        if not self._handle.tell():
+            return None
+        self._handle.seek(0)
+        with phase('read'):
+            text = self._handle.read()
+        return Tables(text, self.codec.loads)
+
+    def write(self, data):
+        raise OSError('the selective storage is read-only')
@@ -0,0 +1,96 @@
+import collections
+import contextlib
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+# imported first by the package: the "imports" phase ends at _main
+IMPORTED = time.perf_counter()
+
+# a phase is named by the phases it is nested in, e.g., "load.decode";
+# `peak_memory`: the peak of the memory traced by tracemalloc during the
+# phase (None when tracemalloc is not tracing)
+Timing = collections.namedtuple(
+    'Timing', ['phase', 'wall', 'cpu', 'peak_memory']
+)
+
+_hooks = []
+_local = threading.local()
+
+
+def add_hook(hook):
+    # hook(timing) is called at the end of each phase (in the thread of the
+    # phase); nothing is measured while there is no hook
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+
+def emit(timing):
+    for hook in list(_hooks):
+        hook(timing)
+
+
+@contextlib.contextmanager
+def phase(name):
+    if not _hooks:
+        yield
+        return
+    stack = _local.__dict__.setdefault('stack', [])
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        if stack:
+            # the peak so far counts for the enclosing phase
+            stack[-1][1] = max(stack[-1][1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    entry = [name if not stack else f'{stack[-1][0]}.{name}', 0]
+    stack.append(entry)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        stack.pop()
+        peak = None
+        if tracing and tracemalloc.is_tracing():
+            peak = max(entry[1], tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+        emit(Timing(entry[0], wall, cpu, peak))
+
+
+def imports_timing():
+    # from the start of the process (CPU) or the import of the package (wall)
+    return Timing(
+        'imports', time.perf_counter() - IMPORTED, time.process_time(), None
+    )
+
+
+class Report:
+    # collects the phases (as a hook) into a JSON-serializable report
+    def __init__(self):
+        self.phases = []
+
+    def __call__(self, timing):
+        self.phases.append(timing._asdict())
+
+    def dump(self):
+        total = {
+            'wall': time.perf_counter() - IMPORTED,
+            'cpu': time.process_time()
+        }
+        if resource is not None:
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # kilobytes, except on macOS
+            total['max_rss'] = (
+                max_rss if sys.platform == 'darwin' else max_rss * 1024
+            )
+        return {'phases': self.phases, 'total': total}
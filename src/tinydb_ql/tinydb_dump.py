@@ -9,6 +9,8 @@ import tinydb
 from tinydb.middlewares import CachingMiddleware
 from tinydb.storages import JSONStorage
 
+from .storages import STORAGES, AppendLogStorage
+
 
 def parse_args(argv):
     parser = ArgumentParser(
@@ -18,6 +20,21 @@ def parse_args(argv):
     parser.add_argument(
         'output', type=Path, help='output tinydb DB path'
     )
+    parser.add_argument(
+        '--storage', choices=list(STORAGES), default='json',
+        help='DB file format: "log" appends changes to the file '
+        'instead of rewriting it (default: json)'
+    )
+    parser.add_argument(
+        '--compact', action='store_true',
+        help='rewrite an append-log DB into the plain tinydb JSON layout '
+        '(implies --storage log; no input is read)'
+    )
+    parser.add_argument(
+        '--upsert', action='store_true',
+        help='for an object input, only touch the given doc_ids, '
+        'and report the numbers of inserted and updated documents'
+    )
     args = parser.parse_args(argv)
     return args
 
@@ -47,6 +64,40 @@ def insert_from_object(db, object_input):
     db.table(table_name).clear_cache()
 
 
+def upsert_from_object(db, object_input):
+    # same as insert_from_object, but only looks at the given doc_ids;
+    # returns the numbers of inserted and updated documents
+    table = db.table(db.default_table_name)
+    id_class = table.document_id_class
+    documents = {
+        str(id_class(key)): value
+        for key, value in object_input.items()
+    }
+    upsert_documents = getattr(db.storage, 'upsert_documents', None)
+    if upsert_documents is not None:
+        # the storage writes only the given documents
+        inserted, updated = upsert_documents(table.name, documents)
+    else:
+        content = db.storage.read()
+        if content is None:
+            content = {}
+        existing = content.setdefault(table.name, {})
+        inserted = updated = 0
+        for key, value in documents.items():
+            if key in existing:
+                # compared as JSON, as AppendLogStorage does (1 != true)
+                if json.dumps(existing[key]) == json.dumps(value):
+                    continue
+                updated += 1
+            else:
+                inserted += 1
+            existing[key] = value
+        if inserted or updated:
+            db.storage.write(content)
+    table.clear_cache()
+    return inserted, updated
+
+
 class InputError(Exception):
     pass
 
@@ -59,19 +110,32 @@ def main():
         sys.exit(-1)
 
 
+def open_db(path, storage_name):
+    if storage_name == 'log':
+        # changes are appended as they come, so no write cache is needed
+        return tinydb.TinyDB(path, storage=AppendLogStorage)
+    return tinydb.TinyDB(path, storage=CachingMiddleware(JSONStorage))
+
+
 def _main(argv):
     args = parse_args(argv[1:])
+    if args.compact:
+        with open_db(args.output, 'log') as db:
+            db.storage.compact()
+        return
     try:
         input_json = json.load(sys.stdin)
     except json.decoder.JSONDecodeError as exc:
         raise InputError(str(exc)) from exc
     if not isinstance(input_json, (list, dict)):
         raise InputError('input must be a list or a dictionary')
-    with tinydb.TinyDB(
-            args.output, storage=CachingMiddleware(JSONStorage)
-    ) as db:
+    with open_db(args.output, args.storage) as db:
         if isinstance(input_json, list):
             insert_from_array(db, input_json)
+        elif args.upsert:
+            inserted, updated = upsert_from_object(db, input_json)
+            print(f'inserted {inserted}, updated {updated} documents',
+                  file=sys.stderr)
         else:
             insert_from_object(db, input_json)
 
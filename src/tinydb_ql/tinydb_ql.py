@@ -1,12 +1,19 @@
+import contextvars
 import functools
+import json
 import numbers
 import operator
+import os
 import re
-from collections.abc import Sized
+import threading
+from collections.abc import Mapping, Sized
 from collections import deque
 
 import jsonschema
 import tinydb
+from tinydb.middlewares import CachingMiddleware
+
+from .timing import phase
 
 # pylint: disable = too-few-public-methods
 
@@ -33,7 +40,7 @@ typename2datatype = {
     'boolean': bool,  # in python, bool is a subset of int
     'number': numbers.Number,
     'array': list,
-    'object': dict
+    'object': Mapping  # also the records of the compact storage
 }
 
 
@@ -223,29 +230,110 @@ def spec_to_schema(spec):
     return schema
 
 
+# guards the one-time initialization of the class attributes below
+_init_lock = threading.RLock()
+
+
 class ParsedObject:
     spec = {}
+    # built once per class (not inherited: a subclass has its own spec)
     loader = None
     schema = None
+    validator = None
+    # the JSON types allowed for a Param in the slots of this node
+    # (None: any value); see prepare()
+    param_types = None
 
     def __init__(self, data):
-        if self.__class__.loader is None:
-            self.__class__.loader = Loader(self.spec)
         self.data = data
-        self.value = self.loader.load(data)
+        self.value = self.get_loader().load(data)
+
+    @classmethod
+    def _get_once(cls, name, build):
+        value = cls.__dict__.get(name)
+        if value is None:
+            with _init_lock:
+                value = cls.__dict__.get(name)
+                if value is None:
+                    value = build()
+                    setattr(cls, name, value)
+        return value
+
+    @classmethod
+    def get_loader(cls):
+        return cls._get_once('loader', lambda: Loader(cls.spec))
 
     @classmethod
     def get_schema(cls):
-        if cls.schema is None:
+        def build():
             try:
-                cls.schema = spec_to_schema({'$ref': cls.__name__})
+                return spec_to_schema({'$ref': cls.__name__})
             except KeyError as exc:
                 raise LoadError(str(exc)) from exc
-        return cls.schema
+        return cls._get_once('schema', build)
+
+    @classmethod
+    def get_validator(cls):
+        def build():
+            schema = cls.get_schema()
+            try:
+                validator_class = jsonschema.validators.validator_for(schema)
+                validator_class.check_schema(schema)
+            except jsonschema.exceptions.SchemaError as exc:
+                raise LoadError(str(exc)) from exc
+            return validator_class(schema)
+        return cls._get_once('validator', build)
 
     def render(self, current):
         return self.value.render(current)
 
+    def walk(self):
+        # this node and all the parsed nodes below it
+        yield self
+        yield from _walk_value(self.value)
+
+
+def _walk_value(value):
+    if isinstance(value, ParsedObject):
+        yield from value.walk()
+    elif isinstance(value, dict):
+        for elem in value.values():
+            yield from _walk_value(elem)
+    elif isinstance(value, list):
+        for elem in value:
+            yield from _walk_value(elem)
+
+
+# the values of the parameters while rendering a prepared query
+_bound_params = contextvars.ContextVar('bound_params', default={})
+
+
+def _resolve(value, current):
+    # a literal operand, or the bound value of a Param
+    if isinstance(value, Param):
+        return value.render(current)
+    return value
+
+
+class Param(ParsedObject):
+    spec = {
+        "$comment": "$param: placeholder of a value given to PreparedQuery.bind()",
+        "type": "object",
+        "properties": {"$param": {"$ref": "String"}},
+        "required": ["$param"],
+        "additionalProperties": False
+    }
+
+    @property
+    def name(self):
+        return self.value["$param"].value
+
+    def render(self, _):
+        try:
+            return _bound_params.get()[self.name]
+        except KeyError:
+            raise QLSyntaxError(f'unbound parameter: {self.name}') from None
+
 
 class String(ParsedObject):
     spec = {
@@ -281,9 +369,13 @@ class Regex(ParsedObject):
     spec = {
         "$comment": "$re: regular expression",
         "type": "object",
-        "properties": {"$re": {"$ref": "String"}},
+        "properties": {"$re": {"anyOf": [
+            {"$ref": "String"},
+            {"$ref": "Param"}
+        ]}},
         "required": ["$re"]
     }
+    param_types = ('string',)
 
     def render(self, current):
         return self.value["$re"].render(current)
@@ -322,12 +414,14 @@ class Matches(ParsedObject):
         "properties": {
             "$matches": {"anyOf": [
                 {"$ref": "Regex"},
-                {"$ref": "String"}
+                {"$ref": "String"},
+                {"$ref": "Param"}
             ]}
         },
         "required": ["$matches"],
         "additionalProperties": False
     }
+    param_types = ('string',)
 
     def render(self, current):
         return current.matches(
@@ -343,12 +437,14 @@ class Search(ParsedObject):
         "properties": {
             "$search": {"anyOf": [
                 {"$ref": "Regex"},
-                {"$ref": "String"}
+                {"$ref": "String"},
+                {"$ref": "Param"}
             ]}
         },
         "required": ["$search"],
         "additionalProperties": False
     }
+    param_types = ('string',)
 
     def render(self, current):
         return current.search(
@@ -403,11 +499,15 @@ class Enum(ParsedObject):
         "query.one_of([...])",
         "type": "object",
         "properties": {
-            "$enum": {"$ref": "DataList"}
+            "$enum": {"anyOf": [
+                {"$ref": "DataList"},
+                {"$ref": "Param"}
+            ]}
         },
         "required": ["$enum"],
         "additionalProperties": False
     }
+    param_types = ('array',)
 
     def render(self, current):
         return current.one_of(
@@ -447,9 +547,11 @@ class DefaultEq(ParsedObject):
         "anyOf": [
             {"$ref": "Number"},
             {"$ref": "Boolean"},
-            {"$ref": "String"}
+            {"$ref": "String"},
+            {"$ref": "Param"}
         ]
     }
+    param_types = ('number', 'boolean', 'string')
 
     def render(self, current):
         return current == self.value.render(current)
@@ -470,14 +572,14 @@ class Eq(ParsedObject):
         "$comment": "match if the document is equal to the given value; ==",
         "type": "object",
         "properties": {
-            "$eq": {}
+            "$eq": {"anyOf": [{"$ref": "Param"}, {}]}
         },
         "required": ["$eq"],
         "additionalProperties": False
     }
 
     def render(self, current):
-        return current == self.value["$eq"]
+        return current == _resolve(self.value["$eq"], current)
 
 
 class Ne(ParsedObject):
@@ -485,14 +587,14 @@ class Ne(ParsedObject):
         "$comment": "match if the document exists and is unequal to the given value; !=",
         "type": "object",
         "properties": {
-            "$ne": {}
+            "$ne": {"anyOf": [{"$ref": "Param"}, {}]}
         },
         "required": ["$ne"],
         "additionalProperties": False
     }
 
     def render(self, current):
-        return current != self.value["$ne"]
+        return current != _resolve(self.value["$ne"], current)
 
 
 class Lt(ParsedObject):
@@ -500,14 +602,15 @@ class Lt(ParsedObject):
         "$comment": "match if the document is less than the given value; <",
         "type": "object",
         "properties": {
-            "$lt": {}
+            "$lt": {"anyOf": [{"$ref": "Param"}, {}]}
         },
         "required": ["$lt"],
         "additionalProperties": False
     }
+    param_types = ('number', 'string')
 
     def render(self, current):
-        return current < self.value["$lt"]
+        return current < _resolve(self.value["$lt"], current)
 
 
 class Le(ParsedObject):
@@ -515,14 +618,15 @@ class Le(ParsedObject):
         "$comment": "match if the document is less or equal to than the given value; <=",
         "type": "object",
         "properties": {
-            "$le": {}
+            "$le": {"anyOf": [{"$ref": "Param"}, {}]}
         },
         "required": ["$le"],
         "additionalProperties": False
     }
+    param_types = ('number', 'string')
 
     def render(self, current):
-        return current <= self.value["$le"]
+        return current <= _resolve(self.value["$le"], current)
 
 
 class Gt(ParsedObject):
@@ -530,14 +634,15 @@ class Gt(ParsedObject):
         "$comment": "match if the document is greater than the given value; >",
         "type": "object",
         "properties": {
-            "$gt": {}
+            "$gt": {"anyOf": [{"$ref": "Param"}, {}]}
         },
         "required": ["$gt"],
         "additionalProperties": False
     }
+    param_types = ('number', 'string')
 
     def render(self, current):
-        return current > self.value["$gt"]
+        return current > _resolve(self.value["$gt"], current)
 
 
 class Ge(ParsedObject):
@@ -545,14 +650,15 @@ class Ge(ParsedObject):
         "$comment": "match if the document is greater than or equal to the given value; >=",
         "type": "object",
         "properties": {
-            "$ge": {}
+            "$ge": {"anyOf": [{"$ref": "Param"}, {}]}
         },
         "required": ["$ge"],
         "additionalProperties": False
     }
+    param_types = ('number', 'string')
 
     def render(self, current):
-        return current >= self.value["$ge"]
+        return current >= _resolve(self.value["$ge"], current)
 
 
 class Compare(ParsedObject):
@@ -699,6 +805,103 @@ class Any(ParsedObject):
         return current.any(inner)
 
 
+def _lookup_key(value):
+    # arrays and objects are compared by their canonical JSON text
+    if isinstance(value, (list, Mapping)):
+        return ('json', json.dumps(value, sort_keys=True, default=dict))
+    return value
+
+
+def _table_version(storage, name):
+    # changes whenever the table may have changed, without reading a file:
+    # the raw table of a storage keeping the tables in memory (tinydb
+    # replaces it on every write), or the size and mtime of the file
+    if isinstance(storage, (tinydb.storages.MemoryStorage, CachingMiddleware)):
+        return (storage.read() or {}).get(name)
+    handle = getattr(storage, '_handle', None)
+    if handle is not None and not handle.closed:
+        stat = os.fstat(handle.fileno())
+        return stat.st_mtime_ns, stat.st_size
+    return None
+
+
+class Lookup(ParsedObject):
+    spec = {
+        "$comment": "$lookup: match if the field is equal to the field `field` of "
+        "a document of the table `table` matching `where`; no tinydb correspondence",
+        "type": "object",
+        "properties": {
+            "$lookup": {
+                "type": "object",
+                "properties": {
+                    "table": {"$ref": "String"},
+                    "field": {"$ref": "String"},
+                    "where": {"$ref": "TopLevel"}
+                },
+                "required": ["table", "field"],
+                "additionalProperties": False
+            }
+        },
+        "required": ["$lookup"],
+        "additionalProperties": False
+    }
+    # the TinyDB (or any of its tables) to look up; see Query()
+    database = None
+
+    def _inner_keys(self, storage, where):
+        # the keys of the inner table (of the documents matching the rendered
+        # `where`, if any), read on the first probe
+        spec = self.value["$lookup"]
+        table = tinydb.table.Table(storage, spec["table"].render(None))
+        path = spec["field"].render(None).split(".")
+        keys = set()
+        for document in table:
+            if where is not None and not where(document):
+                continue
+            value = document
+            try:
+                for key in path:
+                    value = value[key]
+            except (KeyError, TypeError):
+                continue
+            keys.add(_lookup_key(value))
+        return keys
+
+    def render(self, current):
+        if self.database is None:
+            raise QLSyntaxError('$lookup needs a database to look up')
+        storage = self.database.storage
+        spec = self.value["$lookup"]
+        # rendered now, while the parameters are bound (see prepare())
+        where = (
+            spec["where"].render(tinydb.Query()) if "where" in spec else None
+        )
+        # the tables looked up, the nested ones included
+        names = [
+            node.value["$lookup"]["table"].render(None)
+            for node in self.walk() if isinstance(node, Lookup)
+        ]
+        # (versions of the tables, keys), read again once they change
+        memo = None
+        lock = threading.Lock()
+
+        def fresh(version):
+            return memo is not None and all(
+                new is old or new == old for new, old in zip(version, memo[0])
+            )
+
+        def probe(value):
+            nonlocal memo
+            version = [_table_version(storage, name) for name in names]
+            if not fresh(version):
+                with lock:
+                    if not fresh(version):
+                        memo = version, self._inner_keys(storage, where)
+            return _lookup_key(value) in memo[1]
+        # not cacheable by tinydb: the result depends on another table
+        return current.map(ident).test(probe)
+
+
 class Verb(ParsedObject):
     spec = {
         "anyOf": [
@@ -711,6 +914,7 @@ class Verb(ParsedObject):
             {"$ref": "All"},
             {"$ref": "Length"},
             {"$ref": "Enum"},
+            {"$ref": "Lookup"},
             {"$ref": "Compare"},
             {"$ref": "And"},
             {"$ref": "Or"},
@@ -805,15 +1009,88 @@ def Schema(target=TopLevel):
     return target.get_schema()
 
 
-def Query(query):
+def parse(query):
+    # a tree of a query already parsed is not validated again
+    if isinstance(query, TopLevel):
+        return query
     entry_point = TopLevel
-    schema = Schema(entry_point)
-    try:
-        jsonschema.validators.validator_for(schema)(
-            schema
-        ).validate(query)
-    except jsonschema.exceptions.SchemaError as exc:
-        raise LoadError(str(exc)) from exc
-    except jsonschema.exceptions.ValidationError as exc:
-        raise QLSyntaxError(str(exc)) from exc
-    return entry_point(query).render(tinydb.Query())
+    with phase('validate'):
+        try:
+            entry_point.get_validator().validate(query)
+        except jsonschema.exceptions.ValidationError as exc:
+            raise QLSyntaxError(str(exc)) from exc
+        return entry_point(query)
+
+
+def bind_database(tree, database):
+    for node in tree.walk():
+        if isinstance(node, Lookup):
+            node.database = database
+
+
+def Query(query, database=None):
+    # `database`: a TinyDB (or a table of it) in which $lookup finds its tables
+    tree = parse(query)
+    with phase('compile'):
+        bind_database(tree, database)
+        return tree.render(tinydb.Query())
+
+
+def _param_slots(tree):
+    # {parameter name: [allowed JSON types of each slot (None: any)]}
+    slots = {}
+    for node in tree.walk():
+        if isinstance(node.value, dict):
+            children = node.value.values()
+        else:
+            children = [node.value]
+        for child in children:
+            if isinstance(child, Param):
+                slots.setdefault(child.name, []).append(node.param_types)
+    return slots
+
+
+class PreparedQuery:
+    # a validated query of which only the parameters change; see prepare()
+    def __init__(self, tree):
+        self.tree = tree
+        self.params = _param_slots(tree)
+
+    @staticmethod
+    def _is_of(value, types):
+        # JSON types: a boolean is not a number
+        if isinstance(value, bool):
+            return 'boolean' in types
+        return isinstance(value, tuple(
+            typename2datatype[typename] for typename in types
+        ))
+
+    def _check(self, params):
+        missing = set(self.params) - set(params)
+        if missing:
+            raise QLSyntaxError(f'unbound parameters: {sorted(missing)}')
+        unknown = set(params) - set(self.params)
+        if unknown:
+            raise QLSyntaxError(f'unknown parameters: {sorted(unknown)}')
+        for name, slots in self.params.items():
+            for types in slots:
+                if types is not None and not self._is_of(params[name], types):
+                    raise QLSyntaxError(
+                        f'parameter {name}: expected one of {list(types)}'
+                    )
+
+    def bind(self, **params):
+        self._check(params)
+        token = _bound_params.set(params)
+        try:
+            return self.tree.render(tinydb.Query())
+        finally:
+            _bound_params.reset(token)
+
+
+def prepare(query, database=None):
+    # validates the query with {"$param": name} placeholders once;
+    # PreparedQuery.bind(name=value, ...) renders it with the values
+    tree = parse(query)
+    bind_database(tree, database)
+    return PreparedQuery(tree)
@@ -0,0 +1,295 @@
+import json
+import re
+from collections.abc import Mapping
+from pathlib import Path
+
+from .cache import db_fingerprint
+from .planner import fold
+from .scan import raw_documents
+from .tinydb_ql import DefaultSearch, Matches, Param, Search, parse
+
+try:
+    import re._parser as sre_parse
+    import re._constants as sre_constants
+except ImportError:  # python < 3.11
+    import sre_parse  # pylint: disable = deprecated-module
+    import sre_constants  # pylint: disable = deprecated-module
+
+# Requirements on the strings a regex can match (after Russ Cox,
+# "Regular Expression Matching with a Trigram Index"), as
+#   ANY: nothing is known,
+#   a str: the string contains this substring,
+#   ('and', [...]), ('or', [...]): conjunctions and disjunctions of the above.
+ANY = None
+# exact sets larger than this are given up and turned into requirements
+MAX_EXACT = 16
+MAX_CLASS = 8
+
+
+def _and(*requirements):
+    requirements = [req for req in requirements if req is not ANY]
+    if not requirements:
+        return ANY
+    if len(requirements) == 1:
+        return requirements[0]
+    return ('and', requirements)
+
+
+def _or(*requirements):
+    if not requirements or any(req is ANY for req in requirements):
+        return ANY
+    if len(requirements) == 1:
+        return requirements[0]
+    return ('or', list(requirements))
+
+
+def _from_exact(strings):
+    # every match contains one of the strings
+    return _or(*(
+        string if len(string) >= 3 else ANY for string in sorted(strings)
+    ))
+
+
+class _Info:
+    # `exact`: all the strings the pattern matches (None if unknown or many)
+    # `match`: the requirement on the strings the pattern matches
+    __slots__ = ('exact', 'match')
+
+    def __init__(self, exact=None, match=ANY):
+        self.exact = exact
+        self.match = match
+
+    def requirement(self):
+        if self.exact is not None:
+            return _and(_from_exact(self.exact), self.match)
+        return self.match
+
+
+def _class_members(items):
+    members = set()
+    for operator, argument in items:
+        if operator is sre_constants.LITERAL:
+            members.add(chr(argument))
+        elif (operator is sre_constants.RANGE
+              and argument[1] - argument[0] < MAX_CLASS):
+            low, high = argument
+            members.update(chr(code) for code in range(low, high + 1))
+        else:
+            return None
+    return members if len(members) <= MAX_CLASS else None
+
+
+def _analyze_item(operator, argument):
+    # pylint: disable = too-many-return-statements
+    if operator is sre_constants.LITERAL:
+        return _Info({chr(argument)})
+    if operator is sre_constants.AT:
+        return _Info({''})
+    if operator is sre_constants.IN:
+        members = _class_members(argument)
+        return _Info(members) if members else _Info()
+    if operator is sre_constants.SUBPATTERN:
+        add_flags = argument[1]
+        if add_flags & re.IGNORECASE:
+            return _Info()
+        return _analyze_sequence(argument[-1])
+    if operator is sre_constants.BRANCH:
+        alternatives = [_analyze_sequence(alt) for alt in argument[1]]
+        if all(alt.exact is not None for alt in alternatives):
+            exact = set().union(*(alt.exact for alt in alternatives))
+            if len(exact) <= MAX_EXACT:
+                return _Info(exact)
+        return _Info(match=_or(*(alt.requirement() for alt in alternatives)))
+    if operator in _REPEATS:
+        low, _, subpattern = argument
+        if low == 0:
+            return _Info()
+        # the subpattern appears at least once
+        return _Info(match=_analyze_sequence(subpattern).requirement())
+    return _Info()
+
+
+_REPEATS = [
+    getattr(sre_constants, name)
+    for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+    if hasattr(sre_constants, name)
+]
+
+
+def _analyze_sequence(items):
+    # concatenate the exact sets as long as they stay small
+    current = {''}
+    exact = True
+    requirements = []
+    for operator, argument in items:
+        info = _analyze_item(operator, argument)
+        if info.exact is not None:
+            product = {head + tail for head in current for tail in info.exact}
+            if len(product) <= MAX_EXACT:
+                current = product
+            else:
+                requirements.append(_from_exact(current))
+                current = info.exact
+                exact = False
+        else:
+            requirements.append(_from_exact(current))
+            current = {''}
+            exact = False
+        requirements.append(info.match)
+    if exact:
+        return _Info(current, _and(*requirements))
+    return _Info(match=_and(*requirements, _from_exact(current)))
+
+
+def regex_requirement(pattern):
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return ANY
+    if parsed.state.flags & re.IGNORECASE:
+        return ANY
+    return _analyze_sequence(list(parsed)).requirement()
+
+
+def trigrams(string):
+    return {string[i:i + 3] for i in range(len(string) - 2)}
+
+
+def _lookup(postings, requirement):
+    # candidate doc_ids (None: all)
+    if requirement is ANY:
+        return None
+    if isinstance(requirement, str):
+        result = None
+        for trigram in trigrams(requirement):
+            doc_ids = postings.get(trigram, ())
+            result = set(doc_ids) if result is None else result & set(doc_ids)
+            if not result:
+                break
+        return result
+    operator, operands = requirement
+    candidates = [_lookup(postings, operand) for operand in operands]
+    if operator == 'and':
+        known = [elem for elem in candidates if elem is not None]
+        return set.intersection(*known) if known else None
+    if any(elem is None for elem in candidates):
+        return None
+    return set().union(*candidates)
+
+
+class _CandidateVisitor:
+    # a set of candidate doc_ids, or None for all
+    top = None
+    bottom = frozenset()
+
+    def __init__(self, index):
+        self.index = index
+
+    def leaf(self, node, path):
+        postings = self.index.get('.'.join(path))
+        if postings is None:
+            return None
+        if isinstance(node, Search):
+            operand = node.value['$search']
+        elif isinstance(node, Matches):
+            operand = node.value['$matches']
+        elif isinstance(node, DefaultSearch):
+            operand = node.value
+        else:
+            return None
+        if any(isinstance(elem, Param) for elem in operand.walk()):
+            return None
+        return _lookup(postings, regex_requirement(operand.render(None)))
+
+    @staticmethod
+    def meet(values):
+        known = [value for value in values if value is not None]
+        return set.intersection(*map(set, known)) if known else None
+
+    @staticmethod
+    def join(values):
+        values = list(values)
+        if any(value is None for value in values):
+            return None
+        return set().union(*values)
+
+    @staticmethod
+    def negate(_):
+        return None
+
+
+def _string_at(document, path):
+    for key in path:
+        if not isinstance(document, Mapping) or key not in document:
+            return None
+        document = document[key]
+    return document if isinstance(document, str) else None
+
+
+def build_postings(table, path):
+    # {trigram: [doc_id, ...]} of the string values at the dotted `path`
+    postings = {}
+    keys = path.split('.')
+    for doc_id, document in raw_documents(table):
+        value = _string_at(document, keys)
+        if value is None:
+            continue
+        for trigram in trigrams(value):
+            postings.setdefault(trigram, []).append(doc_id)
+    return postings
+
+
+class TrigramIndex:
+    # trigram posting lists of the string fields of a DB file,
+    # persisted next to it as <db path>.trigram.json
+    def __init__(self, fingerprint, tables=None):
+        self.fingerprint = fingerprint
+        self.tables = tables if tables is not None else {}
+        self.modified = False
+
+    @staticmethod
+    def path_for(dbpath):
+        return Path(f'{dbpath}.trigram.json')
+
+    @classmethod
+    def load(cls, dbpath):
+        fingerprint = db_fingerprint(dbpath)
+        try:
+            with cls.path_for(dbpath).open() as stream:
+                content = json.load(stream)
+        except (FileNotFoundError, ValueError):
+            return cls(fingerprint)
+        if content.get('fingerprint') != fingerprint:
+            return cls(fingerprint)
+        return cls(fingerprint, content['tables'])
+
+    def save(self, dbpath):
+        with self.path_for(dbpath).open('w') as stream:
+            json.dump({
+                'fingerprint': self.fingerprint, 'tables': self.tables
+            }, stream)
+
+    def add_paths(self, table, paths):
+        indexed = self.tables.setdefault(table.name, {})
+        for path in paths:
+            if path not in indexed:
+                indexed[path] = build_postings(table, path)
+                self.modified = True
+
+    def candidates(self, table, query):
+        # doc_ids which may match the query (None: all of them)
+        return fold(parse(query), _CandidateVisitor(
+            self.tables.get(table.name, {})
+        ))
+
+    def documents(self, table, query, documents=None):
+        # narrow down (doc_id, document) pairs to the candidates
+        if documents is None:
+            documents = raw_documents(table)
+        candidates = self.candidates(table, query)
+        if candidates is None:
+            return documents
+        return (
+            (doc_id, document) for doc_id, document in documents
+            if doc_id in candidates
+        )
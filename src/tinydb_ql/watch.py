@@ -0,0 +1,94 @@
+import collections
+import json
+import os
+import time
+
+import tinydb
+from tinydb.storages import JSONStorage
+
+from .compact import to_builtin
+from .scan import compile_query
+
+Delta = collections.namedtuple('Delta', ['entered', 'changed', 'left'])
+
+
+class Watcher:
+    # keeps the last seen table and the matching doc_ids, and re-evaluates
+    # the query only on the added or modified documents on each change
+    def __init__(self, dbpath, table_name, query, storage=JSONStorage):
+        # pylint: disable = too-many-arguments
+        self._dbpath = dbpath
+        self._table_name = table_name or tinydb.TinyDB.default_table_name
+        self._storage = storage
+        self._cond = compile_query(query)
+        self._signature = None
+        self._documents = {}
+        self._matches = set()
+
+    def _file_signature(self):
+        stat = os.stat(self._dbpath)
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _read_table(self):
+        storage = self._storage(self._dbpath, access_mode='r')
+        try:
+            tables = storage.read()
+        finally:
+            storage.close()
+        return (tables or {}).get(self._table_name, {})
+
+    def poll(self):
+        # returns None when the file is unchanged (or is being rewritten)
+        signature = self._file_signature()
+        if signature == self._signature:
+            return None
+        try:
+            documents = self._read_table()
+        except ValueError:
+            # caught in the middle of a rewrite; retry on the next poll
+            return None
+        self._signature = signature
+        delta = Delta({}, {}, [])
+        for doc_id in self._documents.keys() - documents.keys():
+            if doc_id in self._matches:
+                self._matches.remove(doc_id)
+                delta.left.append(doc_id)
+        for doc_id, document in documents.items():
+            previous = self._documents.get(doc_id)
+            if previous is not None and previous == document:
+                continue
+            if self._cond(document):
+                if doc_id in self._matches:
+                    delta.changed[doc_id] = document
+                else:
+                    self._matches.add(doc_id)
+                    delta.entered[doc_id] = document
+            elif doc_id in self._matches:
+                self._matches.remove(doc_id)
+                delta.left.append(doc_id)
+        self._documents = documents
+        return delta
+
+    @property
+    def matches(self):
+        return {doc_id: self._documents[doc_id] for doc_id in self._matches}
+
+
+def format_delta(delta, as_json):
+    if as_json:
+        return json.dumps(to_builtin(delta._asdict()))
+    lines = [
+        *(f'+ {doc_id}: {doc!r}' for doc_id, doc in delta.entered.items()),
+        *(f'~ {doc_id}: {doc!r}' for doc_id, doc in delta.changed.items()),
+        *(f'- {doc_id}' for doc_id in delta.left)
+    ]
+    return '\n'.join(lines)
+
+
+def watch(watcher, interval, as_json, stream):
+    # prints the initial matches, then the changes on each DB update
+    while True:
+        delta = watcher.poll()
+        if delta is not None and (delta.entered or delta.changed or delta.left):
+            print(format_delta(delta, as_json), file=stream, flush=True)
+        time.sleep(interval)
@@ -0,0 +1,237 @@
+import itertools
+import json
+import numbers
+from collections import deque
+from collections.abc import Mapping
+from pathlib import Path
+
+from .cache import db_fingerprint
+from .planner import BoundVisitor, fold
+from .scan import raw_documents
+from .tinydb_ql import (DefaultEq, Eq, Exists, Ge, Gt, Le, Lt, Param, Types,
+                        parse, typename2datatype)
+
+DEFAULT_BLOCK_SIZE = 1024
+
+# a sample value of each kind, to evaluate $types against a kind
+KIND_SAMPLES = {
+    'null': None,
+    'boolean': True,
+    'number': 0,
+    'string': '',
+    'array': [],
+    'object': {}
+}
+NUMERIC_KINDS = {'boolean', 'number'}
+
+
+def kind_of(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, numbers.Number):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, list):
+        return 'array'
+    if isinstance(value, Mapping):
+        return 'object'
+    return 'other'
+
+
+class _FieldStats:
+    __slots__ = ('count', 'kinds', 'low', 'high')
+
+    def __init__(self):
+        self.count = 0
+        self.kinds = set()
+        self.low = self.high = None
+
+    def add(self, value, kind):
+        self.count += 1
+        self.kinds.add(kind)
+        if kind not in NUMERIC_KINDS and kind != 'string':
+            return
+        if self.low is None:
+            self.low = self.high = value
+        elif isinstance(self.low, str) == isinstance(value, str):
+            # values of mixed kinds have no min/max anyway (see dump())
+            self.low = min(self.low, value)
+            self.high = max(self.high, value)
+
+    def dump(self):
+        # min/max only make sense when all the values are comparable
+        ordered = (
+            self.kinds <= NUMERIC_KINDS or self.kinds == {'string'}
+        )
+        return [
+            self.count, sorted(self.kinds),
+            self.low if ordered else None, self.high if ordered else None
+        ]
+
+
+def _collect_fields(stats, document, prefix=''):
+    for key, value in document.items():
+        path = prefix + key
+        kind = kind_of(value)
+        field = stats.get(path)
+        if field is None:
+            field = stats[path] = _FieldStats()
+        field.add(value, kind)
+        if kind == 'object':
+            _collect_fields(stats, value, path + '.')
+
+
+def build_blocks(table, block_size=DEFAULT_BLOCK_SIZE):
+    # per block of `block_size` documents (in the storage order):
+    # {path: [present count, JSON kinds, min, max]}
+    blocks = []
+    documents = iter(raw_documents(table))
+    while True:
+        chunk = list(itertools.islice(documents, block_size))
+        if not chunk:
+            return blocks
+        stats = {}
+        for _, document in chunk:
+            _collect_fields(stats, document)
+        blocks.append({
+            'length': len(chunk),
+            'fields': {path: field.dump() for path, field in stats.items()}
+        })
+
+
+class _BlockVisitor(BoundVisitor):
+    def __init__(self, block):
+        self.length = block['length']
+        self.fields = block['fields']
+
+    def leaf(self, node, path):
+        # pylint: disable = too-many-return-statements
+        field = self.fields.get('.'.join(path))
+        count, kinds, low, high = field if field else (0, [], None, None)
+        kinds = set(kinds)
+        if isinstance(node, Exists):
+            if node.value['$exists'].value:
+                return count > 0
+            return count < self.length
+        if not path:
+            return True
+        if count == 0:
+            # all the remaining predicates need the field to exist
+            return False
+        if isinstance(node, Types):
+            allowed = tuple(
+                typename2datatype[name] for name in node.value['$types']
+            )
+            return any(
+                isinstance(KIND_SAMPLES[kind], allowed)
+                for kind in kinds if kind in KIND_SAMPLES
+            )
+        if isinstance(node, (DefaultEq, Eq)):
+            operand = (
+                node.value if isinstance(node, DefaultEq) else node.value['$eq']
+            )
+            if isinstance(operand, Param):
+                return True
+            value = operand.value if isinstance(node, DefaultEq) else operand
+            kind = kind_of(value)
+            if kind in NUMERIC_KINDS:
+                if not kinds & NUMERIC_KINDS:
+                    return False
+            elif kind not in kinds:
+                return False
+            return _within(value, kind, kinds, low, high)
+        for cls, operator, test in _RANGE_TESTS:
+            if isinstance(node, cls):
+                value = node.value[operator]
+                if isinstance(value, Param):
+                    return True
+                kind = kind_of(value)
+                if low is None or not _ordered_together(kind, kinds):
+                    return True
+                return test(low, high, value)
+        return True
+
+
+_RANGE_TESTS = [
+    (Lt, '$lt', lambda low, high, value: low < value),
+    (Le, '$le', lambda low, high, value: low <= value),
+    (Gt, '$gt', lambda low, high, value: high > value),
+    (Ge, '$ge', lambda low, high, value: high >= value)
+]
+
+
+def _ordered_together(kind, kinds):
+    if kind in NUMERIC_KINDS:
+        return kinds <= NUMERIC_KINDS
+    return kind == 'string' and kinds == {'string'}
+
+
+def _within(value, kind, kinds, low, high):
+    if low is None or not _ordered_together(kind, kinds):
+        return True
+    return low <= value <= high
+
+
+def may_match(tree, block):
+    return fold(tree, _BlockVisitor(block))
+
+
+class ZoneMap:
+    # per-block field statistics of the tables of a DB file,
+    # persisted next to it as <db path>.zonemap.json
+    def __init__(self, fingerprint, block_size, tables=None):
+        self.fingerprint = fingerprint
+        self.block_size = block_size
+        self.tables = tables if tables is not None else {}
+        self.modified = False
+
+    @staticmethod
+    def path_for(dbpath):
+        return Path(f'{dbpath}.zonemap.json')
+
+    @classmethod
+    def load(cls, dbpath, block_size=DEFAULT_BLOCK_SIZE):
+        # an empty zone map if missing, outdated, or of a different block size
+        fingerprint = db_fingerprint(dbpath)
+        try:
+            with cls.path_for(dbpath).open() as stream:
+                content = json.load(stream)
+        except (FileNotFoundError, ValueError):
+            return cls(fingerprint, block_size)
+        if (content.get('fingerprint') != fingerprint
+                or content.get('block_size') != block_size):
+            return cls(fingerprint, block_size)
+        return cls(fingerprint, block_size, content['tables'])
+
+    def save(self, dbpath):
+        with self.path_for(dbpath).open('w') as stream:
+            json.dump({
+                'fingerprint': self.fingerprint,
+                'block_size': self.block_size,
+                'tables': self.tables
+            }, stream)
+
+    def blocks(self, table):
+        # builds (and keeps) the statistics of the table when missing
+        blocks = self.tables.get(table.name)
+        if blocks is None or sum(
+                block['length'] for block in blocks
+        ) != len(table):
+            blocks = build_blocks(table, self.block_size)
+            self.tables[table.name] = blocks
+            self.modified = True
+        return blocks
+
+    def documents(self, table, query):
+        # (doc_id, document) pairs of the blocks which may match the query
+        tree = parse(query)
+        documents = iter(raw_documents(table))
+        for block in self.blocks(table):
+            chunk = itertools.islice(documents, block['length'])
+            if may_match(tree, block):
+                yield from chunk
+            else:
+                deque(chunk, maxlen=0)
@@ -1,10 +1,13 @@
 
 import contextlib
+import io
+import json
 
 import pytest
 import tinydb
 
 import tinydb_ql as QL
+from tinydb_ql import tinydb_dump
 
 @contextlib.contextmanager
 def _db_instance(*args, **kwargs):
@@ -81,6 +84,23 @@ def fs_db(tmp_path):
         return db_path
 
 
+@pytest.fixture(name='large_db_size')
+def _large_db_size():
+    return 10000
+
+
+@pytest.fixture(name='large_db')
+def _large_db(large_db_size):
+    # on-memory documents {'n', 'odd', 'user': {'id'}} with 5000 user ids at
+    # most; a module (or parametrize) overrides large_db_size for their number
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple(
+        {'n': n, 'odd': n % 2 == 1, 'user': {'id': n % 5000}}
+        for n in range(large_db_size)
+    )
+    yield db
+
+
 @pytest.fixture(name='run_test_query')
 def _run_test_query(db_instance):
     def runner(test_spec):
@@ -110,3 +130,11 @@ def _run_test_error():
         with pytest.raises(QL.QLSyntaxError):
             QL.Query(ql)
     yield runner
+
+
+@pytest.fixture(name='run_dump')
+def _run_dump(monkeypatch):
+    def runner(db_path, data, *args):
+        monkeypatch.setattr('sys.stdin', io.StringIO(json.dumps(data)))
+        tinydb_dump._main(['tinydb-dump', str(db_path), *args])
+    yield runner
@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+
+QUERIES = [
+    {},
+    {'status.lang': 'jp'},
+    {'$or': [{'age': {'$lt': 13}}, {'name': {'$re': 'o$'}}]},
+    {'name': 'nobody'}
+]
+
+
+@pytest.mark.parametrize('query', QUERIES)
+@pytest.mark.parametrize('chunk_size', [1, 2, 1000])
+def test_asearch(db_instance, query, chunk_size):
+    result = asyncio.run(QL.asearch(db_instance, query, chunk_size=chunk_size))
+    assert result == db_instance.search(QL.Query(query))
+    assert [doc.doc_id for doc in result] == [
+        doc.doc_id for doc in db_instance.search(QL.Query(query))
+    ]
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_asearch_executor(db_instance, query):
+    async def run():
+        with ThreadPoolExecutor(2) as executor:
+            return await QL.asearch(
+                db_instance, query, chunk_size=2, executor=executor
+            )
+    assert asyncio.run(run()) == db_instance.search(QL.Query(query))
+
+
+def test_aiter_search_cancellation():
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple({'n': n} for n in range(10000))
+    seen = []
+
+    async def consume():
+        async for doc in QL.aiter_search(db, {'n': {'$ge': 0}}, chunk_size=10):
+            seen.append(doc['n'])
+
+    async def run():
+        task = asyncio.create_task(consume())
+        while len(seen) < 10:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert 10 <= len(seen) < 10000
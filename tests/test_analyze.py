@@ -0,0 +1,80 @@
+import json
+import random
+
+import pytest
+import tinydb
+
+from tinydb_ql import analyze
+from tinydb_ql.__main__ import _main
+
+
+def test_analyze(db_instance):
+    report = analyze.analyze(db_instance)
+    assert (report['table'], report['documents']) == ('_default', 5)
+    fields = report['fields']
+    assert fields['age'] == {
+        'count': 5, 'frequency': 1.0, 'types': {'number': 5},
+        'cardinality': 5, 'cardinality_capped': False,
+        'number_range': [12, 16]
+    }
+    assert fields['blob']['types'] == {
+        'array': 1, 'boolean': 1, 'number': 1, 'object': 1, 'string': 1
+    }
+    assert fields['blob']['cardinality'] == 3
+    assert fields['blob.a']['frequency'] == 0.2
+    assert fields['status.lang'] == {
+        'count': 3, 'frequency': 0.6, 'types': {'string': 3},
+        'cardinality': 1, 'cardinality_capped': False,
+        'string_range': ['jp', 'jp']
+    }
+    assert fields['status.by-stage']['array_lengths'] == {
+        '2-3': 3, '4-7': 2
+    }
+    assert fields['status.by-stage[]']['count'] == 17
+    assert 'frequency' not in fields['status.by-stage[]']
+    assert 'frequency' not in fields['status.by-stage[].score']
+    assert fields['status.by-stage[].score']['number_range'] == [40, 100]
+    assert fields['bonus[]']['cardinality'] == 5
+
+
+def test_query_and_sample(db_instance):
+    report = analyze.analyze(db_instance, {'status.lang': 'jp'})
+    assert report['documents'] == 3
+    assert report['fields']['age']['number_range'] == [13, 16]
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple({'n': n} for n in range(10000))
+    report = analyze.analyze(db, sample=0.1, rng=random.Random(0))
+    assert report['scanned'] == 10000
+    assert 800 < report['documents'] < 1200
+    assert report['fields']['n']['frequency'] == 1.0
+
+
+def test_cardinality_cap(monkeypatch):
+    monkeypatch.setattr(analyze, 'MAX_DISTINCT', 10)
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple({'n': n, 'm': n % 3} for n in range(100))
+    fields = analyze.analyze(db)['fields']
+    assert (fields['n']['cardinality'], fields['n']['cardinality_capped']) == (
+        10, True
+    )
+    assert fields['m']['cardinality'] == 3
+
+
+@pytest.mark.parametrize('length, bucket', [
+    (0, '0'), (1, '1'), (2, '2-3'), (3, '2-3'), (4, '4-7'), (1000, '512-1023')
+])
+def test_length_bucket(length, bucket):
+    assert analyze.length_bucket(length) == bucket
+
+
+def test_commandline(db_path, tmp_path, capsys):
+    output = tmp_path / 'stats.json'
+    _main(['main', str(db_path), '--analyze', '--json',
+           '--analyze-output', str(output)])
+    report = json.loads(capsys.readouterr().out)
+    assert report == json.loads(output.read_text())
+    assert report['fields']['name']['cardinality'] == 5
+    _main(['main', str(db_path), '{"age": {"$lt": 14}}', '--analyze'])
+    out = capsys.readouterr().out
+    assert out.startswith('table _default: 2 documents\n')
+    assert "  string: 'bob' .. 'taro'\n" in out
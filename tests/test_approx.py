@@ -0,0 +1,104 @@
+import random
+
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql import approx
+from tinydb_ql.__main__ import _main
+
+
+def test_estimate_search(large_db):
+    matches, estimate = approx.estimate_search(
+        large_db, {'n': {'$lt': 2500}}, fraction=0.1, rng=random.Random(1)
+    )
+    assert (estimate.scanned, estimate.population) == (1000, 10000)
+    assert estimate.matches == len(matches)
+    assert all(doc['n'] < 2500 for doc in matches)
+    assert [doc.doc_id for doc in matches] == sorted(
+        doc.doc_id for doc in matches
+    )
+    assert estimate.low < 2500 < estimate.high
+    assert estimate.high - estimate.low < 600
+
+
+def test_coverage(large_db):
+    # about 95% of the intervals contain the true total
+    query = QL.Query({'n': {'$lt': 300}})
+    rng = random.Random(2)
+    covered = 0
+    for _ in range(200):
+        _, estimate = approx.estimate_search(large_db, query, size=500, rng=rng)
+        covered += estimate.low <= 300 <= estimate.high
+    assert 180 <= covered <= 200
+
+
+@pytest.mark.parametrize('matches, scanned, population, bounds', [
+    (0, 100, 1000, (0, 1000)),
+    (100, 100, 1000, (100, 1000)),
+    (7, 10, 10, (7, 7)),
+    (0, 0, 10, (0, 10))
+])
+def test_estimate_bounds(matches, scanned, population, bounds):
+    estimate = approx.estimate_total(matches, scanned, population)
+    low, high = bounds
+    assert low <= estimate.low <= estimate.high <= high
+    if scanned == population:
+        assert estimate.total == estimate.low == estimate.high == matches
+
+
+def test_reservoir_search(large_db):
+    result, matches = approx.reservoir_search(
+        large_db, {'odd': True}, 10, rng=random.Random(3)
+    )
+    assert matches == 5000
+    assert len(result) == 10
+    assert all(doc['odd'] for doc in result)
+    assert [doc.doc_id for doc in result] == sorted(
+        doc.doc_id for doc in result
+    )
+    result, matches = approx.reservoir_search(large_db, {'n': {'$lt': 5}}, 10)
+    assert [doc['n'] for doc in result] == list(range(5))
+
+
+def test_reservoir_uniform():
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple({'n': n} for n in range(20))
+    query = QL.Query({'n': {'$lt': 10}})
+    rng = random.Random(4)
+    counts = [0] * 10
+    for _ in range(2000):
+        result, _ = approx.reservoir_search(db, query, 2, rng=rng)
+        for doc in result:
+            counts[doc['n']] += 1
+    assert all(300 < count < 500 for count in counts)
+
+
+def test_commandline(db_path, capsys):
+    _main(['main', str(db_path), '{"status.lang": "jp"}', '--scan-docs', '5'])
+    assert 'in 5 of 5 documents on the default table; estimated total: 3' in (
+        capsys.readouterr().err
+    )
+    _main(['main', str(db_path), '{"status.lang": "jp"}',
+           '--scan-fraction', '1', '--count'])
+    assert capsys.readouterr().out == '3\n'
+    _main(['main', str(db_path), '{"status.lang": "jp"}', '--sample', '2'])
+    assert 'found 3 documents on the default table (2 sampled).' in (
+        capsys.readouterr().err
+    )
+    with pytest.raises(SystemExit):
+        _main(['main', str(db_path), '{}', '--scan-docs', '2', '--limit', '1'])
+
+
+def test_small_fraction(db_path, capsys):
+    # a fraction of a few documents still samples one
+    _main(['main', str(db_path), '{"status.lang": "jp"}',
+           '--scan-fraction', '0.01', '--count'])
+    captured = capsys.readouterr()
+    assert captured.out in ('0\n', '5\n')
+    assert 'in 1 of 5 documents on the default table' in captured.err
+    _, estimate = approx.estimate_search(
+        tinydb.TinyDB(storage=tinydb.storages.MemoryStorage), {},
+        fraction=0.01
+    )
+    assert estimate.total == 0
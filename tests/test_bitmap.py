@@ -0,0 +1,105 @@
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql.bitmap import BitmapCache
+
+QUERIES = [
+    {},
+    {'status.lang': 'jp'},
+    {'status': {'gameover': False, 'lang': 'jp'}},
+    {'$or': [{'status.lang': 'jp'}, {'age': {'$lt': 13}}]},
+    {'$not': {'status.lang': 'jp'}},
+    {'$not': {'status.lang': {'$exists': True}}},
+    {'$and': [{'$not': {'age': {'$gt': 14}}}, {'status.gameover': False}]},
+    {'$or': []},
+    {'$and': []},
+    {'bonus': {'$any': ['orb']}},
+    {'blob': {'$not': {'$types': ['number']}}},
+    {'$fragment': {'age': 14, 'name': 'alice'}},
+    {'name': {'$re': 'o$'}}
+]
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_same_result(db_instance, query):
+    cache = BitmapCache()
+    expected = db_instance.search(QL.Query(query))
+    for _ in range(2):
+        result = cache.search(db_instance, query)
+        assert result == expected
+        assert [doc.doc_id for doc in result] == [
+            doc.doc_id for doc in expected
+        ]
+
+
+def test_shared_subclauses(db_instance):
+    cache = BitmapCache()
+    cache.search(db_instance, {'status.lang': 'jp', 'age': {'$lt': 15}})
+    assert (cache.hits, cache.misses) == (0, 2)
+    result = cache.search(db_instance, {'$or': [
+        {'status': {'lang': 'jp'}}, {'$not': {'age': {'$lt': 15}}}
+    ]})
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert result == db_instance.search(
+        (tinydb.Query().status.lang == 'jp') | ~(tinydb.Query().age < 15)
+    )
+
+
+def test_invalidation(db_instance):
+    cache = BitmapCache()
+    query = {'status.lang': 'jp'}
+    assert len(cache.search(db_instance, query)) == 3
+    db_instance.insert({'status': {'lang': 'jp'}})
+    assert len(cache.search(db_instance, query)) == 4
+    db_instance.update({'status': {'lang': 'en'}}, doc_ids=[3])
+    assert len(cache.search(db_instance, query)) == 3
+    assert cache.misses == 3
+    other = db_instance.table('other')
+    other.insert({'status': {'lang': 'jp'}})
+    assert len(cache.search(other, query)) == 1
+    assert len(cache.search(db_instance, query)) == 3
+    assert cache.hits == 1
+
+
+def test_eviction():
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple({'n': n % 10} for n in range(10000))
+    cache = BitmapCache(max_bytes=3000)
+    for n in range(10):
+        assert len(cache.search(db, {'n': n})) == 1000
+        assert cache.size <= 3000
+    assert len(cache._bitmaps) == 2
+    cache.search(db, {'n': 9})
+    assert cache.hits == 1
+
+
+def test_uncached_subtrees(db_instance):
+    cache = BitmapCache()
+    db_instance.table('names').insert({'name': 'bob'})
+    query = {'age': 12, 'name': {'$lookup': {'table': 'names', 'field': 'name'}}}
+    assert len(cache.search(db_instance, query, database=db_instance)) == 1
+    assert len(cache._bitmaps) == 1
+    db_instance.table('names').insert({'name': 'alice'})
+    query = {'name': {'$lookup': {'table': 'names', 'field': 'name'}}}
+    assert len(cache.search(db_instance, query, database=db_instance)) == 2
+
+
+@pytest.mark.parametrize('query', [
+    {'a': {'$and': [{'$types': ['number']}, {'$gt': 0}]}},
+    {'a': {'$or': [{'$not': {'$types': ['number']}}, {'$gt': 0}]}},
+    {'$and': [{'a': {'$types': ['number']}}, {'a': {'$gt': 0}}]},
+    {'$not': {'a': {'$and': [{'$types': ['number']}, {'$lt': 0}]}}}
+])
+def test_short_circuit(query):
+    # the later operands are not evaluated on the documents already decided
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple([{'a': 1}, {'a': 'x'}, {'a': -1}, {'b': 1}])
+    cache = BitmapCache()
+    expected = QL.search(db, query)
+    for _ in range(2):
+        assert cache.search(db, query) == expected
+    with pytest.raises(TypeError):
+        QL.search(db, {'a': {'$gt': 0}})
+    with pytest.raises(TypeError):
+        cache.search(db, {'a': {'$gt': 0}})
@@ -0,0 +1,53 @@
+import pytest
+
+import tinydb_ql as QL
+from tinydb_ql import scan
+from tinydb_ql.__main__ import main
+
+
+@pytest.fixture(name='large_db_size')
+def _large_db_size():
+    return 5000
+
+
+def test_no_limits(db_instance):
+    query = {'status.lang': 'jp'}
+    assert QL.search(db_instance, query) == db_instance.search(QL.Query(query))
+    assert QL.search(
+        db_instance, query, max_scan=5, max_results=3, timeout=10
+    ) == db_instance.search(QL.Query(query))
+
+
+def test_max_scan(large_db):
+    with pytest.raises(QL.BudgetExceeded) as exc_info:
+        QL.search(large_db, {'n': {'$lt': 10}}, max_scan=3000)
+    assert exc_info.value.scanned == 3000
+    assert [doc['n'] for doc in exc_info.value.matches] == list(range(10))
+    assert len(QL.search(large_db, {'n': {'$lt': 10}}, max_scan=5000)) == 10
+
+
+def test_max_results(large_db):
+    with pytest.raises(QL.BudgetExceeded) as exc_info:
+        QL.search(large_db, {'n': {'$ge': 2000}}, max_results=10)
+    assert [doc['n'] for doc in exc_info.value.matches] == list(
+        range(2000, 2010)
+    )
+    assert exc_info.value.scanned < 5000
+
+
+def test_timeout(large_db, monkeypatch):
+    monkeypatch.setattr(scan, 'CHECK_INTERVAL', 100)
+    with pytest.raises(QL.BudgetExceeded) as exc_info:
+        QL.search(large_db, {'n': {'$ge': 0}}, timeout=-1)
+    assert exc_info.value.scanned == 100
+    assert len(exc_info.value.matches) == 100
+
+
+def test_commandline_exit_code(db_path, monkeypatch, capsys):
+    monkeypatch.setattr(
+        'sys.argv', ['main', str(db_path), '{}', '--max-results', '2']
+    )
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == -2
+    assert 'result limit' in capsys.readouterr().err
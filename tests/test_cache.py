@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+import tinydb
+
+from tinydb_ql.__main__ import _main
+from tinydb_ql.cache import ResultCache
+from tinydb_ql.scan import BudgetExceeded
+
+
+def test_cache(db_path, tmp_path):
+    cache = ResultCache(tmp_path / 'cache')
+    query = {'status.lang': 'jp'}
+    assert cache.get(db_path, None, query) is None
+    cache.put(db_path, None, query, [3, 4, 5])
+    assert cache.get(db_path, None, query) == [3, 4, 5]
+    assert cache.get(db_path, 'another', query) is None
+    assert cache.get(db_path, None, {'status.lang': 'en'}) is None
+
+    with tinydb.TinyDB(db_path) as db:
+        db.insert({'name': 'jiro'})
+    assert cache.get(db_path, None, query) is None
+    assert not list((tmp_path / 'cache').iterdir())
+
+
+def test_eviction(db_path, tmp_path):
+    cache = ResultCache(tmp_path / 'cache', max_bytes=1000)
+    for age in range(20):
+        cache.put(db_path, None, {'age': age}, [1])
+        os.utime(
+            tmp_path / 'cache' / cache._entry_names(
+                db_path, None, {'age': age}
+            )[1],
+            ns=(age, age)
+        )
+        cache.get(db_path, None, {'age': 0})  # keep it recently used
+    entries = list((tmp_path / 'cache').iterdir())
+    assert sum(entry.stat().st_size for entry in entries) <= 1000
+    assert cache.get(db_path, None, {'age': 0}) == [1]
+    assert cache.get(db_path, None, {'age': 1}) is None
+
+
+def test_commandline(db_path, tmp_path, capsys, monkeypatch):
+    args = ['main', str(db_path), '{"status.lang": "jp"}',
+            '--cache-dir', str(tmp_path / 'cache')]
+    _main(args + ['--json'])
+    expected = json.loads(capsys.readouterr().out)
+
+    def no_load(*_, **__):
+        raise AssertionError('the DB should not be searched')
+    monkeypatch.setattr('tinydb_ql.__main__.search', no_load)
+    _main(args + ['--json'])
+    assert json.loads(capsys.readouterr().out) == expected
+    monkeypatch.setattr('tinydb_ql.__main__.load_data', no_load)
+    _main(args + ['--count'])
+    assert capsys.readouterr().out == '3\n'
+
+
+@pytest.mark.parametrize('option', [[], ['--count'], ['--ids-only']])
+def test_commandline_max_results(db_path, tmp_path, capsys, option):
+    # a cached result exceeds the budget like a scan does
+    args = ['main', str(db_path), '{"status.lang": "jp"}',
+            '--cache-dir', str(tmp_path / 'cache')] + option
+    for _ in range(2):
+        with pytest.raises(BudgetExceeded, match='result limit'):
+            _main(args + ['--max-results', '2'])
+    _main(args)
+    capsys.readouterr()
+    for _ in range(2):
+        with pytest.raises(BudgetExceeded, match='result limit'):
+            _main(args + ['--max-results', '2'])
+    _main(args + ['--max-results', '3'])
+    assert capsys.readouterr().out
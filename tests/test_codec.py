@@ -0,0 +1,85 @@
+import json
+
+import pytest
+import tinydb
+from tinydb.storages import JSONStorage
+
+from tinydb_ql.__main__ import _main
+from tinydb_ql.codec import CodecJSONStorage, get_codec
+
+@pytest.fixture(name='codec', params=['json', 'orjson'])
+def _codec(request):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    return get_codec(request.param)
+
+
+DOCUMENTS = [
+    {'name': 'bob', 'nested': {'list': [1, 2.5, None, True]}},
+    {'text': 'ユニコード   "quoted" \\ \n'},
+    {'big': 2 ** 70, 'float': 1e300},
+    {'nan': float('nan'), 'inf': [float('inf'), -float('inf')], 'n': None},
+    {}
+]
+
+
+def as_text(data):
+    # NaN is not equal to itself
+    return json.dumps(data, sort_keys=True)
+
+
+@pytest.mark.parametrize('documents', [DOCUMENTS] + [
+    # alone: a fallback for one document covers the others of the file
+    [document] for document in DOCUMENTS
+])
+def test_round_trip(tmp_path, codec, documents):
+    # files written by either storage are read back identically by the other
+    path_a = tmp_path / 'a.json'
+    path_b = tmp_path / 'b.json'
+    with tinydb.TinyDB(path_a, storage=JSONStorage) as db:
+        db.insert_multiple(documents)
+        db.table('other').insert({'x': 1})
+    with tinydb.TinyDB(path_b, storage=CodecJSONStorage, codec=codec) as db:
+        db.insert_multiple(documents)
+        db.table('other').insert({'x': 1})
+    with tinydb.TinyDB(path_a, storage=CodecJSONStorage, codec=codec) as db:
+        from_a = {name: db.table(name).all() for name in db.tables()}
+    with tinydb.TinyDB(path_b, storage=JSONStorage) as db:
+        from_b = {name: db.table(name).all() for name in db.tables()}
+    expected = {'_default': documents, 'other': [{'x': 1}]}
+    assert as_text(from_a) == as_text(from_b) == as_text(expected)
+    assert as_text(json.loads(path_a.read_text())) == as_text(
+        json.loads(path_b.read_text())
+    )
+
+
+def test_dumps(codec):
+    for document in DOCUMENTS:
+        assert as_text(json.loads(codec.dumps(document))) == as_text(document)
+    assert json.loads(codec.dumps({1: 'a'})) == {'1': 'a'}
+
+
+def test_backend_selection(monkeypatch):
+    monkeypatch.setenv('TINYDB_QL_JSON_BACKEND', 'json')
+    assert get_codec().name == 'json'
+    monkeypatch.setenv('TINYDB_QL_JSON_BACKEND', 'unknown')
+    with pytest.raises(RuntimeError):
+        get_codec()
+    monkeypatch.delenv('TINYDB_QL_JSON_BACKEND')
+    assert get_codec().name in ('json', 'orjson')
+
+
+def test_commandline(db_path, codec, capsys):
+    _main(['main', str(db_path), '{"age": {"$lt": 14}}', '--json',
+           '--json-backend', codec.name])
+    assert [doc['name'] for doc in json.loads(capsys.readouterr().out)] == [
+        'bob', 'taro'
+    ]
+
+
+def test_commandline_nonfinite(tmp_path, codec, capsys):
+    path = tmp_path / 'db.json'
+    with tinydb.TinyDB(path) as db:
+        db.insert({'x': float('nan'), 'y': float('inf')})
+    _main(['main', str(path), '{}', '--json', '--json-backend', codec.name])
+    assert capsys.readouterr().out == '[{"x": NaN, "y": Infinity}]\n'
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql.__main__ import _main
+from tinydb_ql.compact import CompactJSONStorage, Record, loads, to_builtin
+
+QUERIES = [
+    {},
+    {'name': 'bob'},
+    {'status.lang': 'jp'},
+    {'status': {'current-stage': {'$ge': 3}}},
+    {'blob': {'$types': ['object']}},
+    {'blob': {'$types': ['object', 'array']}},
+    {'blob': {'$eq': {'a': 2}}},
+    {'$fragment': {'age': 14, 'name': 'alice'}},
+    {'status': {'$fragment': {'gameover': False, 'cleared': False}}},
+    {'status.by-stage': {'$all': [{'stage': 'stage1', 'score': 100},
+                                  {'stage': 'stage2', 'score': 80}]}},
+    {'status.by-stage': {'$any': {'score': {'$lt': 50}}}},
+    {'status': {'$length': 5}},
+    {'bonus': {'$any': ['orb']}},
+    {'name': {'$re': 'o$'}},
+    {'$not': {'status.lang': {'$exists': True}}}
+]
+
+
+@pytest.fixture(name='compact_db')
+def _compact_db(db_path):
+    with tinydb.TinyDB(
+            db_path, access_mode='r', storage=CompactJSONStorage
+    ) as db:
+        yield db
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_same_result(db_path, compact_db, query):
+    with tinydb.TinyDB(db_path, access_mode='r') as db:
+        expected = db.search(QL.Query(query))
+    result = compact_db.search(QL.Query(query))
+    assert result == expected
+    assert [doc.doc_id for doc in result] == [doc.doc_id for doc in expected]
+
+
+def test_shared_shapes():
+    data = loads(json.dumps({'_default': {
+        str(n): {'kind': 'point', 'x': n, 'y': [n, 'point']} for n in range(3)
+    }}))
+    documents = list(data['_default'].values())
+    assert all(isinstance(doc, Record) for doc in documents)
+    assert documents[0]._shape is documents[2]._shape
+    assert documents[0]['kind'] is documents[2]['kind']
+    assert documents[1]['y'][1] is documents[0]['kind']
+    assert to_builtin(documents[1]) == {'kind': 'point', 'x': 1, 'y': [1, 'point']}
+    assert type(to_builtin(documents[1])) is dict
+
+
+def test_read_only(compact_db):
+    document = compact_db.get(doc_id=5)['blob']
+    with pytest.raises(TypeError):
+        document['a'] = 3
+    assert dict(document) == {'a': 2}
+    assert loads('{"t": {"1": {"a": 1, "a": 2}}}') == {'t': {'1': {'a': 2}}}
+
+
+def test_commandline(db_path, capsys):
+    _main(['main', str(db_path), '{"name": "ichiro"}', '--compact-memory',
+           '--json'])
+    assert json.loads(capsys.readouterr().out) == [{
+        'name': 'ichiro', 'age': 16, 'blob': {'a': 2},
+        'status': {
+            'gameover': False, 'cleared': False, 'lang': 'jp',
+            'current-stage': 2,
+            'by-stage': [{'stage': 'stage1', 'score': 80},
+                         {'stage': 'stage2', 'score': 80}]
+        },
+        'bonus': ['book', 'candle']
+    }]
+
+
+@pytest.mark.parametrize('options', [
+    ['--compact-memory', '--lazy'],
+    ['--compact-memory', '--storage', 'log'],
+    ['--compact-memory', '--json-backend', 'json'],
+    ['--lazy', '--json-backend', 'json'],
+    # the option of tinydb-dump
+    ['--compact']
+])
+def test_commandline_errors(db_path, options):
+    with pytest.raises(SystemExit):
+        _main(['main', str(db_path), '{}', *options])
@@ -0,0 +1,106 @@
+import concurrent.futures
+import sys
+import threading
+import time
+
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql import tinydb_ql as TL
+
+QUERIES = [
+    {'n': {'$lt': 100}},
+    {'$and': [{'n': {'$ge': 10}}, {'odd': True}]},
+    {'$or': [{'n': 1}, {'name': {'$re': '^user 2'}}]},
+    {'$not': {'odd': True}},
+    {'tags': {'$any': ['a']}},
+    {'name': {'$search': '9$'}},
+]
+
+
+@pytest.fixture(name='db')
+def _db():
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple(
+        {'n': n, 'odd': n % 2 == 1, 'name': f'user {n}', 'tags': ['a', 'b']}
+        for n in range(1000)
+    )
+    yield db
+
+
+def _reset_class_state():
+    for cls in TL.get_referenced_class().values():
+        for name in ('loader', 'schema', 'validator'):
+            if name in cls.__dict__:
+                setattr(cls, name, None)
+
+
+def test_subclass_state_not_inherited():
+    # TopLevelAnd inherits And, but has its own spec
+    _reset_class_state()
+    TL.And({'$and': [{'$exists': True}]})
+    assert TL.TopLevelAnd.get_loader() is not TL.And.get_loader()
+    assert TL.TopLevelAnd.get_schema() is not TL.And.get_schema()
+    tree = QL.parse({'$and': [{'a': 1}, {'$or': [{'b': 2}]}]})
+    assert isinstance(tree.value, TL.TopLevelAnd)
+
+
+def test_concurrent_compilation(db):
+    expected = [QL.search(db, query) for query in QUERIES]
+    _reset_class_state()
+    barrier = threading.Barrier(8)
+    built = []
+    original = TL.Loader
+
+    def counting_loader(spec):
+        built.append(spec)
+        return original(spec)
+
+    def compile_all(_):
+        barrier.wait()
+        return [QL.Query(query) for query in QUERIES]
+
+    TL.Loader = counting_loader
+    try:
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            compiled = list(executor.map(compile_all, range(8)))
+    finally:
+        TL.Loader = original
+    # each class initialized once (plus the loaders nested in its spec)
+    assert len(built) == len({id(spec) for spec in built})
+    for queries in compiled:
+        assert [QL.search(db, query) for query in queries] == expected
+
+
+def test_search_many(db):
+    queries = QUERIES * 20
+    results = QL.search_many(db, queries, workers=8)
+    assert results == [QL.search(db, query) for query in queries]
+    with pytest.raises(QL.QLSyntaxError):
+        QL.search_many(db, [{'n': {'$bad': 1}}])
+
+
+def test_search_many_lookup():
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.table('teams').insert_multiple({'id': n} for n in range(3))
+    db.insert_multiple({'team': n} for n in range(10))
+    query = {'team': {'$lookup': {'table': 'teams', 'field': 'id'}}}
+    results = QL.search_many(db, [query] * 16, workers=4, database=db)
+    assert all(len(result) == 3 for result in results)
+
+
+@pytest.mark.skipif(
+    getattr(sys, '_is_gil_enabled', lambda: True)(),
+    reason='needs a free-threaded CPython build'
+)
+def test_scaling(db):
+    queries = QUERIES * 40
+    QL.search_many(db, queries[:6], workers=1)  # warm up
+    started = time.perf_counter()
+    QL.search_many(db, queries, workers=1)
+    serial = time.perf_counter() - started
+    started = time.perf_counter()
+    QL.search_many(db, queries, workers=4)
+    parallel = time.perf_counter() - started
+    assert parallel < serial / 1.5
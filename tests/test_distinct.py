@@ -0,0 +1,126 @@
+import json
+import threading
+
+import pytest
+import tinydb
+
+from tinydb_ql import distinct
+from tinydb_ql.__main__ import _main
+from tinydb_ql.scan import BudgetExceeded
+
+
+@pytest.fixture(name='large_db_size')
+def _large_db_size():
+    return 20000
+
+
+def test_exact(large_db):
+    counter = distinct.count_distinct(large_db, {}, 'user.id')
+    assert counter.count() == 5000
+    counter = distinct.count_distinct(large_db, {'odd': True}, 'user.id')
+    assert counter.count() == 2500
+    assert distinct.count_distinct(large_db, {}, 'missing').count() == 0
+
+
+def test_value_key():
+    counter = distinct.ExactCounter()
+    for value in (1, 1.0, True, '1', [1], {'a': 1, 'b': 2}, {'b': 2, 'a': 1}):
+        counter.add(value)
+    assert counter.count() == 5
+
+
+@pytest.mark.parametrize('precision', [10, 12, 14])
+def test_hyperloglog(large_db, precision):
+    counter = distinct.count_distinct(
+        large_db, {}, 'user.id', precision=precision
+    )
+    assert len(counter.registers) == 1 << precision
+    assert abs(counter.count() - 5000) < 4 * counter.error * 5000
+
+
+def test_hyperloglog_small():
+    counter = distinct.HyperLogLog()
+    assert counter.count() == 0
+    for value in range(100):
+        counter.add(value)
+        counter.add(str(value))
+    assert 195 <= counter.count() <= 205
+
+
+def test_merge():
+    left, right, union = (distinct.HyperLogLog(10) for _ in range(3))
+    for value in range(30000):
+        (left if value < 20000 else right).add(value)
+        union.add(value)
+    right.add(0)
+    assert left.merge(right).registers == union.registers
+    loaded = distinct.HyperLogLog.load(json.loads(json.dumps(union.dump())))
+    assert loaded.registers == union.registers
+    with pytest.raises(ValueError):
+        left.merge(distinct.HyperLogLog(11))
+    exact = distinct.ExactCounter()
+    exact.add(1)
+    other = distinct.ExactCounter()
+    other.add(1)
+    other.add(2)
+    assert exact.merge(other).count() == 2
+
+
+def test_precision_range():
+    with pytest.raises(ValueError):
+        distinct.HyperLogLog(3)
+    with pytest.raises(ValueError):
+        distinct.HyperLogLog(17)
+
+
+@pytest.fixture(name='shards')
+def _shards(tmp_path):
+    for shard in range(3):
+        with tinydb.TinyDB(tmp_path / f'shard{shard}.json') as db:
+            db.insert_multiple(
+                {'n': n} for n in range(shard * 100, shard * 100 + 150)
+            )
+    yield tmp_path
+
+
+def test_count_files(shards):
+    paths = sorted(shards.glob('shard*.json'))
+    assert distinct.count_files(paths, {}, 'n').count() == 350
+    counter = distinct.count_files(paths, {}, 'n', precision=12, workers=2)
+    assert abs(counter.count() - 350) < 10
+
+
+def test_count_files_in_workers(shards, monkeypatch):
+    # each file is counted by its thread, and only the counters come back
+    threads = []
+    count_distinct = distinct.count_distinct
+
+    def counted(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return count_distinct(*args, **kwargs)
+    monkeypatch.setattr(distinct, 'count_distinct', counted)
+    paths = sorted(shards.glob('shard*.json'))
+    assert distinct.count_files(
+        paths, {'n': {'$lt': 200}}, 'n', max_scan=150
+    ).count() == 200
+    assert len(threads) == 3 and threading.current_thread() not in threads
+    with pytest.raises(BudgetExceeded):
+        distinct.count_files(paths, {}, 'n', max_results=149)
+
+
+def test_commandline(shards, capsys):
+    _main(['', str(shards / 'shard0.json'), '{"n": {"$ge": 100}}',
+           '--count-distinct', 'n'])
+    captured = capsys.readouterr()
+    assert captured.out == '50\n'
+    assert 'distinct values of n' in captured.err
+    _main(['', str(shards / 'shard*.json'), '--count-distinct', 'n',
+           '--hll-precision', '8'])
+    captured = capsys.readouterr()
+    assert abs(int(captured.out) - 350) < 50
+    assert 'estimated' in captured.err
+    with pytest.raises(SystemExit):
+        _main(['', str(shards / 'shard0.json'), '--hll-precision', '8'])
+    with pytest.raises(SystemExit):
+        _main(['', str(shards / 'shard0.json'), '--count-distinct', 'n',
+               '--count'])
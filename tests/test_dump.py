@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from tinydb_ql import tinydb_dump
+
+
+@pytest.mark.parametrize('storage', ['json', 'log'])
+def test_upsert(run_dump, capsys, tmp_path, storage):
+    db_path = tmp_path / 'db.json'
+    run_dump(db_path, {'1': {'a': 1}, '2': {'a': 2}},
+             '--storage', storage, '--upsert')
+    assert 'inserted 2, updated 0' in capsys.readouterr().err
+    run_dump(db_path, {'2': {'a': 20}, '03': {'a': 3}},
+             '--storage', storage, '--upsert')
+    assert 'inserted 1, updated 1' in capsys.readouterr().err
+    # unchanged documents are not counted (true is not 1)
+    run_dump(db_path, {'1': {'a': 1}, '2': {'a': True}},
+             '--storage', storage, '--upsert')
+    assert 'inserted 0, updated 1' in capsys.readouterr().err
+    run_dump(db_path, {'2': {'a': 20}, '3': {'a': 3}},
+             '--storage', storage, '--upsert')
+    assert 'inserted 0, updated 1' in capsys.readouterr().err
+    with tinydb_dump.open_db(db_path, storage) as db:
+        assert {doc.doc_id: doc['a'] for doc in db.all()} == {
+            1: 1, 2: 20, 3: 3
+        }
+
+
+def test_upsert_appends_only_changes(run_dump, tmp_path):
+    db_path = tmp_path / 'db.json'
+    run_dump(db_path, [{'a': value} for value in range(100)],
+             '--storage', 'log')
+    size = db_path.stat().st_size
+    run_dump(db_path, {'1': {'a': 0}, '50': {'a': -1}},
+             '--storage', 'log', '--upsert')
+    appended = db_path.read_text()[size:].splitlines()
+    assert [json.loads(line)['id'] for line in appended] == ['50']
@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+
+import pytest
+import tinydb
+
+from tinydb_ql import fanout
+from tinydb_ql.__main__ import _main
+
+
+@pytest.fixture(name='shards')
+def _shards(tmp_path):
+    for day in range(1, 6):
+        with tinydb.TinyDB(tmp_path / f'2026-01-0{day}.json') as db:
+            db.insert_multiple(
+                {'day': day, 'n': n, 'level': 'error' if n % 3 == 0 else 'info'}
+                for n in range(10)
+            )
+            db.table('users').insert({'name': f'user{day}'})
+    (tmp_path / 'notes.txt').write_text('not a DB')
+    return tmp_path
+
+
+def test_search_files(shards):
+    paths = fanout.expand_paths(shards / '2026-*.json')
+    assert [path.name for path in paths] == [
+        f'2026-01-0{day}.json' for day in range(1, 6)
+    ]
+    results = list(fanout.search_files(paths, {'level': 'error'}, workers=2))
+    assert [path for path, _ in results] == paths
+    assert [
+        [(doc['day'], doc['n']) for doc in documents]
+        for _, documents in results
+    ] == [[(day, n) for n in (0, 3, 6, 9)] for day in range(1, 6)]
+    users = fanout.search_files(paths, {}, table_name='users')
+    assert sum(len(documents) for _, documents in users) == 5
+
+
+def test_arrival_order(shards, monkeypatch):
+    # the first file is the slowest
+    paths = fanout.expand_paths(shards / '2026-*.json')
+    released = threading.Event()
+    original = fanout._search_file
+
+    def search_file(path, *args):
+        if path == paths[0]:
+            released.wait(5)
+        return original(path, *args)
+
+    monkeypatch.setattr(fanout, '_search_file', search_file)
+    seen = []
+    for path, _ in fanout.search_files(
+            paths, {}, workers=5, order='arrival'
+    ):
+        seen.append(path)
+        if len(seen) == 4:
+            released.set()
+    assert seen[-1] == paths[0]
+    assert sorted(seen) == paths
+
+
+def test_bounded_in_flight(shards, monkeypatch):
+    # at most 2 * workers files are submitted ahead of the consumer
+    paths = fanout.expand_paths(shards / '2026-*.json') * 4
+    started = []
+    original = fanout._search_file
+
+    def search_file(path, *args):
+        started.append(path)
+        return original(path, *args)
+
+    monkeypatch.setattr(fanout, '_search_file', search_file)
+    results = fanout.search_files(paths, {}, workers=1)
+    next(results)
+    time.sleep(0.1)
+    assert len(started) <= 3
+    assert len(list(results)) == len(paths) - 1
+    assert len(started) == len(paths)
+
+
+def test_lookup_per_file(shards):
+    paths = fanout.expand_paths(shards / '2026-*.json')
+    query = {'$lookup': {'table': 'users', 'field': 'name'}}
+    results = fanout.search_files(paths, {'user': query}, table_name='users')
+    assert sum(len(documents) for _, documents in results) == 0
+    results = fanout.search_files(paths, {'name': query}, table_name='users')
+    assert sum(len(documents) for _, documents in results) == 5
+
+
+def test_no_match(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        fanout.expand_paths(tmp_path / '*.json')
+
+
+def test_commandline(shards, capsys):
+    pattern = str(shards / '2026-*.json')
+    _main(['main', pattern, '{"n": {"$ge": 8}}', '--json', '--workers', '2'])
+    out, err = capsys.readouterr()
+    lines = [json.loads(line) for line in out.splitlines()]
+    assert [(line['file'][-15:], line['doc_id']) for line in lines] == [
+        (f'2026-01-0{day}.json', doc_id)
+        for day in range(1, 6) for doc_id in (9, 10)
+    ]
+    assert lines[0]['document'] == {'day': 1, 'n': 8, 'level': 'info'}
+    assert 'found 10 documents on the default table of 5 files' in err
+    _main(['main', pattern, '{"level": "error"}', '--count'])
+    assert capsys.readouterr().out == '20\n'
+
+
+def test_commandline_errors(shards):
+    pattern = str(shards / '2026-*.json')
+    with pytest.raises(SystemExit):
+        _main(['main', pattern, '{}', '--limit', '3'])
+    with pytest.raises(SystemExit):
+        _main(['main', pattern, '{}', '--workers', '0'])
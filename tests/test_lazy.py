@@ -0,0 +1,83 @@
+import json
+
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql.__main__ import _main
+from tinydb_ql.compact import to_builtin
+from tinydb_ql.jsonscan import scan_object, skip_value
+from tinydb_ql.lazy import LazyDocument, LazyJSONStorage, load_tables
+
+QUERIES = [
+    {},
+    {'name': 'bob'},
+    {'status.lang': 'jp'},
+    {'status': {'current-stage': {'$ge': 3}}},
+    {'blob': {'$types': ['object']}},
+    {'blob': {'$eq': {'a': 2}}},
+    {'$fragment': {'age': 14, 'name': 'alice'}},
+    {'status.by-stage': {'$any': {'score': {'$lt': 50}}}},
+    {'status': {'$length': 5}},
+    {'$not': {'status.lang': {'$exists': True}}}
+]
+
+SKIPPED = [
+    '123', '-1.5e10', 'true', 'null', '"a\\"b]}"', '[]', '{}',
+    '[1, [2, {"a": "]"}], "\\\\"]', '{"a": {"b": [1, "}"]}, "c": null}',
+    '[' * 10 + '"]"' + ']' * 10
+]
+
+
+@pytest.mark.parametrize('value', SKIPPED)
+def test_skip_value(value):
+    text = f'{value} , "next"'
+    assert skip_value(text, 0) == len(value)
+
+
+@pytest.mark.parametrize('text', ['[1, 2', '{"a": "b}', ''])
+def test_skip_value_error(text):
+    with pytest.raises(json.JSONDecodeError):
+        skip_value(text, 0)
+
+
+def test_scan_object():
+    text = ' { "a" : 1 ,"b":{"c": [ ]} , "d\\u0041":"x" } '
+    members, end = scan_object(text, 1)
+    assert {
+        key: text[start:value_end] for key, (start, value_end) in members.items()
+    } == {'a': '1', 'b': '{"c": [ ]}', 'dA': '"x"'}
+    assert end == len(text) - 1
+    assert scan_object('{ }', 0) == ({}, 3)
+    with pytest.raises(json.JSONDecodeError):
+        scan_object('{"a" 1}', 0)
+
+
+def test_lazy_document():
+    text = json.dumps({'t': {'1': {'a': {'b': [1, {'c': 2}]}, 'd': 'e'}}})
+    document = load_tables(text)['t']['1']
+    assert isinstance(document, LazyDocument)
+    assert 'a' in document and 'x' not in document
+    assert isinstance(document['a'], LazyDocument)
+    assert 'd' not in document._values
+    assert document['a']['b'] == [1, {'c': 2}]
+    assert to_builtin(document) == {'a': {'b': [1, {'c': 2}]}, 'd': 'e'}
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_same_result(db_path, query):
+    with tinydb.TinyDB(db_path, access_mode='r') as db:
+        expected = db.search(QL.Query(query))
+    with tinydb.TinyDB(
+            db_path, access_mode='r', storage=LazyJSONStorage
+    ) as db:
+        result = db.search(QL.Query(query))
+    assert result == expected
+    assert [doc.doc_id for doc in result] == [doc.doc_id for doc in expected]
+
+
+def test_commandline(db_path, capsys):
+    _main(['main', str(db_path), '{"status.lang": "jp"}', '--lazy', '--json'])
+    with tinydb.TinyDB(db_path, access_mode='r') as db:
+        expected = db.search(tinydb.Query().status.lang == 'jp')
+    assert json.loads(capsys.readouterr().out) == expected
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql.__main__ import _main
+
+
+@pytest.fixture(name='league')
+def _league(tmp_path):
+    with tinydb.TinyDB(tmp_path / 'league.json') as db:
+        db.table('players').insert_multiple([
+            {'id': 1, 'name': 'bob'},
+            {'id': 2, 'name': 'alice'},
+            {'id': 3, 'name': 'taro'},
+            {'id': [4], 'name': 'hanako'}
+        ])
+        db.table('matches').insert_multiple([
+            {'player': 1, 'winner': False},
+            {'player': 2, 'winner': True},
+            {'player': 2, 'winner': True},
+            {'player': 3, 'winner': False},
+            {'player': [4], 'winner': True},
+            {'winner': True}
+        ])
+        yield db
+
+
+def names(documents):
+    return [doc['name'] for doc in documents]
+
+
+def test_lookup(league):
+    players = league.table('players')
+    winners = {'id': {'$lookup': {
+        'table': 'matches', 'field': 'player', 'where': {'winner': True}
+    }}}
+    assert names(players.search(QL.Query(winners, database=league))) == [
+        'alice', 'hanako'
+    ]
+    everyone = {'id': {'$lookup': {'table': 'matches', 'field': 'player'}}}
+    assert len(players.search(QL.Query(everyone, database=players))) == 4
+    nobody = {'id': {'$lookup': {'table': 'nothing', 'field': 'player'}}}
+    assert not players.search(QL.Query(nobody, database=league))
+
+
+def test_nested_lookup(league):
+    league.table('seasons').insert({'year': 2020, 'champion': 'alice'})
+    query = {'$and': [
+        {'$not': {'name': 'bob'}},
+        {'id': {'$lookup': {
+            'table': 'matches', 'field': 'player',
+            'where': {'player': {'$lookup': {
+                'table': 'players', 'field': 'id',
+                'where': {'name': {'$lookup': {
+                    'table': 'seasons', 'field': 'champion'
+                }}}
+            }}}
+        }}}
+    ]}
+    players = league.table('players')
+    assert names(players.search(QL.Query(query, database=league))) == ['alice']
+
+
+def test_inner_table_read_once(league, monkeypatch):
+    reads = []
+    original = tinydb.table.Table.__iter__
+
+    def counting_iter(table):
+        reads.append(table.name)
+        return original(table)
+
+    monkeypatch.setattr(tinydb.table.Table, '__iter__', counting_iter)
+    query = QL.Query({'id': {'$lookup': {
+        'table': 'matches', 'field': 'player'
+    }}}, database=league)
+    league.table('players').search(query)
+    assert reads == ['matches']
+
+
+@pytest.mark.parametrize('storage', [None, tinydb.storages.MemoryStorage])
+def test_inner_table_changes(league, storage):
+    if storage is not None:
+        db = tinydb.TinyDB(storage=storage)
+        for name in ('players', 'matches'):
+            db.table(name).insert_multiple(league.table(name).all())
+        league = db
+    query = QL.Query({'id': {'$lookup': {
+        'table': 'matches', 'field': 'player', 'where': {'winner': True}
+    }}}, database=league)
+    players = league.table('players')
+    assert not query.is_cacheable()
+    assert names(players.search(query)) == ['alice', 'hanako']
+    league.table('matches').insert({'player': 3, 'winner': True})
+    assert names(players.search(query)) == ['alice', 'taro', 'hanako']
+    league.table('matches').remove(tinydb.Query().player == 2)
+    assert names(players.search(query)) == ['taro', 'hanako']
+
+
+def test_errors(league):
+    with pytest.raises(QL.QLSyntaxError):
+        QL.Query({'id': {'$lookup': {'table': 'matches', 'field': 'player'}}})
+    with pytest.raises(QL.QLSyntaxError):
+        QL.Query({'id': {'$lookup': {'table': 'matches'}}}, database=league)
+    with pytest.raises(QL.QLSyntaxError):
+        QL.Query({'id': {'$lookup': {
+            'table': 'matches', 'field': 'player', 'where': 1
+        }}}, database=league)
+
+
+def test_commandline(league, tmp_path, capsys):
+    league.close()
+    _main(['main', str(tmp_path / 'league.json'), json.dumps({'id': {
+        '$lookup': {
+            'table': 'matches', 'field': 'player', 'where': {'winner': False}
+        }
+    }}), '--table', 'players', '--json'])
+    assert names(json.loads(capsys.readouterr().out)) == ['bob', 'taro']
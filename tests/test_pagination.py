@@ -0,0 +1,65 @@
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql.__main__ import _main
+
+
+@pytest.fixture(name='shuffled_db')
+def _shuffled_db():
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple(
+        tinydb.table.Document({'n': doc_id % 7}, doc_id)
+        for doc_id in [5, 3, 9, 1, 12, 7, 2, 10, 4, 8, 11, 6]
+    )
+    yield db
+
+
+def test_pages(shuffled_db):
+    query = {'n': {'$ne': 0}}
+    expected = sorted(
+        doc.doc_id for doc in shuffled_db.search(QL.Query(query))
+    )
+    pages = []
+    cursor = None
+    while True:
+        documents, cursor = QL.search_page(
+            shuffled_db, query, limit=3, cursor=cursor
+        )
+        pages.append([doc.doc_id for doc in documents])
+        if cursor is None:
+            break
+    assert pages[:-1] == [expected[i:i + 3] for i in range(0, 9, 3)]
+    assert sum(pages, []) == expected
+
+
+def test_after(shuffled_db):
+    documents, cursor = QL.search_page(
+        shuffled_db, {}, limit=None, after=8
+    )
+    assert [doc.doc_id for doc in documents] == [9, 10, 11, 12]
+    assert cursor is None
+
+
+def test_skipped_documents_are_not_evaluated(shuffled_db):
+    evaluated = []
+    query = tinydb.Query().n.test(lambda n: evaluated.append(n) or True)
+    documents, _ = QL.search_page(shuffled_db, query, limit=2, after=10)
+    assert [doc.doc_id for doc in documents] == [11, 12]
+    assert len(evaluated) == 2
+
+
+def test_cursor_error(shuffled_db):
+    _, cursor = QL.search_page(shuffled_db, {}, limit=1)
+    with pytest.raises(QL.CursorError):
+        QL.search_page(shuffled_db, {'n': 1}, limit=1, cursor=cursor)
+    with pytest.raises(QL.CursorError):
+        QL.search_page(shuffled_db, {}, limit=1, cursor='broken')
+
+
+def test_commandline(db_path, capsys):
+    _main(['main', str(db_path), '{}', '--after', '1', '--limit', '2'])
+    captured = capsys.readouterr()
+    assert "'name': 'alice'" in captured.out
+    assert "'name': 'taro'" in captured.out
+    assert 'next page: --after 3' in captured.err
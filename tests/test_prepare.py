@@ -0,0 +1,98 @@
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql.trigram import TrigramIndex
+from tinydb_ql.zonemap import ZoneMap
+
+TESTSET = [
+    ({'age': {'$gt': {'$param': 'n'}}}, {'n': 13}, {'age': {'$gt': 13}}),
+    ({'age': {'$le': {'$param': 'n'}}}, {'n': 13}, {'age': {'$le': 13}}),
+    ({'age': {'$param': 'n'}}, {'n': 14}, {'age': 14}),
+    ({'blob': {'$eq': {'$param': 'v'}}}, {'v': [1, 2]},
+     {'blob': {'$eq': [1, 2]}}),
+    ({'blob': {'$ne': {'$param': 'v'}}}, {'v': None},
+     {'blob': {'$ne': None}}),
+    ({'name': {'$enum': {'$param': 'names'}}}, {'names': ['bob', 'taro']},
+     {'name': {'$enum': ['bob', 'taro']}}),
+    ({'name': {'$search': {'$param': 'p'}}}, {'p': 'o$'},
+     {'name': {'$search': 'o$'}}),
+    ({'name': {'$matches': {'$param': 'p'}}}, {'p': 'a.*e'},
+     {'name': {'$matches': 'a.*e'}}),
+    ({'name': {'$re': {'$param': 'p'}}}, {'p': 'ko'}, {'name': {'$re': 'ko'}}),
+    ({'$or': [{'age': {'$lt': {'$param': 'n'}}},
+              {'status.lang': {'$param': 'lang'}}]},
+     {'n': 13, 'lang': 'jp'},
+     {'$or': [{'age': {'$lt': 13}}, {'status.lang': 'jp'}]})
+]
+
+
+@pytest.mark.parametrize('query, params, expected', TESTSET)
+def test_bind(db_instance, query, params, expected):
+    prepared = QL.prepare(query)
+    assert db_instance.search(prepared.bind(**params)) == db_instance.search(
+        QL.Query(expected)
+    )
+
+
+def test_rebind(db_instance):
+    prepared = QL.prepare({'age': {'$ge': {'$param': 'min_age'}}})
+    assert [
+        len(db_instance.search(prepared.bind(min_age=age)))
+        for age in range(12, 18)
+    ] == [5, 4, 3, 2, 1, 0]
+
+
+ERRORS = [
+    ({'age': {'$gt': {'$param': 'n'}}}, {}),
+    ({'age': {'$gt': {'$param': 'n'}}}, {'n': 1, 'm': 2}),
+    ({'age': {'$gt': {'$param': 'n'}}}, {'n': [1]}),
+    ({'age': {'$param': 'n'}}, {'n': None}),
+    # a boolean is not a JSON number
+    ({'age': {'$gt': {'$param': 'n'}}}, {'n': True}),
+    ({'age': {'$lt': {'$param': 'n'}}}, {'n': False}),
+    ({'name': {'$enum': {'$param': 'n'}}}, {'n': 'bob'}),
+    ({'name': {'$search': {'$param': 'n'}}}, {'n': 1}),
+    ({'name': {'$param': 'n'}, 'bonus': {'$enum': {'$param': 'n'}}},
+     {'n': 'bob'})
+]
+
+
+@pytest.mark.parametrize('query, params', ERRORS)
+def test_bind_error(query, params):
+    prepared = QL.prepare(query)
+    with pytest.raises(QL.QLSyntaxError):
+        prepared.bind(**params)
+
+
+def test_lookup_where():
+    # the parameters of $lookup's where are bound with the others
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple([{'id': 1}, {'id': 2}, {'id': 3}])
+    db.table('matches').insert_multiple([
+        {'player': 1, 'win': True}, {'player': 2, 'win': False},
+        {'player': 3, 'win': True}
+    ])
+    prepared = QL.prepare({'id': {'$lookup': {
+        'table': 'matches', 'field': 'player',
+        'where': {'win': {'$param': 'w'}}
+    }}}, database=db)
+    assert prepared.params == {'w': [('number', 'boolean', 'string')]}
+    assert [doc['id'] for doc in db.search(prepared.bind(w=True))] == [1, 3]
+    assert [doc['id'] for doc in db.search(prepared.bind(w=False))] == [2]
+
+
+def test_unbound():
+    with pytest.raises(QL.QLSyntaxError):
+        QL.Query({'age': {'$param': 'n'}})
+    with pytest.raises(QL.QLSyntaxError):
+        QL.prepare({'age': {'$param': 1}}).bind()
+
+
+def test_indices_ignore_params(db_instance):
+    query = {'name': {'$re': {'$param': 'p'}}, 'age': {'$param': 'n'}}
+    index = TrigramIndex('')
+    index.add_paths(db_instance, ['name'])
+    assert index.candidates(db_instance, query) is None
+    zonemap = ZoneMap('', 1)
+    assert len(list(zonemap.documents(db_instance, query))) == len(db_instance)
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+import tinydb
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import JSONStorage
+
+import tinydb_ql as QL
+from tinydb_ql import querylog, replay, timing
+from tinydb_ql.__main__ import _main
+
+
+@pytest.fixture(name='dbpath')
+def _dbpath(tmp_path):
+    path = tmp_path / 'db.json'
+    with tinydb.TinyDB(path) as db:
+        db.insert_multiple({'n': n} for n in range(100))
+        db.table('other').insert_multiple({'m': n} for n in range(10))
+    yield path
+
+
+def test_commandline_log(dbpath, tmp_path, capsys, monkeypatch):
+    log_path = tmp_path / 'queries.jsonl'
+    _main(['', str(dbpath), '{"n": {"$lt": 10}}', '--count',
+           '--query-log', str(log_path)])
+    monkeypatch.setenv(querylog.ENV_QUERY_LOG, str(log_path))
+    _main(['', str(dbpath), '{ "m": 3 }', '--table', 'other'])
+    with pytest.raises(QL.QLSyntaxError):
+        _main(['', str(dbpath), '{"n": {"$unknown": 1}}'])
+    _main(['', str(dbpath), '--analyze'])  # not logged
+    capsys.readouterr()
+    first, second, failed = querylog.read_log(log_path)
+    assert first['query'] == '{"n":{"$lt":10}}'
+    assert (first['table'], first['results']) == (None, 10)
+    assert first['path'] == str(dbpath)
+    assert first['db'] is not None
+    assert {'validate', 'load', 'load.decode', 'compile', 'scan'} <= set(
+        first['phases']
+    )
+    assert first['wall'] >= first['phases']['scan']
+    assert (second['query'], second['table'], second['results']) == (
+        '{"m":3}', 'other', 1
+    )
+    assert failed['error'] == 'QLSyntaxError'
+    assert failed['results'] is None
+    assert not timing._hooks  # pylint: disable = protected-access
+
+
+def test_library_log(dbpath, tmp_path):
+    log = querylog.QueryLog(tmp_path / 'queries.jsonl')
+    with tinydb.TinyDB(dbpath) as db:
+        result = log.search(db, {'n': {'$ge': 95}}, dbpath=dbpath)
+    assert len(result) == 5
+    (entry,) = querylog.read_log(log.path)
+    assert (entry['table'], entry['results']) == ('_default', 5)
+    assert set(entry['phases']) == {'validate', 'compile'}
+
+
+def test_replay(dbpath):
+    entries = [
+        {'query': '{"n":{"$lt":10}}', 'table': None, 'results': 10},
+        {'query': '{"m":3}', 'table': 'other', 'results': 1},
+        {'query': '{"n":1}', 'table': None, 'results': 2},
+        {'query': '{"n":{"$bad":1}}', 'table': None, 'results': None},
+    ]
+    with tinydb.TinyDB(
+            dbpath, access_mode='r', storage=CachingMiddleware(JSONStorage)
+    ) as db:
+        report = replay.replay(db, entries * 10, concurrency=4)
+    assert report['queries'] == 40
+    assert report['errors'] == 10
+    assert report['mismatches'] == 10
+    latency = report['latency']
+    assert 0 < latency['p50'] <= latency['p95'] <= latency['p99'] <= (
+        latency['max']
+    )
+    assert report['throughput'] > 0
+
+
+def test_percentiles():
+    assert replay.percentiles([]) == [None] * 3
+    assert replay.percentiles([0.5]) == [0.5] * 3
+    p50, p95, p99 = replay.percentiles([n / 100 for n in range(101)])
+    assert (p50, p95, p99) == pytest.approx((0.5, 0.95, 0.99))
+
+
+def test_replay_commandline(dbpath, tmp_path, capsys):
+    log_path = tmp_path / 'queries.jsonl'
+    for query in ('{"n": {"$lt": 10}}', '{"n": 5}'):
+        _main(['', str(dbpath), query, '--query-log', str(log_path)])
+    capsys.readouterr()
+    replay._main(['', str(log_path), str(dbpath), '--repeat', '3', '--json'])
+    report = json.loads(capsys.readouterr().out)
+    assert (report['queries'], report['errors'], report['mismatches']) == (
+        6, 0, 0
+    )
+    replay._main(['', str(log_path), str(dbpath), '--concurrency', '2'])
+    text = capsys.readouterr().out
+    assert text.startswith('replayed 2 queries (concurrency 2)')
+    assert 'p99' in text
+
+
+def test_replay_options(dbpath, tmp_path, capsys):
+    # the options shaping the results are logged and replayed
+    log_path = tmp_path / 'queries.jsonl'
+    for options in (['--limit', '5'], ['--after', '90', '--ids-only'],
+                    ['--scan-docs', '10'], ['--sample', '3', '--count'],
+                    ['--max-results', '100']):
+        _main(['', str(dbpath), '{"n": {"$lt": 95}}', '--query-log',
+               str(log_path), *options])
+    capsys.readouterr()
+    entries = querylog.read_log(log_path)
+    assert [entry['options'] for entry in entries] == [
+        {'limit': 5}, {'after': 90, 'ids_only': True}, {'scan_docs': 10},
+        {'sample': 3}, {'max_results': 100}
+    ]
+    results = [entry['results'] for entry in entries]
+    assert results[:2] + results[3:] == [5, 5, 95, 95]
+    replay._main(['', str(log_path), str(dbpath), '--json'])
+    report = json.loads(capsys.readouterr().out)
+    assert (report['queries'], report['errors'], report['mismatches']) == (
+        5, 0, 0
+    )
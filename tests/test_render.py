@@ -0,0 +1,80 @@
+import io
+import pprint
+import random
+
+import pytest
+
+from tinydb_ql import render
+
+DOCUMENTS = [
+    {'id': n, 'name': f'user {n}', 'tags': ['a', 'b'],
+     'address': {'city': 'Paris', 'zip': n, 'geo': {'lat': 1.5, 'lng': 2.5}}}
+    for n in range(5)
+]
+
+
+@pytest.mark.parametrize('obj', [
+    [],
+    {},
+    [1, 2],
+    {1: 'a'},
+    DOCUMENTS,
+    DOCUMENTS[:1],
+    {n: doc for n, doc in enumerate(DOCUMENTS)},
+    [{'text': 'lorem ipsum dolor sit amet ' * 8}],
+    [{'text': 'first line\nsecond line ' * 6, 'more': [(1,), (), (1, 2)]}],
+    'a long string ' * 10,
+    [[[[[[1]]]]], {'a': {'b': {'c': {}}}}],
+])
+@pytest.mark.parametrize('depth', [None, 1, 2, 3])
+def test_same_as_pprint(obj, depth):
+    expected = io.StringIO()
+    pprint.pp(obj, expected, depth=depth)
+    rendered = io.StringIO()
+    render.pp(obj, rendered, depth=depth)
+    assert rendered.getvalue() == expected.getvalue()
+    assert render.pformat(obj, depth=depth) == pprint.pformat(
+        obj, depth=depth, sort_dicts=False
+    )
+
+
+def test_random_documents():
+    rng = random.Random(0)
+    words = ['a', 'lorem ipsum dolor sit amet', 'x' * 90, 'one\ntwo ' * 9]
+
+    def generate(level):
+        choice = rng.random()
+        if level > 4 or choice < 0.4:
+            return rng.choice([rng.randint(-10, 10 ** 12), rng.random(), True,
+                               None, rng.choice(words)])
+        if choice < 0.7:
+            return {
+                rng.choice(['k', 'key', 'a_long_key_name', 'n']):
+                generate(level + 1) for _ in range(rng.randint(0, 6))
+            }
+        return [generate(level + 1) for _ in range(rng.randint(0, 6))]
+
+    for _ in range(500):
+        obj = [generate(1) for _ in range(rng.randint(0, 8))]
+        depth = rng.choice([None, 1, 2, 3])
+        expected = io.StringIO()
+        pprint.pp(obj, expected, depth=depth)
+        rendered = io.StringIO()
+        render.pp(obj, rendered, depth=depth)
+        assert rendered.getvalue() == expected.getvalue()
+
+
+def test_streaming():
+    # the first documents are written before the last ones are looked at
+    stream = io.StringIO()
+
+    class Tracking(list):
+        def __iter__(self):
+            for position, elem in enumerate(list.__iter__(self)):
+                if position == 500:
+                    assert "'user 499'" in stream.getvalue()
+                yield elem
+
+    documents = Tracking({'id': n, 'name': f'user {n}'} for n in range(1000))
+    render.pp(documents, stream, depth=2)
+    assert stream.getvalue().endswith("'user 999'}]\n")
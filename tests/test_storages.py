@@ -0,0 +1,126 @@
+import json
+
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql import tinydb_dump
+from tinydb_ql.__main__ import _main, load_data
+from tinydb_ql.storages import AppendLogStorage
+
+
+def _all_documents(db_path, storage=AppendLogStorage):
+    with load_data(db_path, None, storage) as (db, _):
+        return {doc.doc_id: dict(doc) for doc in db.all()}
+
+
+def test_append_only(run_dump, tmp_path):
+    db_path = tmp_path / 'db.json'
+    run_dump(db_path, [{'a': 1}, {'a': 2}], '--storage', 'log')
+    base = db_path.read_text()
+    # a fresh log DB starts out in the plain tinydb layout
+    assert _all_documents(db_path, tinydb.storages.JSONStorage) == {
+        1: {'a': 1}, 2: {'a': 2}
+    }
+    run_dump(db_path, [{'a': 3}], '--storage', 'log')
+    run_dump(db_path, {'1': {'a': 10}}, '--storage', 'log')
+    content = db_path.read_text()
+    assert content.startswith(base)
+    assert len(content[len(base):].splitlines()) == 2
+    assert _all_documents(db_path) == {
+        1: {'a': 10}, 2: {'a': 2}, 3: {'a': 3}
+    }
+
+
+def test_compaction(run_dump, tmp_path):
+    db_path = tmp_path / 'db.json'
+    run_dump(db_path, [{'a': 1}], '--storage', 'log')
+    run_dump(db_path, [{'a': 2}], '--storage', 'log')
+    tinydb_dump._main(['tinydb-dump', str(db_path), '--compact'])
+    assert _all_documents(db_path, tinydb.storages.JSONStorage) == {
+        1: {'a': 1}, 2: {'a': 2}
+    }
+
+
+def test_size_triggered_compaction(tmp_path):
+    db_path = tmp_path / 'db.json'
+    storage = lambda path: AppendLogStorage(path, compact_min_bytes=0)
+    for value in range(3):
+        with tinydb.TinyDB(db_path, storage=storage) as db:
+            db.insert({'a': value})
+    with tinydb.TinyDB(db_path) as db:
+        assert [doc['a'] for doc in db.all()] == [0, 1, 2]
+
+
+def test_removal(tmp_path):
+    db_path = tmp_path / 'db.json'
+    with tinydb.TinyDB(db_path, storage=AppendLogStorage) as db:
+        db.insert_multiple([{'a': 1}, {'a': 2}])
+        db.table('other').insert({'b': 1})
+        db.remove(doc_ids=[1])
+        db.drop_table('other')
+    with tinydb.TinyDB(db_path, storage=AppendLogStorage) as db:
+        assert db.tables() == {'_default'}
+        assert db.all() == [{'a': 2}]
+
+
+def test_encodes_changed_tables_only(tmp_path, monkeypatch):
+    db_path = tmp_path / 'db.json'
+    encoded = []
+    original = AppendLogStorage._encode_table
+
+    def encode_table(documents):
+        encoded.append(len(documents))
+        return original(documents)
+
+    monkeypatch.setattr(
+        AppendLogStorage, '_encode_table', staticmethod(encode_table)
+    )
+    loads = []
+    original_load = AppendLogStorage._load
+
+    def load(storage):
+        loads.append(storage)
+        return original_load(storage)
+
+    monkeypatch.setattr(AppendLogStorage, '_load', load)
+    with tinydb.TinyDB(db_path, storage=AppendLogStorage) as db:
+        db.table('big').insert_multiple({'n': n} for n in range(100))
+        db.insert({'a': 1})
+        encoded.clear()
+        loads.clear()
+        db.insert({'a': 2})
+        db.update({'a': 3}, doc_ids=[1])
+        # the file as last written is not read again
+        assert not loads
+        assert encoded == [2, 2]
+        with tinydb.TinyDB(db_path, storage=AppendLogStorage) as other:
+            other.table('big').remove(doc_ids=[1])
+        # changed by another instance
+        assert len(db.table('big')) == 99
+        assert len(loads) == 2
+    assert _all_documents(db_path) == {1: {'a': 3}, 2: {'a': 2}}
+
+
+def test_interrupted_append(tmp_path):
+    db_path = tmp_path / 'db.json'
+    with tinydb.TinyDB(db_path, storage=AppendLogStorage) as db:
+        db.insert({'a': 1})
+        db.insert({'a': 2})
+    with db_path.open('a') as stream:
+        stream.write('{"op": "put", "table": "_default", "id": "3", "doc"')
+    assert _all_documents(db_path) == {1: {'a': 1}, 2: {'a': 2}}
+    with tinydb.TinyDB(db_path, storage=AppendLogStorage) as db:
+        db.insert({'a': 3})
+    assert _all_documents(db_path) == {1: {'a': 1}, 2: {'a': 2}, 3: {'a': 3}}
+
+
+def test_query_commandline(run_dump, tmp_path, capsys):
+    db_path = tmp_path / 'db.json'
+    run_dump(db_path, [{'a': 1}], '--storage', 'log')
+    run_dump(db_path, [{'a': 2}], '--storage', 'log')
+    _main(['main', str(db_path), '{"a": 2}', '--storage', 'log', '--json'])
+    assert json.loads(capsys.readouterr().out) == [{'a': 2}]
+    with pytest.raises(ValueError):
+        with load_data(db_path, None) as (db, _):
+            db.search(QL.Query({'a': 2}))
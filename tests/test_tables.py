@@ -0,0 +1,117 @@
+import json
+
+import pytest
+import tinydb
+from tinydb.middlewares import CachingMiddleware
+
+import tinydb_ql as QL
+from tinydb_ql.__main__ import _main
+from tinydb_ql.codec import get_codec
+from tinydb_ql.tables import SelectiveJSONStorage, Tables
+
+TRICKY = ['}', '{"a": [', '\\"}]', 'ユニコード', '\\', '"', '']
+
+
+@pytest.fixture(name='dbpath')
+def _dbpath(tmp_path):
+    path = tmp_path / 'db.json'
+    with tinydb.TinyDB(path) as db:
+        db.table('events').insert_multiple(
+            {'text': text, 'nested': {'list': [text, {'x': [[]]}]}}
+            for text in TRICKY * 10
+        )
+        db.table('players').insert_multiple(
+            {'name': name, 'team': n % 2} for n, name in enumerate('abcd')
+        )
+        db.table('teams').insert_multiple(
+            {'id': n, 'name': f'team {n}'} for n in range(2)
+        )
+    yield path
+
+
+def test_decodes_only_looked_up_tables(dbpath):
+    decoded = []
+
+    def loads(text):
+        decoded.append(text[:20])
+        return json.loads(text)
+
+    tables = Tables(dbpath.read_text(), loads)
+    assert list(tables) == ['events', 'players', 'teams']
+    assert 'players' in tables and 'missing' not in tables
+    assert len(tables['players']) == 4
+    assert tables['players'] is tables['players']
+    assert len(decoded) == 1
+    assert tables['events']['1']['text'] == TRICKY[0]
+    assert {k: dict(v) for k, v in tables.items()} == json.loads(
+        dbpath.read_text()
+    )
+
+
+def test_scans_up_to_looked_up_table(dbpath):
+    decoded = []
+
+    def loads(text):
+        decoded.append(text)
+        return json.loads(text)
+
+    # the later tables are left unscanned, and the table looked up is decoded
+    # in place (not by `loads`)
+    text = dbpath.read_text()
+    tables = Tables(text[:-1] + ', !}', loads)
+    assert tables['events']['1']['text'] == TRICKY[0]
+    assert tables['players']['4'] == {'name': 'd', 'team': 1}
+    assert decoded == []
+    with pytest.raises(json.JSONDecodeError):
+        'missing' in tables
+    # the tables skipped over are decoded by `loads`
+    tables = Tables(text, loads)
+    assert 'teams' in tables and not decoded
+    assert tables['events']['1']['text'] == TRICKY[0]
+    assert len(decoded) == 1
+    assert Tables('{}', loads).get('events') is None
+    assert len(Tables(' { } ', loads)) == 0
+
+
+def test_storage(dbpath):
+    with tinydb.TinyDB(
+            dbpath, access_mode='r', storage=CachingMiddleware(
+                SelectiveJSONStorage
+            )
+    ) as db:
+        assert db.tables() == {'events', 'players', 'teams'}
+        players = db.table('players')
+        assert [doc['name'] for doc in players.search(
+            QL.Query({'team': 1})
+        )] == ['b', 'd']
+        # $lookup decodes the other table when needed
+        query = QL.Query(
+            {'team': {'$lookup': {
+                'table': 'teams', 'field': 'id',
+                'where': {'name': 'team 0'}
+            }}}, database=db
+        )
+        assert [doc['name'] for doc in players.search(query)] == ['a', 'c']
+        assert db.table('missing').all() == []
+
+
+def test_empty_and_read_only(tmp_path):
+    path = tmp_path / 'empty.json'
+    path.touch()
+    storage = SelectiveJSONStorage(path, access_mode='r', codec=get_codec())
+    assert storage.read() is None
+    with pytest.raises(OSError):
+        storage.write({})
+    storage.close()
+
+
+def test_commandline(dbpath, capsys):
+    _main(['', str(dbpath), '{"text": "\\\\\\"}]"}', '--table', 'events',
+           '--count'])
+    assert capsys.readouterr().out == '10\n'
+    _main(['', str(dbpath), '--table', 'players', '--json'])
+    assert [doc['name'] for doc in json.loads(capsys.readouterr().out)] == [
+        'a', 'b', 'c', 'd'
+    ]
+    with pytest.raises(RuntimeError, match='available tables'):
+        _main(['', str(dbpath), '--table', 'missing'])
@@ -0,0 +1,70 @@
+import json
+import tracemalloc
+
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql import timing
+from tinydb_ql.__main__ import _main
+
+
+@pytest.fixture(name='timings')
+def _timings():
+    timings = []
+    timing.add_hook(timings.append)
+    yield timings
+    timing.remove_hook(timings.append)
+
+
+def test_library_phases(timings):
+    QL.Query({'a': 1})
+    assert [t.phase for t in timings] == ['validate', 'compile']
+    assert all(t.wall >= 0 and t.cpu >= 0 for t in timings)
+    assert all(t.peak_memory is None for t in timings)
+    # a parsed tree is not validated again
+    timings.clear()
+    QL.Query(QL.parse({'a': 1}))
+    assert [t.phase for t in timings] == ['validate', 'compile']
+
+
+def test_nested_phases(timings):
+    tracemalloc.start()
+    try:
+        with timing.phase('outer'):
+            with timing.phase('inner'):
+                data = bytearray(1 << 20)
+            del data
+    finally:
+        tracemalloc.stop()
+    inner, outer = timings
+    assert (inner.phase, outer.phase) == ('outer.inner', 'outer')
+    assert inner.peak_memory >= 1 << 20
+    # the inner peak counts for the enclosing phase
+    assert outer.peak_memory >= inner.peak_memory
+    assert outer.wall >= inner.wall
+
+
+def test_no_hook():
+    with timing.phase('unobserved'):
+        pass
+
+
+def test_commandline(tmp_path, capsys):
+    path = tmp_path / 'db.json'
+    with tinydb.TinyDB(path) as db:
+        db.insert_multiple({'n': n} for n in range(10))
+    _main(['', str(path), '{"n": {"$lt": 2}}', '--timings'])
+    captured = capsys.readouterr()
+    assert "{'n': 0}" in captured.out
+    report = json.loads(captured.err.splitlines()[-1])
+    phases = [phase['phase'] for phase in report['phases']]
+    assert phases == [
+        'imports', 'validate', 'load.read', 'load.decode', 'load', 'compile',
+        'scan', 'output'
+    ]
+    assert all(
+        phase['peak_memory'] is not None for phase in report['phases'][1:]
+    )
+    assert report['total']['wall'] >= report['phases'][0]['wall']
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,72 @@
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql.__main__ import _main
+from tinydb_ql.trigram import TrigramIndex, regex_requirement
+
+REQUIREMENTS = [
+    ('abc', 'abc'),
+    ('hello.*world', ('and', ['hello', 'world'])),
+    ('ab(cd|ef)g', ('or', ['abcdg', 'abefg'])),
+    ('(foo|ba)r', ('or', ['bar', 'foor'])),
+    ('^x+yz$', None),
+    (r'\d+abc', 'abc'),
+    ('a.{2}bcd', 'bcd'),
+    ('ab', None),
+    ('(abc)?', None),
+    ('(?i)abcd', None),
+    ('[^a]bcd', 'bcd'),
+    ('(', None)
+]
+
+
+@pytest.mark.parametrize('pattern, expected', REQUIREMENTS)
+def test_regex_requirement(pattern, expected):
+    assert regex_requirement(pattern) == expected
+
+
+QUERIES = [
+    {'name': {'$re': 'o$'}},
+    {'name': {'$search': 'ana'}},
+    {'name': {'$search': 'han|ich'}},
+    {'name': {'$matches': 'al.ce'}},
+    {'name': {'$matches': 'xyz'}},
+    {'$or': [{'name': {'$re': 'bob'}}, {'age': 13}]},
+    {'$and': [{'name': {'$re': 'ko'}}, {'age': 15}]},
+    {'$not': {'name': {'$re': 'bob'}}},
+    {'status.lang': {'$re': 'jp'}},
+    {'status': {'lang': {'$re': 'jp'}}},
+    {'age': 12}
+]
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_same_result(db_instance, query):
+    index = TrigramIndex('')
+    index.add_paths(db_instance, ['name', 'status.lang'])
+    result = QL.search(
+        db_instance, query, documents=index.documents(db_instance, query)
+    )
+    assert result == db_instance.search(QL.Query(query))
+
+
+def test_candidates():
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple(
+        {'text': f'{word} {n}'}
+        for n, word in enumerate(['apple', 'banana', 'cherry'] * 100)
+    )
+    index = TrigramIndex('')
+    index.add_paths(db, ['text'])
+    assert len(index.candidates(db, {'text': {'$re': 'nan'}})) == 100
+    assert len(index.candidates(db, {'text': {'$re': 'cherry 29'}})) == 5
+    assert not index.candidates(db, {'text': {'$re': 'durian'}})
+    assert index.candidates(db, {'text': {'$re': 'a'}}) is None
+
+
+def test_commandline(db_path, capsys):
+    _main(['main', str(db_path), '{"name": {"$re": "ko$"}}',
+           '--trigram', 'name', '--count'])
+    assert capsys.readouterr().out == '1\n'
+    assert 'name' in TrigramIndex.load(db_path).tables['_default']
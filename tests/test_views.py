@@ -0,0 +1,58 @@
+import json
+from types import MappingProxyType
+
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql.__main__ import _main
+
+
+@pytest.fixture(name='db')
+def _db():
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple({'n': n, 'odd': n % 2 == 1} for n in range(10))
+    yield db
+
+
+def test_search_ids(db):
+    assert QL.search_ids(db, {'odd': True}) == [2, 4, 6, 8, 10]
+    assert QL.search_ids(db, {'n': {'$gt': 100}}) == []
+    with pytest.raises(QL.BudgetExceeded):
+        QL.search_ids(db, {'odd': True}, max_results=2)
+
+
+def test_search_views(db):
+    views = QL.search_views(db, {'n': {'$lt': 3}})
+    assert list(views) == [1, 2, 3]
+    assert all(isinstance(view, MappingProxyType) for view in views.values())
+    assert views[2] == {'n': 1, 'odd': True}
+    with pytest.raises(TypeError):
+        views[2]['n'] = 5
+    # the stored dicts themselves: updates show through, removals do not
+    db.update({'odd': None}, doc_ids=[2])
+    db.remove(doc_ids=[3])
+    db.insert({'n': 0})
+    assert views[2]['odd'] is None
+    assert views[3] == {'n': 2, 'odd': False}
+    assert list(views) == [1, 2, 3]
+
+
+def test_commandline(tmp_path, capsys):
+    path = tmp_path / 'db.json'
+    with tinydb.TinyDB(path) as db:
+        db.insert_multiple({'n': n} for n in range(10))
+    _main(['', str(path), '{"n": {"$lt": 3}}', '--ids-only'])
+    assert capsys.readouterr().out == '1\n2\n3\n'
+    _main(['', str(path), '{"n": {"$lt": 3}}', '--ids-only', '--json',
+           '--limit', '2'])
+    captured = capsys.readouterr()
+    assert json.loads(captured.out) == [1, 2]
+    assert '--after 2' in captured.err
+    _main(['', str(path), '{"n": {"$ge": 8}}', '--ids-only',
+           '--cache-dir', str(tmp_path / 'cache')])
+    _main(['', str(path), '{"n": {"$ge": 8}}', '--ids-only',
+           '--cache-dir', str(tmp_path / 'cache')])
+    assert capsys.readouterr().out == '9\n10\n' * 2
+    with pytest.raises(SystemExit):
+        _main(['', str(path), '--ids-only', '--count'])
@@ -0,0 +1,52 @@
+import os
+
+import tinydb
+
+from tinydb_ql.watch import Watcher, format_delta
+
+
+def _touch(path, step):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + step))
+
+
+def test_watcher(db_path):
+    evaluated = []
+    query = tinydb.Query().age.test(lambda age: evaluated.append(age) or age < 14)
+    watcher = Watcher(db_path, None, query)
+    delta = watcher.poll()
+    assert sorted(delta.entered) == ['1', '3']
+    assert len(evaluated) == 5
+    assert watcher.poll() is None
+
+    with tinydb.TinyDB(db_path) as db:
+        db.update({'age': 20}, doc_ids=[1])
+        db.update({'age': 10}, doc_ids=[2])
+        db.update({'blob': 2}, doc_ids=[3])
+        db.update({'blob': 3}, doc_ids=[4])
+        db.insert({'age': 1})
+    _touch(db_path, 1)
+    evaluated.clear()
+    delta = watcher.poll()
+    assert delta.left == ['1']
+    assert sorted(delta.entered) == ['2', '6']
+    assert list(delta.changed) == ['3']
+    assert sorted(evaluated) == [1, 10, 13, 15, 20]
+    assert sorted(watcher.matches) == ['2', '3', '6']
+
+    with tinydb.TinyDB(db_path) as db:
+        db.remove(doc_ids=[2, 5])
+    _touch(db_path, 2)
+    evaluated.clear()
+    delta = watcher.poll()
+    assert delta.left == ['2']
+    assert not delta.entered and not delta.changed and not evaluated
+
+
+def test_format_delta(db_path):
+    watcher = Watcher(db_path, None, {'name': 'bob'})
+    delta = watcher.poll()
+    assert format_delta(delta, False).startswith("+ 1: {'name': 'bob'")
+    assert format_delta(delta, True).startswith(
+        '{"entered": {"1": {"name": "bob"'
+    )
@@ -0,0 +1,70 @@
+import pytest
+import tinydb
+
+import tinydb_ql as QL
+from tinydb_ql.__main__ import _main
+from tinydb_ql.zonemap import ZoneMap, build_blocks
+
+QUERIES = [
+    {'age': {'$gt': 14}},
+    {'age': {'$le': 12}},
+    {'age': {'$lt': 0}},
+    {'age': 13},
+    {'age': {'$eq': 20}},
+    {'name': 'taro'},
+    {'name': {'$ge': 'i'}},
+    {'blob': {'$types': ['string', 'array']}},
+    {'blob': 1},
+    {'blob': {'$types': ['object']}},
+    {'blob': {'$types': ['number']}},
+    {'status.lang': {'$exists': True}},
+    {'status.lang': {'$exists': False}},
+    {'status.current-stage': {'$ge': 4}},
+    {'status': {'gameover': True}},
+    {'status': {'$not': {'lang': 'jp'}}},
+    {'$or': [{'age': 12}, {'age': 16}]},
+    {'$or': []},
+    {'$and': [{'age': {'$gt': 12}}, {'name': {'$re': 'o$'}}]},
+    {'$not': {'age': {'$gt': 12}}},
+    {'$fragment': {'age': 12}},
+    {'status.by-stage': {'$any': {'score': {'$lt': 50}}}},
+    {'nothing': {'$ne': 1}},
+    {}
+]
+
+
+@pytest.mark.parametrize('query', QUERIES)
+@pytest.mark.parametrize('block_size', [1, 2, 10])
+def test_same_result(db_instance, query, block_size):
+    zonemap = ZoneMap('', block_size)
+    result = QL.search(
+        db_instance, query, documents=zonemap.documents(db_instance, query)
+    )
+    assert result == db_instance.search(QL.Query(query))
+
+
+def test_skipped_blocks():
+    db = tinydb.TinyDB(storage=tinydb.storages.MemoryStorage)
+    db.insert_multiple({'t': n} for n in range(1000))
+    blocks = build_blocks(db, 100)
+    assert len(blocks) == 10
+    assert blocks[3]['fields']['t'] == [100, ['number'], 300, 399]
+    zonemap = ZoneMap('', 100, {'_default': blocks})
+    candidates = list(zonemap.documents(db, {'t': {'$ge': 950}}))
+    assert len(candidates) == 100
+    candidates = list(zonemap.documents(
+        db, {'$or': [{'t': {'$lt': 10}}, {'t': 555}]}
+    ))
+    assert len(candidates) == 200
+
+
+def test_commandline(db_path, capsys):
+    args = ['main', str(db_path), '{"age": {"$gt": 14}}', '--zonemap',
+            '--zonemap-block', '2', '--count']
+    _main(args)
+    assert capsys.readouterr().out == '2\n'
+    assert ZoneMap.path_for(db_path).exists()
+    assert ZoneMap.load(db_path, 2).tables
+    assert not ZoneMap.load(db_path, 3).tables
+    _main(args)
+    assert capsys.readouterr().out == '2\n'